@@ -0,0 +1,34 @@
+"""tenant heads
+
+Revision ID: 0002_tenant_heads
+Revises: 0001_init
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_tenant_heads"
+down_revision = "0001_init"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "tenant_heads",
+        sa.Column("tenant_id", sa.String(length=80), primary_key=True),
+        sa.Column("next_seq", sa.BigInteger(), nullable=False, server_default="1"),
+        sa.Column("last_event_hash", sa.String(length=64), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    # seed heads from the current ledger tail of every tenant
+    op.execute("""
+        INSERT INTO tenant_heads (tenant_id, next_seq, last_event_hash)
+        SELECT t.tenant_id, COALESCE(e.seq, 0) + 1, e.event_hash
+        FROM tenants t
+        LEFT JOIN LATERAL (
+            SELECT seq, event_hash FROM events WHERE events.tenant_id = t.tenant_id ORDER BY seq DESC LIMIT 1
+        ) e ON true
+    """)
+
+def downgrade():
+    op.drop_table("tenant_heads")
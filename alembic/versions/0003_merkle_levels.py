@@ -0,0 +1,26 @@
+"""packed merkle levels
+
+Revision ID: 0003_merkle_levels
+Revises: 0002_tenant_heads
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_merkle_levels"
+down_revision = "0002_tenant_heads"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # existing checkpoints keep merkle_nodes until `python -m fida.cli backfill-merkle-levels` packs them
+    op.create_table(
+        "merkle_levels",
+        sa.Column("checkpoint_id", sa.BigInteger(), primary_key=True),
+        sa.Column("level", sa.Integer(), primary_key=True),
+        sa.Column("node_count", sa.Integer(), nullable=False),
+        sa.Column("hashes", sa.LargeBinary(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("merkle_levels")
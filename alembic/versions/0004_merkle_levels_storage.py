@@ -0,0 +1,19 @@
+"""merkle_levels: uncompressed out-of-line storage for sliced reads
+
+Revision ID: 0004_merkle_levels_storage
+Revises: 0003_merkle_levels
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004_merkle_levels_storage"
+down_revision = "0003_merkle_levels"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # hashes are incompressible; EXTERNAL lets substr() fetch only the TOAST chunks a proof needs
+    op.execute("ALTER TABLE merkle_levels ALTER COLUMN hashes SET STORAGE EXTERNAL")
+
+def downgrade():
+    op.execute("ALTER TABLE merkle_levels ALTER COLUMN hashes SET STORAGE EXTENDED")
@@ -0,0 +1,31 @@
+"""tenant key history
+
+Revision ID: 0005_tenant_keys
+Revises: 0004_merkle_levels_storage
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_tenant_keys"
+down_revision = "0004_merkle_levels_storage"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "tenant_keys",
+        sa.Column("tenant_id", sa.String(length=80), primary_key=True),
+        sa.Column("kid", sa.String(length=64), primary_key=True),
+        sa.Column("pub_b64u", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="active"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("retired_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute("""
+        INSERT INTO tenant_keys (tenant_id, kid, pub_b64u, status, created_at)
+        SELECT tenant_id, active_kid, pub_b64u, 'active', created_at FROM tenants
+    """)
+
+def downgrade():
+    op.drop_table("tenant_keys")
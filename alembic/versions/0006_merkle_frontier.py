@@ -0,0 +1,29 @@
+"""merkle frontier on tenant heads, two-phase checkpoints
+
+Revision ID: 0006_merkle_frontier
+Revises: 0005_tenant_keys
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_merkle_frontier"
+down_revision = "0005_tenant_keys"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # NULL frontier: rebuilt from pending events the first time the head is locked
+    op.add_column("tenant_heads", sa.Column("frontier", sa.LargeBinary(), nullable=True))
+    op.add_column("tenant_heads", sa.Column("frontier_size", sa.BigInteger(), nullable=True))
+    op.alter_column("checkpoints", "page_hash", existing_type=sa.String(length=64), nullable=True)
+    op.alter_column("checkpoints", "signature_b64u", existing_type=sa.Text(), nullable=True)
+    op.create_index("ix_checkpoints_unsigned", "checkpoints", ["tenant_id"], postgresql_where=sa.text("signature_b64u IS NULL"))
+
+def downgrade():
+    op.drop_index("ix_checkpoints_unsigned", table_name="checkpoints")
+    op.execute("DELETE FROM checkpoints WHERE signature_b64u IS NULL")
+    op.alter_column("checkpoints", "signature_b64u", existing_type=sa.Text(), nullable=False)
+    op.alter_column("checkpoints", "page_hash", existing_type=sa.String(length=64), nullable=False)
+    op.drop_column("tenant_heads", "frontier_size")
+    op.drop_column("tenant_heads", "frontier")
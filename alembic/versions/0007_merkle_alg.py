@@ -0,0 +1,22 @@
+"""record the Merkle node hash per checkpoint
+
+Revision ID: 0007_merkle_alg
+Revises: 0006_merkle_frontier
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_merkle_alg"
+down_revision = "0006_merkle_frontier"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # existing roots were all built by hashing hex-concatenated children
+    op.add_column("checkpoints", sa.Column("merkle_alg", sa.String(length=16), nullable=False, server_default="sha256-hexcat"))
+    op.add_column("tenant_heads", sa.Column("frontier_alg", sa.String(length=16), nullable=True))
+
+def downgrade():
+    op.drop_column("tenant_heads", "frontier_alg")
+    op.drop_column("checkpoints", "merkle_alg")
@@ -0,0 +1,37 @@
+"""tenant-wide RFC 6962 log: perfect subtree nodes and signed tree heads
+
+Revision ID: 0008_tenant_log
+Revises: 0007_merkle_alg
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_tenant_log"
+down_revision = "0007_merkle_alg"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # filled lazily: the first checkpoint materialized for a tenant replays its earlier events
+    op.create_table(
+        "log_nodes",
+        sa.Column("tenant_id", sa.String(length=80), primary_key=True),
+        sa.Column("level", sa.Integer(), primary_key=True),
+        sa.Column("idx", sa.BigInteger(), primary_key=True),
+        sa.Column("hash", sa.LargeBinary(), nullable=False),
+    )
+    op.create_table(
+        "tree_heads",
+        sa.Column("tenant_id", sa.String(length=80), primary_key=True),
+        sa.Column("tree_size", sa.BigInteger(), primary_key=True),
+        sa.Column("root_hash", sa.String(length=64), nullable=False),
+        sa.Column("checkpoint_id", sa.BigInteger(), nullable=True),
+        sa.Column("issued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("platform_kid", sa.String(length=64), nullable=False),
+        sa.Column("signature_b64u", sa.Text(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("tree_heads")
+    op.drop_table("log_nodes")
@@ -0,0 +1,18 @@
+"""index api_keys.key_hash for cache-miss auth lookups
+
+Revision ID: 0009_api_key_hash_index
+Revises: 0008_tenant_log
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0009_api_key_hash_index"
+down_revision = "0008_tenant_log"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_api_keys_key_hash", "api_keys", ["key_hash"])
+
+def downgrade():
+    op.drop_index("ix_api_keys_key_hash", table_name="api_keys")
@@ -0,0 +1,102 @@
+"""hash-partition events by tenant_id, covering keys, partial index for unchecked events
+
+Revision ID: 0010_events_partitioned
+Revises: 0009_api_key_hash_index
+Create Date: 2026-10-17
+
+Rewrites the whole events table in one transaction (INSERT ... SELECT under an exclusive lock), so on a large
+ledger run it in a maintenance window. FIDA_EVENTS_PARTITIONS (default 16) is fixed once this has run;
+changing it later means another rewrite.
+"""
+import os
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_events_partitioned"
+down_revision = "0009_api_key_hash_index"
+branch_labels = None
+depends_on = None
+
+PARTITIONS = int(os.environ.get("FIDA_EVENTS_PARTITIONS", "16"))
+
+COLUMNS = [
+    "tenant_id", "seq", "event_id", "issued_at", "profile_id", "event_type", "actor_role", "object_ref",
+    "payload_canon", "payload_hash", "prev_event_hash", "event_hash", "kid", "signature_b64u", "checkpoint_id", "leaf_index",
+]
+
+# Every event is updated exactly once (checkpoint assignment) and never again, so each partition gets its own,
+# much tighter autovacuum thresholds: vacuum runs often on a small table instead of rarely on a huge one, and
+# the visibility map stays current for index-only scans.
+PARTITION_STORAGE = (
+    "fillfactor = 90, "
+    "autovacuum_vacuum_scale_factor = 0.01, "
+    "autovacuum_vacuum_insert_scale_factor = 0.01, "
+    "autovacuum_analyze_scale_factor = 0.005, "
+    "autovacuum_vacuum_cost_limit = 2000"
+)
+
+def _columns():
+    return [
+        sa.Column("tenant_id", sa.String(length=80), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+        sa.Column("event_id", sa.String(length=64), nullable=False),
+        sa.Column("issued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("profile_id", sa.String(length=80), nullable=False),
+        sa.Column("event_type", sa.String(length=40), nullable=False),
+        sa.Column("actor_role", sa.String(length=40), nullable=False),
+        sa.Column("object_ref", sa.String(length=200), nullable=False, server_default=""),
+        sa.Column("payload_canon", sa.Text(), nullable=False),
+        sa.Column("payload_hash", sa.String(length=64), nullable=False),
+        sa.Column("prev_event_hash", sa.String(length=64), nullable=True),
+        sa.Column("event_hash", sa.String(length=64), nullable=False),
+        sa.Column("kid", sa.String(length=64), nullable=False),
+        sa.Column("signature_b64u", sa.Text(), nullable=False),
+        sa.Column("checkpoint_id", sa.BigInteger(), nullable=True),
+        sa.Column("leaf_index", sa.Integer(), nullable=True),
+    ]
+
+def upgrade():
+    # Unique keys on a partitioned table must contain the partition key: event_id becomes unique per tenant
+    # (it is 128 random bits, and every lookup already filters on tenant_id). The surrogate id goes; nothing reads it.
+    op.create_table(
+        "events_partitioned",
+        *_columns(),
+        postgresql_partition_by="HASH (tenant_id)",
+    )
+    # seq-range scans that only need the hash (checkpoint materialization, frontier rebuild, tenant log,
+    # head recovery) become index-only scans
+    op.execute("ALTER TABLE events_partitioned ADD CONSTRAINT pk_events PRIMARY KEY (tenant_id, seq) INCLUDE (event_hash)")
+    # single and batch proof lookups by event_id, index-only
+    op.execute(
+        "ALTER TABLE events_partitioned ADD CONSTRAINT uq_events_tenant_event_id "
+        "UNIQUE (tenant_id, event_id) INCLUDE (checkpoint_id, leaf_index, event_hash)"
+    )
+    for i in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE events_p{i:03d} PARTITION OF events_partitioned "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i}) WITH ({PARTITION_STORAGE})"
+        )
+    # only the not-yet-checkpointed tail of each tenant: stays small however large the ledger gets
+    op.create_index("ix_events_unchecked", "events_partitioned", ["tenant_id", "seq"], postgresql_where=sa.text("checkpoint_id IS NULL"))
+
+    cols = ", ".join(COLUMNS)
+    op.execute("LOCK TABLE events IN EXCLUSIVE MODE")
+    op.execute(f"INSERT INTO events_partitioned ({cols}) SELECT {cols} FROM events")
+    op.drop_table("events")
+    op.rename_table("events_partitioned", "events")
+    op.execute("ANALYZE events")
+
+def downgrade():
+    op.create_table(
+        "events_unpartitioned",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        *_columns(),
+        sa.UniqueConstraint("tenant_id", "seq", name="uq_tenant_seq"),
+    )
+    cols = ", ".join(COLUMNS)
+    op.execute(f"INSERT INTO events_unpartitioned ({cols}) SELECT {cols} FROM events ORDER BY tenant_id, seq")
+    op.drop_table("events")
+    op.rename_table("events_unpartitioned", "events")
+    op.create_index("ix_events_tenant_id", "events", ["tenant_id"])
+    op.create_index("ix_events_checkpoint_id", "events", ["checkpoint_id"])
+    op.create_unique_constraint("events_event_id_key", "events", ["event_id"])
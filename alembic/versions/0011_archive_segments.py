@@ -0,0 +1,38 @@
+"""archive segments for checkpointed payloads; events.payload_canon nullable
+
+Revision ID: 0011_archive_segments
+Revises: 0010_events_partitioned
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_archive_segments"
+down_revision = "0010_events_partitioned"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "archive_segments",
+        sa.Column("checkpoint_id", sa.BigInteger(), primary_key=True),
+        sa.Column("tenant_id", sa.String(length=80), nullable=False),
+        sa.Column("from_seq", sa.BigInteger(), nullable=False),
+        sa.Column("to_seq", sa.BigInteger(), nullable=False),
+        sa.Column("digest", sa.String(length=64), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.alter_column("events", "payload_canon", existing_type=sa.Text(), nullable=True)
+
+def downgrade():
+    # archived payloads have to be restored into events first (they are only in the segment files)
+    op.execute("""
+        DO $$ BEGIN
+            IF EXISTS (SELECT 1 FROM events WHERE payload_canon IS NULL) THEN
+                RAISE EXCEPTION 'events with archived payloads exist; restore them before downgrading';
+            END IF;
+        END $$
+    """)
+    op.alter_column("events", "payload_canon", existing_type=sa.Text(), nullable=False)
+    op.drop_table("archive_segments")
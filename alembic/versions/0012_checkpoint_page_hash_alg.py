@@ -0,0 +1,21 @@
+"""record the page_hash scheme per checkpoint
+
+Revision ID: 0012_checkpoint_page_hash_alg
+Revises: 0011_archive_segments
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012_checkpoint_page_hash_alg"
+down_revision = "0011_archive_segments"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # existing checkpoints stay NULL: some were materialized with the '|'-joined hex page_hash, later ones with
+    # the raw-bytes one, and verifiers accept either for them
+    op.add_column("checkpoints", sa.Column("page_hash_alg", sa.String(length=40), nullable=True))
+
+def downgrade():
+    op.drop_column("checkpoints", "page_hash_alg")
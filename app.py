@@ -1,13 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from starlette.responses import Response
 
+from fida.audit import audit_writer
+from fida.db_async import dispose_async_engine
+from fida.auth import start_invalidation_listener, stop_invalidation_listener
 from fida.middleware import BodySizeMiddleware
 from fida.api_admin import router as admin_router
 from fida.api_public import router as public_router
 from fida.jwks import router as jwks_router
 
-app = FastAPI(title="FIDA Rail V1", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_invalidation_listener()
+    yield
+    stop_invalidation_listener()
+    audit_writer.stop()
+    await dispose_async_engine()
+
+app = FastAPI(title="FIDA Rail V1", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(BodySizeMiddleware)
 
@@ -5,12 +5,13 @@ from datetime import datetime, timezone
 import secrets
 
 from fida.db import db_session
-from fida.models import PlatformState, Tenant, ApiKey
-from fida.schemas import BootstrapRequest, BootstrapResponse, TenantCreateRequest, TenantCreateResponse, ApiKeyIssueRequest, ApiKeyIssueResponse
+from fida.models import PlatformState, Tenant, ApiKey, TenantHead, TenantKey
+from fida.schemas import BootstrapRequest, BootstrapResponse, TenantCreateRequest, TenantCreateResponse, KeyRotateResponse, ApiKeyIssueRequest, ApiKeyIssueResponse, ApiKeyRevokeResponse
 from fida.config import settings
 from fida.crypto import generate_keypair, pub_b64u, envelope_encrypt, envelope_decrypt
-from fida.auth import require_role, Principal, new_api_key, api_key_hash
+from fida.auth import require_role, Principal, new_api_key, api_key_hash, invalidate_api_key
 from fida.audit import audit
+from fida.keys import evict_signing_keys
 from fida.util import json_dumps, sha256_hex
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -71,6 +72,8 @@ def create_tenant(req: TenantCreateRequest, request: Request, p: Principal = Dep
 
     tenant = Tenant(tenant_id=tenant_id, name=req.name, active_kid=kp.kid, pub_b64u=pub_b64u(kp.pub), seed_enc_b64u=seed_enc)
     db.add(tenant)
+    db.add(TenantHead(tenant_id=tenant_id, next_seq=1, last_event_hash=None, frontier=b"", frontier_size=0))
+    db.add(TenantKey(tenant_id=tenant_id, kid=kp.kid, pub_b64u=tenant.pub_b64u, status="active"))
 
     issuer = new_api_key(); verifier = new_api_key(); exporter = new_api_key(); admin = new_api_key()
     db.add(ApiKey(key_id=f"{tenant_id}-issuer", key_hash=api_key_hash(issuer), tenant_id=tenant_id, role="issuer"))
@@ -91,6 +94,28 @@ def create_tenant(req: TenantCreateRequest, request: Request, p: Principal = Dep
         public_key_b64u=tenant.pub_b64u
     )
 
+@router.post("/tenants/{tenant_id}/keys/rotate", response_model=KeyRotateResponse, dependencies=[Depends(require_role("admin"))])
+def rotate_tenant_key(tenant_id: str, request: Request, p: Principal = Depends(require_role("admin")), db: Session = Depends(db_session)):
+    if p.tenant_id and p.tenant_id != tenant_id:
+        raise HTTPException(status_code=403, detail="Tenant mismatch")
+    tenant = db.query(Tenant).filter(Tenant.tenant_id == tenant_id).with_for_update().first()
+    if not tenant:
+        raise HTTPException(status_code=404, detail="Unknown tenant")
+    old_kid = tenant.active_kid
+    kp = generate_keypair()
+    now = datetime.now(timezone.utc)
+    # old key stays in tenant_keys (retired) so receipts it signed keep verifying
+    db.query(TenantKey).filter(TenantKey.tenant_id == tenant_id, TenantKey.status == "active").update({"status":"retired","retired_at":now}, synchronize_session=False)
+    tenant.active_kid = kp.kid
+    tenant.pub_b64u = pub_b64u(kp.pub)
+    tenant.seed_enc_b64u = envelope_encrypt(settings.fida_master_key_b64, kp.priv.private_bytes_raw())
+    db.add(TenantKey(tenant_id=tenant_id, kid=kp.kid, pub_b64u=tenant.pub_b64u, status="active"))
+    audit(db, actor=p.key_id, action="tenant_key_rotate", tenant_id=tenant_id, meta={"kid":kp.kid,"retired_kid":old_kid}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
+    db.commit()
+    # this node's caches; other nodes pick the new kid up within FIDA_KEY_CACHE_TTL_S (or on first unknown kid)
+    evict_signing_keys(tenant_id)
+    return KeyRotateResponse(tenant_id=tenant_id, active_kid=kp.kid, public_key_b64u=tenant.pub_b64u, retired_kid=old_kid)
+
 @router.post("/apikeys/issue", response_model=ApiKeyIssueResponse, dependencies=[Depends(require_role("admin"))])
 def issue_api_key(req: ApiKeyIssueRequest, request: Request, p: Principal = Depends(require_role("admin")), db: Session = Depends(db_session)):
     tenant = db.query(Tenant).filter(Tenant.tenant_id == req.tenant_id).first()
@@ -102,3 +127,17 @@ def issue_api_key(req: ApiKeyIssueRequest, request: Request, p: Principal = Depe
     audit(db, actor=p.key_id, action="apikey_issue", tenant_id=req.tenant_id, meta={"role":req.role,"key_id":key_id}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
     db.commit()
     return ApiKeyIssueResponse(key_id=key_id, tenant_id=req.tenant_id, role=req.role, api_key=api_key)
+
+@router.post("/apikeys/{key_id}/revoke", response_model=ApiKeyRevokeResponse, dependencies=[Depends(require_role("admin"))])
+def revoke_api_key(key_id: str, request: Request, p: Principal = Depends(require_role("admin")), db: Session = Depends(db_session)):
+    row = db.query(ApiKey).filter(ApiKey.key_id == key_id).with_for_update().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Unknown API key")
+    if row.status != "revoked":
+        row.status = "revoked"
+        row.revoked_at = datetime.now(timezone.utc)
+        audit(db, actor=p.key_id, action="apikey_revoke", tenant_id=row.tenant_id, meta={"key_id":key_id}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
+        db.commit()
+    # every node's auth cache, including ours
+    invalidate_api_key(row.key_hash)
+    return ApiKeyRevokeResponse(key_id=key_id, status=row.status, revoked_at=row.revoked_at.isoformat() if row.revoked_at else None)
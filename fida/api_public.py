@@ -1,21 +1,32 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 from datetime import datetime, timezone
 
-from fida.db import db_session
-from fida.models import Tenant, Event, Checkpoint, MerkleNode, PlatformState
-from fida.schemas import IssueRequest, Receipt, VerifyRequest, VerifyResult, ExportEnvelope, ExportItem, ExportIntegrity, CheckpointOut, MerkleProofOut
-from fida.auth import require_key, require_role, Principal
+from fida.db import db_session, SessionLocal
+from fida.db_async import async_db_session
+from fida.group_commit import PendingIssue, UnknownTenant, group_committer
+from fida.models import Tenant, Event, Checkpoint, PlatformState
+from fida.schemas import ProofBatchRequest, ProofBatchResponse, CheckpointMultiProof, IssueRequest, IssueBatchRequest, IssueBatchResponse, Receipt, VerifyRequest, VerifyResult, VerifyBatchRequest, VerifyBatchResponse, ExportEnvelope, ExportItem, ExportIntegrity, MerkleProofOut, TreeHeadOut, ConsistencyProofOut
+from fida.auth import require_key, require_role, require_role_async, Principal
 from fida.rate_limit import enforce_rl
-from fida.audit import audit
+from fida.archive import payload_of
+from fida.audit import audit, audit_async, audit_many
 from fida.config import settings
-from fida.crypto import envelope_decrypt
-from fida.ledger import issue_event, verify_receipt, maybe_checkpoint
-from fida.merkle import verify_proof, MerkleProof
+from fida.keys import tenant_signing_key
+from fida.ledger import PayloadTooLarge, issue_event, issue_events_batch, verify_receipt, verify_receipts
+from fida.merkle import verify_proof
+from fida.export import stream_ndjson
+from fida.checkpoint import latest_checkpoint
+from fida.util import PageHasher
+from fida.proofs import prove_event, group_by_checkpoint, iter_multiproofs
+from fida.ctlog import LOG_ALG, consistency_proof, get_tree_head, tree_head_out
 
-from fida.util import json_dumps, sha256_hex
+from fida.util import json_dumps
 
 router = APIRouter(tags=["public"])
 
@@ -33,62 +44,120 @@ def ready(db: Session = Depends(db_session)):
     ps = db.query(PlatformState).filter(PlatformState.id == 1).first()
     return {"ok": True, "bootstrapped": bool(ps and ps.bootstrapped), "locked": bool(ps and ps.bootstrap_locked)}
 
+# /issue, /verify, /export and /proof are async: DB I/O awaits on the asyncpg pool instead of holding one of
+# Starlette's worker threads. The sync ledger code runs unchanged through AsyncSession.run_sync.
+
 @router.post("/issue", response_model=Receipt)
-def issue(req: IssueRequest, request: Request, idem: str | None = Header(default=None, alias="Idempotency-Key"), p: Principal = Depends(require_role("issuer","admin")), db: Session = Depends(db_session)):
+async def issue(req: IssueRequest, request: Request, idem: str | None = Header(default=None, alias="Idempotency-Key"), p: Principal = Depends(require_role_async("issuer","admin")), db: AsyncSession = Depends(async_db_session)):
+    await run_in_threadpool(enforce_rl, request, p.tenant_id, p.key_id)
+    if not p.tenant_id or p.tenant_id != req.tenant_id:
+        raise HTTPException(status_code=403, detail="Tenant mismatch")
+    ip = request.client.host if request.client else None
+    ua = request.headers.get("user-agent")
+    if settings.issue_group_commit:
+        # coalesced with concurrent calls for this tenant; returns after the group's commit. The request session
+        # is never used here, so waiting callers do not pin pool connections the committer needs.
+        try:
+            receipt_json, _ = await group_committer().submit(req.tenant_id, PendingIssue(req.model_dump(), idem, p.key_id, ip, ua))
+        except UnknownTenant:
+            raise HTTPException(status_code=404, detail="Unknown tenant")
+        return Receipt.model_validate_json(receipt_json)
+    tenant = await db.scalar(select(Tenant).where(Tenant.tenant_id == req.tenant_id))
+    if not tenant:
+        raise HTTPException(status_code=404, detail="Unknown tenant")
+
+    def work(s: Session) -> tuple[str, bool]:
+        receipt_json, idem_hit = issue_event(s, tenant, req.payload, req.profile_id, req.event_type, req.actor_role, req.object_ref, idem, tenant_signing_key(tenant))
+        audit(s, actor=p.key_id, action="issue_event", tenant_id=req.tenant_id, meta={"idem":bool(idem),"idem_hit":idem_hit}, ip=ip, ua=ua)
+        return receipt_json, idem_hit
+
+    receipt_json, _ = await db.run_sync(work)
+    # checkpoints are cut off the request path by `python -m fida.cli checkpoint-worker`
+    await db.commit()
+    return Receipt.model_validate_json(receipt_json)
+
+@router.post("/issue/batch", response_model=IssueBatchResponse)
+def issue_batch(req: IssueBatchRequest, request: Request, idem: str | None = Header(default=None, alias="Idempotency-Key"), p: Principal = Depends(require_role("issuer","admin")), db: Session = Depends(db_session)):
     enforce_rl(request, p.tenant_id, p.key_id)
     if not p.tenant_id or p.tenant_id != req.tenant_id:
         raise HTTPException(status_code=403, detail="Tenant mismatch")
+    if any(it.tenant_id != req.tenant_id for it in req.items):
+        raise HTTPException(status_code=400, detail="Batch items must all target the batch tenant")
     tenant = db.query(Tenant).filter(Tenant.tenant_id == req.tenant_id).first()
     if not tenant:
         raise HTTPException(status_code=404, detail="Unknown tenant")
 
-    # decrypt tenant private seed
-    tenant_seed = envelope_decrypt(settings.fida_master_key_b64, tenant.seed_enc_b64u)
-    receipt_json, idem_hit = issue_event(db, tenant, req.payload, req.profile_id, req.event_type, req.actor_role, req.object_ref, idem, tenant_seed)
-
-    audit(db, actor=p.key_id, action="issue_event", tenant_id=req.tenant_id, meta={"idem":bool(idem),"idem_hit":idem_hit}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
+    # Idempotency-Key on a batch is a prefix; item i is keyed "<key>:<i>"
+    idem_keys = [f"{idem}:{i}" if idem else None for i in range(len(req.items))]
+    try:
+        results = issue_events_batch(db, tenant, [it.model_dump() for it in req.items], idem_keys, tenant_signing_key(tenant), settings.max_body_bytes)
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    # maybe checkpoint batch in background-ish (sync here; for prod, move to worker)
-    ps = db.query(PlatformState).filter(PlatformState.id == 1).first()
-    if ps and ps.platform_seed_enc_b64u and ps.platform_kid:
-        platform_seed = envelope_decrypt(settings.fida_master_key_b64, ps.platform_seed_enc_b64u)
-        maybe_checkpoint(db, tenant.tenant_id, platform_seed, ps.platform_kid)
+    ip = request.client.host if request.client else None
+    ua = request.headers.get("user-agent")
+    audit_many(db, actor=p.key_id, action="issue_event", tenant_id=req.tenant_id, metas=[{"idem":bool(idem),"idem_hit":hit,"batch":True} for _, hit in results], ip=ip, ua=ua)
 
     db.commit()
-    return Receipt.model_validate_json(receipt_json)
+    return IssueBatchResponse(
+        tenant_id=req.tenant_id,
+        receipts=[Receipt.model_validate_json(rj) for rj, _ in results],
+        idem_hits=sum(1 for _, hit in results if hit),
+    )
 
 @router.post("/verify", response_model=VerifyResult)
-def verify(req: VerifyRequest, request: Request, p: Principal = Depends(require_role("verifier","admin","issuer","exporter")), db: Session = Depends(db_session)):
-    enforce_rl(request, p.tenant_id or "platform", p.key_id)
+async def verify(req: VerifyRequest, request: Request, p: Principal = Depends(require_role_async("verifier","admin","issuer","exporter")), db: AsyncSession = Depends(async_db_session)):
+    await run_in_threadpool(enforce_rl, request, p.tenant_id or "platform", p.key_id)
     tenant_id = req.receipt.tenant_id
     if p.tenant_id and p.tenant_id != tenant_id:
         raise HTTPException(status_code=403, detail="Tenant mismatch")
-    tenant = db.query(Tenant).filter(Tenant.tenant_id == tenant_id).first()
-    if not tenant:
+    out = await db.run_sync(verify_receipt, tenant_id, req.receipt.model_dump())
+    if out["reason_codes"] == ["unknown_tenant"]:
         raise HTTPException(status_code=404, detail="Unknown tenant")
-    out = verify_receipt(db, tenant, req.receipt.model_dump())
-    audit(db, actor=p.key_id, action="verify_receipt", tenant_id=tenant_id, meta={"valid":out["valid"]}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
-    db.commit()
+    audit_async(actor=p.key_id, action="verify_receipt", tenant_id=tenant_id, meta={"valid":out["valid"]}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
     return VerifyResult(**out)
 
+@router.post("/verify/batch", response_model=VerifyBatchResponse)
+def verify_batch(req: VerifyBatchRequest, request: Request, p: Principal = Depends(require_role("verifier","admin","issuer","exporter")), db: Session = Depends(db_session)):
+    enforce_rl(request, p.tenant_id or "platform", p.key_id)
+    if len(req.receipts) > settings.verify_batch_max:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.verify_batch_max} receipts")
+    tenant_ids = {r.tenant_id for r in req.receipts}
+    if p.tenant_id and tenant_ids != {p.tenant_id}:
+        raise HTTPException(status_code=403, detail="Tenant mismatch")
+    out = verify_receipts(db, [r.model_dump() for r in req.receipts])
+    valid_count = sum(1 for o in out if o["valid"])
+    # one aggregate audit record per batch
+    audit_async(actor=p.key_id, action="verify_receipt_batch", tenant_id=p.tenant_id, meta={"count":len(out),"valid":valid_count,"tenants":sorted(tenant_ids)[:50]}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
+    return VerifyBatchResponse(results=[VerifyResult(**o) for o in out], valid_count=valid_count)
+
 @router.get("/export/{tenant_id}", response_model=ExportEnvelope)
-def export_ledger(tenant_id: str, cursor: str | None = None, limit: int = 500, fmt: str = "json", request: Request = None, p: Principal = Depends(require_role("exporter","admin")), db: Session = Depends(db_session)):
+async def export_ledger(tenant_id: str, cursor: str | None = None, limit: int = 500, fmt: str = "json", request: Request = None, p: Principal = Depends(require_role_async("exporter","admin")), db: AsyncSession = Depends(async_db_session)):
     if p.tenant_id and p.tenant_id != tenant_id:
         raise HTTPException(status_code=403, detail="Tenant mismatch")
-    enforce_rl(request, tenant_id, p.key_id)
+    await run_in_threadpool(enforce_rl, request, tenant_id, p.key_id)
 
-    q = db.query(Event).filter(Event.tenant_id == tenant_id).order_by(Event.seq.asc())
+    if fmt == "ndjson":
+        # whole ledger after `cursor` in one response; see fida.export.stream_ndjson for the record layout
+        audit_async(actor=p.key_id, action="export_ledger", tenant_id=tenant_id, meta={"stream":True,"after_seq":int(cursor or 0)}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
+        return StreamingResponse(stream_ndjson(tenant_id, int(cursor or 0)), media_type="application/x-ndjson")
+
+    q = select(Event).where(Event.tenant_id == tenant_id).order_by(Event.seq.asc())
     if cursor:
-        q = q.filter(Event.seq > int(cursor))
-    rows = q.limit(min(limit, 5000)).all()
+        q = q.where(Event.seq > int(cursor))
+    rows = (await db.scalars(q.limit(min(limit, 5000)))).all()
+    # archived payloads come back from their segment files
+    payloads = await db.run_sync(lambda s: [payload_of(s, e) for e in rows])
     next_cursor = str(rows[-1].seq) if rows else None
 
     items = []
-    for e in rows:
+    page = PageHasher()
+    for e, canon in zip(rows, payloads):
+        page.update(e.event_hash)
         items.append(ExportItem(
             seq=int(e.seq),
             event_id=e.event_id,
-            issued_at=e.issued_at.isoformat(),
+            issued_at=e.issued_at.astimezone(timezone.utc).isoformat(),
             event_type=e.event_type,
             payload_hash=e.payload_hash,
             event_hash=e.event_hash,
@@ -99,67 +168,74 @@ def export_ledger(tenant_id: str, cursor: str | None = None, limit: int = 500, f
             prev_event_hash=e.prev_event_hash,
             kid=e.kid,
             signature_b64u=e.signature_b64u,
-            payload_canon=e.payload_canon,
+            payload_canon=canon,
             checkpoint_id=e.checkpoint_id,
             leaf_index=e.leaf_index,
         ))
 
     from_root = rows[0].prev_event_hash or "" if rows else ""
     to_root = rows[-1].event_hash if rows else ""
-    page_hash = sha256_hex(("|".join([x.event_hash for x in rows])).encode("utf-8")) if rows else sha256_hex(b"")
-    integrity = ExportIntegrity(from_root=from_root, to_root=to_root, size=len(rows), page_hash=page_hash)
-
-    # attach latest checkpoint for tenant (if exists)
-    cp = db.query(Checkpoint).filter(Checkpoint.tenant_id == tenant_id).order_by(Checkpoint.id.desc()).first()
-    cp_out = None
-    if cp:
-        cp_out = CheckpointOut(
-            tenant_id=tenant_id,
-            size=cp.leaf_count,
-            root_hash=cp.merkle_root,
-            issued_at=cp.issued_at.isoformat(),
-            platform_kid=cp.platform_kid,
-            signature_b64u=cp.signature_b64u
-        )
-
-    audit(db, actor=p.key_id, action="export_ledger", tenant_id=tenant_id, meta={"count":len(rows)}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
-    db.commit()
+    integrity = ExportIntegrity(from_root=from_root, to_root=to_root, size=len(rows), page_hash=page.hexdigest())
+
+    # latest checkpoint for tenant (if exists), cached briefly per tenant
+    cp_out = await db.run_sync(latest_checkpoint, tenant_id)
+
+    audit_async(actor=p.key_id, action="export_ledger", tenant_id=tenant_id, meta={"count":len(rows)}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
 
     return ExportEnvelope(tenant_id=tenant_id, items=items, next_cursor=next_cursor, checkpoint=cp_out, integrity=integrity)
 
+@router.post("/proof/batch", response_model=ProofBatchResponse)
+def proof_batch(req: ProofBatchRequest, request: Request, stream: bool = False, p: Principal = Depends(require_role("verifier","exporter","admin")), db: Session = Depends(db_session)):
+    if p.tenant_id and p.tenant_id != req.tenant_id:
+        raise HTTPException(status_code=403, detail="Tenant mismatch")
+    if len(req.event_ids) > settings.proof_batch_max:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.proof_batch_max} event_ids")
+    enforce_rl(request, req.tenant_id, p.key_id)
+
+    event_ids = list(dict.fromkeys(req.event_ids))
+    groups, unavailable = group_by_checkpoint(db, req.tenant_id, event_ids)
+    audit_async(actor=p.key_id, action="merkle_proof_batch", tenant_id=req.tenant_id, meta={"requested":len(event_ids),"checkpoints":len(groups),"unavailable":len(unavailable)}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        def lines():
+            # the request session is closed once streaming starts; use a dedicated one
+            with SessionLocal() as sdb:
+                for cp_id, mp in iter_multiproofs(sdb, req.tenant_id, groups):
+                    if mp is None:
+                        unavailable.extend(eid for eid, _, _ in groups[cp_id])
+                        continue
+                    yield json_dumps({"type":"multiproof", **mp}) + "\n"
+            yield json_dumps({"type":"unavailable","event_ids":unavailable}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    proofs = []
+    for cp_id, mp in iter_multiproofs(db, req.tenant_id, groups):
+        if mp is None:
+            unavailable.extend(eid for eid, _, _ in groups[cp_id])
+            continue
+        proofs.append(CheckpointMultiProof(**mp))
+    return ProofBatchResponse(tenant_id=req.tenant_id, proofs=proofs, unavailable=unavailable)
+
 @router.get("/proof/{tenant_id}/{event_id}", response_model=MerkleProofOut)
-def proof(tenant_id: str, event_id: str, request: Request, p: Principal = Depends(require_role("verifier","exporter","admin")), db: Session = Depends(db_session)):
+async def proof(tenant_id: str, event_id: str, request: Request, p: Principal = Depends(require_role_async("verifier","exporter","admin")), db: AsyncSession = Depends(async_db_session)):
     if p.tenant_id and p.tenant_id != tenant_id:
         raise HTTPException(status_code=403, detail="Tenant mismatch")
-    enforce_rl(request, tenant_id, p.key_id)
+    await run_in_threadpool(enforce_rl, request, tenant_id, p.key_id)
 
-    e = db.query(Event).filter(and_(Event.tenant_id == tenant_id, Event.event_id == event_id)).first()
+    e = (await db.execute(select(Event.checkpoint_id, Event.leaf_index, Event.event_hash).where(and_(Event.tenant_id == tenant_id, Event.event_id == event_id)))).first()
     if not e or not e.checkpoint_id or e.leaf_index is None:
         raise HTTPException(status_code=404, detail="Event not checkpointed yet (proof unavailable)")
 
-    cp = db.query(Checkpoint).filter(Checkpoint.id == e.checkpoint_id).first()
+    cp = await db.get(Checkpoint, e.checkpoint_id)
     if not cp:
         raise HTTPException(status_code=404, detail="Checkpoint missing")
 
-    # Rebuild layers from stored merkle_nodes
-    # Read nodes grouped by level
-    nodes = db.query(MerkleNode).filter(MerkleNode.checkpoint_id == cp.id).all()
-    by_level = {}
-    for n in nodes:
-        by_level.setdefault(n.level, {})[n.idx] = n.hash_hex
-    max_level = max(by_level.keys())
-    layers = []
-    for lvl in range(0, max_level+1):
-        d = by_level.get(lvl, {})
-        layer = [d[i] for i in range(0, len(d))]
-        layers.append(layer)
-
-    from fida.merkle import prove
-    pr = prove(layers, int(e.leaf_index))
+    pr = await db.run_sync(prove_event, cp, int(e.leaf_index), e.event_hash)
+    if pr is None:
+        raise HTTPException(status_code=404, detail="Merkle tree missing for checkpoint")
     ok = verify_proof(pr)
 
-    audit(db, actor=p.key_id, action="merkle_proof", tenant_id=tenant_id, meta={"checkpoint_id":cp.id,"ok":ok}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
-    db.commit()
+    audit_async(actor=p.key_id, action="merkle_proof", tenant_id=tenant_id, meta={"checkpoint_id":cp.id,"ok":ok}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
 
     return MerkleProofOut(
         tenant_id=tenant_id,
@@ -169,5 +245,35 @@ def proof(tenant_id: str, event_id: str, request: Request, p: Principal = Depend
         leaf=pr.leaf,
         root=pr.root,
         siblings=[[s,h] for (s,h) in pr.siblings],
-        proof_valid=ok
+        proof_valid=ok,
+        merkle_alg=pr.alg
     )
+
+@router.get("/sth/{tenant_id}", response_model=TreeHeadOut)
+def signed_tree_head(tenant_id: str, request: Request, tree_size: int | None = None, p: Principal = Depends(require_role("verifier","exporter","admin")), db: Session = Depends(db_session)):
+    if p.tenant_id and p.tenant_id != tenant_id:
+        raise HTTPException(status_code=403, detail="Tenant mismatch")
+    enforce_rl(request, tenant_id, p.key_id)
+    head = get_tree_head(db, tenant_id, tree_size)
+    if not head:
+        raise HTTPException(status_code=404, detail="No signed tree head")
+    return tree_head_out(head)
+
+@router.get("/consistency/{tenant_id}", response_model=ConsistencyProofOut)
+def consistency(tenant_id: str, request: Request, first: int = Query(alias="from", ge=1), second: int | None = Query(default=None, alias="to"), p: Principal = Depends(require_role("verifier","exporter","admin")), db: Session = Depends(db_session)):
+    # both sizes must be signed tree heads; `to` defaults to the latest one
+    if p.tenant_id and p.tenant_id != tenant_id:
+        raise HTTPException(status_code=403, detail="Tenant mismatch")
+    enforce_rl(request, tenant_id, p.key_id)
+    h1 = get_tree_head(db, tenant_id, first)
+    h2 = get_tree_head(db, tenant_id, second)
+    if not h1 or not h2:
+        raise HTTPException(status_code=404, detail="No signed tree head of that size")
+    if h1.tree_size > h2.tree_size:
+        raise HTTPException(status_code=400, detail="from must not exceed to")
+    try:
+        proof = consistency_proof(db, tenant_id, int(h1.tree_size), int(h2.tree_size))
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Log nodes missing")
+    audit_async(actor=p.key_id, action="log_consistency", tenant_id=tenant_id, meta={"from":int(h1.tree_size),"to":int(h2.tree_size)}, ip=request.client.host if request.client else None, ua=request.headers.get("user-agent"))
+    return ConsistencyProofOut(tenant_id=tenant_id, log_alg=LOG_ALG, first=tree_head_out(h1), second=tree_head_out(h2), proof=proof)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from fida.cache import TTLCache
+from fida.canonical import hash_canon
+from fida.config import settings
+from fida.models import ArchiveSegment, Checkpoint, Event
+
+log = logging.getLogger("fida.archive")
+
+# Segment file: one per checkpoint, holding the payload_canon of its events (seq from_seq..to_seq) so the hot
+# events table can drop them.
+#   MAGIC | zlib(record 0) | zlib(record 1) | ... | index: count x (offset u64, length u32) | trailer
+#   trailer = first_seq u64, index_offset u64, count u32, END
+# Records are compressed one by one so a read touches one record; files are named by the sha256 of their bytes.
+MAGIC = b"FIDASEG1"
+END = b"FIDAEND1"
+INDEX_ENTRY = struct.Struct("<QI")
+TRAILER = struct.Struct("<QQI8s")
+
+class ArchiveError(Exception):
+    pass
+
+def build_segment(first_seq: int, payloads: Iterable[str]) -> bytes:
+    out = bytearray(MAGIC)
+    index = bytearray()
+    count = 0
+    for p in payloads:
+        blob = zlib.compress(p.encode("utf-8"), settings.archive_zlib_level)
+        index += INDEX_ENTRY.pack(len(out), len(blob))
+        out += blob
+        count += 1
+    index_offset = len(out)
+    out += index
+    out += TRAILER.pack(first_seq, index_offset, count, END)
+    return bytes(out)
+
+class SegmentStore:
+    # content-addressed files under root/<2 hex>/<sha256>.seg. Object storage works through a filesystem mount
+    # (gcsfuse, s3fs, mountpoint-s3): writes are whole files and reads are mmaps.
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + ".seg")
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest
+
+class SegmentReader:
+    def __init__(self, path: str, digest: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hashlib.sha256(self._mm).hexdigest() != digest:
+            self.close()
+            raise ArchiveError(f"segment {digest}: content does not match its address")
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ArchiveError(f"segment {digest}: bad header")
+        self.first_seq, self._index_offset, self.count, end = TRAILER.unpack_from(self._mm, len(self._mm) - TRAILER.size)
+        if end != END:
+            self.close()
+            raise ArchiveError(f"segment {digest}: bad trailer")
+
+    def get(self, seq: int) -> str:
+        i = seq - self.first_seq
+        if not 0 <= i < self.count:
+            raise KeyError(seq)
+        off, length = INDEX_ENTRY.unpack_from(self._mm, self._index_offset + i * INDEX_ENTRY.size)
+        return zlib.decompress(self._mm[off:off + length]).decode("utf-8")
+
+    def close(self) -> None:
+        self._mm.close()
+
+_store: SegmentStore | None = None
+# open segments by checkpoint_id; an evicted map is unmapped once no reader still holds it
+_readers = TTLCache(maxsize=settings.archive_open_segments, ttl=3600.0)
+
+def segment_store() -> SegmentStore:
+    global _store
+    if _store is None:
+        _store = SegmentStore(settings.archive_dir)
+    return _store
+
+def _reader(db: Session, checkpoint_id: int) -> SegmentReader:
+    r = _readers.get(checkpoint_id)
+    if r is None:
+        seg = db.get(ArchiveSegment, checkpoint_id)
+        if seg is None:
+            raise ArchiveError(f"checkpoint {checkpoint_id}: payloads archived but no segment recorded")
+        r = SegmentReader(segment_store().path(seg.digest), seg.digest)
+        _readers.set(checkpoint_id, r)
+    return r
+
+def archived_payload(db: Session, checkpoint_id: int, seq: int, payload_hash: str) -> str:
+    canon = _reader(db, checkpoint_id).get(seq)
+    if hash_canon(canon) != payload_hash:
+        raise ArchiveError(f"checkpoint {checkpoint_id} seq {seq}: archived payload does not match payload_hash")
+    return canon
+
+def payload_of(db: Session, r) -> str:
+    # r: Event or a row with seq, payload_canon, payload_hash, checkpoint_id
+    if r.payload_canon is not None:
+        return r.payload_canon
+    return archived_payload(db, int(r.checkpoint_id), int(r.seq), r.payload_hash)
+
+def archive_checkpoint(db: Session, cp: Checkpoint) -> ArchiveSegment | None:
+    # write the segment, record it and NULL the hot copies in one transaction (caller commits); a crash before
+    # the commit leaves an orphaned file that the next run rewrites to the same address
+    rows = db.execute(
+        select(Event.seq, Event.payload_canon, Event.checkpoint_id)
+        .where(Event.tenant_id == cp.tenant_id, Event.seq.between(cp.from_seq, cp.to_seq)).order_by(Event.seq.asc())
+    ).all()
+    if len(rows) != cp.leaf_count or any(r.payload_canon is None or r.checkpoint_id != cp.id for r in rows):
+        log.warning("checkpoint %d: events do not match the checkpoint or are already archived, skipping", cp.id)
+        return None
+    data = build_segment(int(cp.from_seq), (r.payload_canon for r in rows))
+    digest = segment_store().put(data)
+    seg = ArchiveSegment(checkpoint_id=cp.id, tenant_id=cp.tenant_id, from_seq=cp.from_seq, to_seq=cp.to_seq, digest=digest, size_bytes=len(data))
+    db.add(seg)
+    db.execute(
+        update(Event)
+        .where(Event.tenant_id == cp.tenant_id, Event.seq.between(cp.from_seq, cp.to_seq), Event.checkpoint_id == cp.id)
+        .values(payload_canon=None)
+    )
+    return seg
+
+def archive_pending(db: Session, limit: int, after_id: int = 0) -> tuple[int | None, int]:
+    # signed checkpoints older than archive_min_age_s without a segment, by id; returns (last id examined, archived)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.archive_min_age_s)
+    cps = db.execute(
+        select(Checkpoint)
+        .where(
+            Checkpoint.id > after_id,
+            Checkpoint.signature_b64u.is_not(None),
+            Checkpoint.issued_at <= cutoff,
+            ~select(ArchiveSegment.checkpoint_id).where(ArchiveSegment.checkpoint_id == Checkpoint.id).exists(),
+        )
+        .order_by(Checkpoint.id.asc()).limit(limit)
+    ).scalars().all()
+    archived = sum(1 for cp in cps if archive_checkpoint(db, cp) is not None)
+    return (int(cps[-1].id) if cps else None), archived
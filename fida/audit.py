@@ -1,8 +1,198 @@
 from __future__ import annotations
+import fcntl
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from fida.config import settings
+from fida.metrics import AUDIT_FLUSH_LAT, AUDIT_QUEUE_DEPTH, AUDIT_RECORDS
 from fida.models import AuditLog
 from fida.util import json_dumps
 
+log = logging.getLogger("fida.audit")
+
 def audit(db: Session, actor: str, action: str, tenant_id: str | None, meta: dict, ip: str | None, ua: str | None):
     row = AuditLog(actor=actor, action=action, tenant_id=tenant_id, meta_json=json_dumps(meta), ip=ip, ua=ua)
     db.add(row)
+
+def audit_many(db: Session, actor: str, action: str, tenant_id: str | None, metas: list[dict], ip: str | None, ua: str | None):
+    if not metas:
+        return
+    db.execute(insert(AuditLog), [dict(actor=actor, action=action, tenant_id=tenant_id, meta_json=json_dumps(m), ip=ip, ua=ua) for m in metas])
+
+AUDIT_COLUMNS = ["ts", "actor", "action", "tenant_id", "meta_json", "ip", "ua"]
+REPLAY_BACKOFF_S = 5.0
+
+def _spill_lines(batch: list[tuple]) -> str:
+    return "".join(json_dumps(dict(zip(AUDIT_COLUMNS, [r[0].isoformat(), *r[1:]]))) + "\n" for r in batch)
+
+class AuditWriter:
+    # For requests that write nothing else: records go to a bounded in-process queue and a background thread
+    # COPYs them in batches of flush_size or every flush_interval_s. When the queue is full or the database
+    # is down, records are appended to the spill file (fsynced) and replayed after the next successful flush.
+    # A hard crash loses at most what is queued in memory.
+    def __init__(self, spill_path: str, maxsize: int, flush_size: int, flush_interval_s: float):
+        self.spill_path = spill_path
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+        self.q: queue.Queue[tuple] = queue.Queue(maxsize=maxsize)
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._replay_after = 0.0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="fida-audit-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        # drains the queue before returning
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def put(self, record: tuple) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self.q.put_nowait(record)
+        except queue.Full:
+            AUDIT_RECORDS.labels(outcome="overflow").inc()
+            self.spill([record])
+        AUDIT_QUEUE_DEPTH.set(self.q.qsize())
+
+    def _next_batch(self) -> list[tuple]:
+        batch: list[tuple] = []
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self.q.empty()):
+            batch = self._next_batch()
+            AUDIT_QUEUE_DEPTH.set(self.q.qsize())
+            if batch and not self.write(batch):
+                self.spill(batch)
+                continue
+            if time.monotonic() >= self._replay_after and (os.path.exists(self.spill_path) or glob.glob(self.spill_path + ".*.replay")):
+                self.replay()
+
+    def write(self, batch: list[tuple]) -> bool:
+        from fida.db import SessionLocal, copy_rows
+        t0 = time.perf_counter()
+        try:
+            with SessionLocal() as db:
+                copy_rows(db, AuditLog.__table__, AUDIT_COLUMNS, batch)
+                db.commit()
+        except Exception as e:
+            log.warning("audit flush of %d records failed: %s", len(batch), e)
+            self._replay_after = time.monotonic() + REPLAY_BACKOFF_S
+            return False
+        AUDIT_FLUSH_LAT.observe(time.perf_counter() - t0)
+        AUDIT_RECORDS.labels(outcome="written").inc(len(batch))
+        return True
+
+    def _open_spill(self):
+        # open the spill file locked; a replayer in another process may have claimed (renamed) it between our open
+        # and our lock, in which case that inode is no longer the spill file and records written to it would be lost
+        while True:
+            f = open(self.spill_path, "a", encoding="utf-8")
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(self.spill_path).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            f.close()
+
+    def spill(self, batch: list[tuple]) -> None:
+        lines = _spill_lines(batch)
+        try:
+            with self._spill_lock, self._open_spill() as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            AUDIT_RECORDS.labels(outcome="dropped").inc(len(batch))
+            log.error("audit spill to %s failed, %d records lost: %s", self.spill_path, len(batch), e)
+            return
+        AUDIT_RECORDS.labels(outcome="spilled").inc(len(batch))
+
+    def _claim(self, path: str, wait: bool):
+        # lock the file, then rename it to a name of our own while holding the lock. Leftovers are only taken when
+        # nobody holds them (a live replayer keeps its lock until it is done; a dead one's lock is gone); the spill
+        # file itself is waited for, writers only hold it for one append.
+        try:
+            f = open(path, "r+", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                # claimed by someone else between our open and our lock
+                f.close()
+                return None
+            claimed = f"{self.spill_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.replay"
+            with self._spill_lock:
+                os.rename(path, claimed)
+        except (BlockingIOError, FileNotFoundError):
+            f.close()
+            return None
+        return f, claimed
+
+    def replay(self) -> None:
+        for path in [self.spill_path, *glob.glob(self.spill_path + ".*.replay")]:
+            claim = self._claim(path, wait=(path == self.spill_path))
+            if claim is None:
+                continue
+            # the lock is held until the file is removed or rewritten: a writer that opened it before the rename
+            # waits, then sees it is no longer the spill file and reopens
+            f, claimed = claim
+            with f:
+                batch = []
+                for line in f:
+                    try:
+                        r = json.loads(line)
+                    except ValueError:
+                        # torn final line from a crash mid-write
+                        log.warning("skipping unreadable spilled audit record in %s", claimed)
+                        continue
+                    batch.append((datetime.fromisoformat(r["ts"]), *(r[c] for c in AUDIT_COLUMNS[1:])))
+                for i in range(0, len(batch), self.flush_size):
+                    if not self.write(batch[i:i + self.flush_size]):
+                        # keep what is left for the next attempt
+                        f.seek(0)
+                        f.truncate()
+                        f.write(_spill_lines(batch[i:]))
+                        f.flush()
+                        os.fsync(f.fileno())
+                        return
+                try:
+                    os.remove(claimed)
+                except FileNotFoundError:
+                    log.warning("replayed audit spill %s was already removed", claimed)
+            log.info("replayed %d spilled audit records", len(batch))
+
+audit_writer = AuditWriter(settings.audit_spill_path, settings.audit_queue_max, settings.audit_flush_size, settings.audit_flush_interval_s)
+
+def audit_async(actor: str, action: str, tenant_id: str | None, meta: dict, ip: str | None, ua: str | None):
+    # for read endpoints: no write transaction, the record lands within audit_flush_interval_s
+    audit_writer.put((datetime.now(timezone.utc), actor, action, tenant_id, json_dumps(meta), ip, ua))
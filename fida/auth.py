@@ -1,29 +1,116 @@
 from __future__ import annotations
+import logging
 import secrets
+import threading
+import redis
 from fastapi import Depends, Header, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from fida.cache import TTLCache
+from fida.config import settings
 from fida.db import db_session
+from fida.db_async import async_db_session
 from fida.models import ApiKey
 from fida.util import sha256_hex
 
+log = logging.getLogger("fida.auth")
+
+# other nodes drop a key hash from their cache when it is published here; "*" clears everything
+APIKEY_CHANNEL = "fida:apikeys"
+
 def api_key_hash(api_key: str) -> str:
     # store hash only
     return sha256_hex(api_key.encode("utf-8"))
 
 class Principal:
+    __slots__ = ("key_id", "role", "tenant_id")
+
     def __init__(self, key_id: str, role: str, tenant_id: str | None):
         self.key_id = key_id
         self.role = role
         self.tenant_id = tenant_id
 
-def require_key(x_api_key: str | None = Header(default=None, alias="x-api-key"), db: Session = Depends(db_session)) -> Principal:
+# key_hash -> Principal for active keys only; misses are not cached, so a newly issued key works at once.
+# Revocations reach other nodes over APIKEY_CHANNEL; the TTL bounds staleness if a message is lost.
+principals = TTLCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl_s)
+
+def _cached(x_api_key: str | None) -> tuple[str, Principal | None]:
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing x-api-key")
     h = api_key_hash(x_api_key)
-    row = db.query(ApiKey).filter(ApiKey.key_hash == h, ApiKey.status == "active").first()
+    return h, principals.get(h)
+
+def _remember(h: str, row: ApiKey | None) -> Principal:
     if not row:
         raise HTTPException(status_code=403, detail="Invalid API key")
-    return Principal(key_id=row.key_id, role=row.role, tenant_id=row.tenant_id)
+    p = Principal(key_id=row.key_id, role=row.role, tenant_id=row.tenant_id)
+    principals.set(h, p)
+    return p
+
+def require_key(x_api_key: str | None = Header(default=None, alias="x-api-key"), db: Session = Depends(db_session)) -> Principal:
+    # db is the route's own session: FastAPI resolves db_session once per request
+    h, p = _cached(x_api_key)
+    if p is not None:
+        return p
+    return _remember(h, db.query(ApiKey).filter(ApiKey.key_hash == h, ApiKey.status == "active").first())
+
+async def require_key_async(x_api_key: str | None = Header(default=None, alias="x-api-key"), db: AsyncSession = Depends(async_db_session)) -> Principal:
+    # for async routes: a miss is looked up on the route's AsyncSession, not a threadpool psycopg2 session
+    h, p = _cached(x_api_key)
+    if p is not None:
+        return p
+    row = await db.scalar(select(ApiKey).where(ApiKey.key_hash == h, ApiKey.status == "active"))
+    # end the read transaction so the connection goes back to the pool until the route needs one
+    # (group-commit /issue never does)
+    await db.rollback()
+    return _remember(h, row)
+
+_redis: redis.Redis | None = None
+
+def _client() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(settings.redis_url)
+    return _redis
+
+def invalidate_api_key(key_hash: str) -> None:
+    # call after the revoking transaction commits
+    principals.pop(key_hash)
+    try:
+        _client().publish(APIKEY_CHANNEL, key_hash)
+    except redis.RedisError as e:
+        log.warning("api key invalidation not published (other nodes expire it within %.0fs): %s", settings.auth_cache_ttl_s, e)
+
+def _listen(stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            ps = _client().pubsub(ignore_subscribe_messages=True)
+            ps.subscribe(APIKEY_CHANNEL)
+            # anything published while we were not subscribed is lost
+            principals.clear()
+            while not stop.is_set():
+                msg = ps.get_message(timeout=1.0)
+                if msg is None:
+                    continue
+                h = msg["data"].decode()
+                if h == "*":
+                    principals.clear()
+                else:
+                    principals.pop(h)
+        except redis.RedisError as e:
+            log.warning("api key invalidation listener: %s", e)
+            principals.clear()
+            stop.wait(5.0)
+
+_listener_stop = threading.Event()
+
+def start_invalidation_listener() -> None:
+    _listener_stop.clear()
+    threading.Thread(target=_listen, args=(_listener_stop,), name="fida-apikey-invalidation", daemon=True).start()
+
+def stop_invalidation_listener() -> None:
+    _listener_stop.set()
 
 def require_role(*roles: str):
     def _dep(p: Principal = Depends(require_key)) -> Principal:
@@ -32,5 +119,12 @@ def require_role(*roles: str):
         return p
     return _dep
 
+def require_role_async(*roles: str):
+    async def _dep(p: Principal = Depends(require_key_async)) -> Principal:
+        if p.role not in roles:
+            raise HTTPException(status_code=403, detail="Insufficient role")
+        return p
+    return _dep
+
 def new_api_key() -> str:
     return secrets.token_urlsafe(32)
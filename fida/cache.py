@@ -0,0 +1,60 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+class TTLCache:
+    # bounded LRU with per-entry expiry; on_evict(key, value) runs for every entry that leaves the cache
+    def __init__(self, maxsize: int, ttl: float, on_evict: Callable[[Hashable, Any], None] | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def _drop(self, key: Hashable) -> None:
+        _, value = self._data.pop(key)
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[0] <= time.monotonic():
+                self._drop(key)
+                return default
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def pop(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._drop(key)
+            return True
+
+    def evict_where(self, pred: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            keys = [k for k in self._data if pred(k)]
+            for k in keys:
+                self._drop(k)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            for k in list(self._data):
+                self._drop(k)
+
+    def __len__(self) -> int:
+        return len(self._data)
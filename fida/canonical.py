@@ -1,11 +1,54 @@
+from __future__ import annotations
+import json
 from typing import Any
 import rfc8785
 from fida.util import sha256_hex
 
-def canonicalize(payload: Any) -> str:
-    # RFC8785 canonical JSON bytes -> decode to UTF-8 string
+_INT_MAX = 2**53 - 1
+_SCALARS = (str, bool, type(None))
+# C encoder with RFC 8785 separators and escaping (no ASCII-fying, lowercase \u00xx for control characters)
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=True, allow_nan=False).encode
+
+def _plain(obj: Any) -> bool:
+    # True when the stdlib encoder produces exactly the RFC 8785 bytes: no floats (JCS number formatting differs
+    # from repr), ints within +-2^53-1, str keys without astral characters (so code point order == UTF-16
+    # order), and only dict/list/str/int/bool/None.
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if t is dict:
+            for k, v in o.items():
+                if type(k) is not str or not (k.isascii() or max(k) <= "\uffff"):
+                    return False
+                if type(v) in _SCALARS:
+                    continue
+                stack.append(v)
+        elif t is list or t is tuple:
+            stack.extend(o)
+        elif t is int:
+            if -_INT_MAX > o or o > _INT_MAX:
+                return False
+        elif t not in _SCALARS:
+            return False
+    return True
+
+def canonicalize_hashed(payload: Any) -> tuple[str, str]:
+    # (RFC 8785 canonical JSON, sha256 hex of its UTF-8 bytes) with one encode or decode, not two
+    if _plain(payload):
+        canon = _encode(payload)
+        try:
+            return canon, sha256_hex(canon.encode("utf-8"))
+        except UnicodeEncodeError as e:
+            # lone surrogates; rfc8785 rejects them the same way
+            raise rfc8785.CanonicalizationError("input contains non-UTF-8 codepoints") from e
+    # floats, astral keys, big ints: the reference implementation; one sha256 over its bytes is cheaper than
+    # hashing each of its small writes as they happen
     b = rfc8785.dumps(payload)
-    return b.decode("utf-8")
+    return b.decode("utf-8"), sha256_hex(b)
+
+def canonicalize(payload: Any) -> str:
+    return canonicalize_hashed(payload)[0]
 
 def hash_canon(canon: str) -> str:
     return sha256_hex(canon.encode("utf-8"))
@@ -0,0 +1,225 @@
+from __future__ import annotations
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import func, select
+from fida.archive import ArchiveError, archived_payload
+from fida.canonical import hash_canon
+from fida.crypto import sign_b64u
+from fida.db import engine, SessionLocal
+from fida.keys import platform_signing_key
+from fida.ledger import compute_event_hash
+from fida.merkle import build_levels, pack_hex
+from fida.models import Checkpoint, Event, PlatformState
+from fida.util import json_dumps, page_hash_matches
+
+log = logging.getLogger("fida.chain_audit")
+
+AUDIT_YIELD_PER = 2000
+MAX_ERRORS = 100
+
+AUDIT_COLUMNS = (
+    Event.seq, Event.issued_at, Event.profile_id, Event.event_type, Event.actor_role, Event.object_ref,
+    Event.payload_hash, Event.payload_canon, Event.prev_event_hash, Event.event_hash, Event.checkpoint_id, Event.leaf_index,
+)
+
+def plan_ranges(db, tenant_id: str, after_seq: int, range_events: int) -> list[tuple[int, int, list[tuple]]]:
+    # [(lo, hi, checkpoints)] covering after_seq+1..max seq. Ranges start and end on checkpoint boundaries so
+    # each worker can rebuild whole trees; a checkpoint straddling after_seq is re-checked from its from_seq.
+    max_seq = db.execute(select(func.max(Event.seq)).where(Event.tenant_id == tenant_id)).scalar()
+    if max_seq is None or max_seq <= after_seq:
+        return []
+    cps = db.execute(
+        select(Checkpoint.id, Checkpoint.from_seq, Checkpoint.to_seq, Checkpoint.leaf_count, Checkpoint.merkle_root, Checkpoint.page_hash, Checkpoint.merkle_alg, Checkpoint.page_hash_alg)
+        .where(Checkpoint.tenant_id == tenant_id, Checkpoint.to_seq > after_seq, Checkpoint.signature_b64u.is_not(None))
+        .order_by(Checkpoint.from_seq)
+    ).all()
+    ranges: list[tuple[int, int, list[tuple]]] = []
+    lo = min(after_seq + 1, int(cps[0].from_seq)) if cps else after_seq + 1
+    cur: list[tuple] = []
+    for cp in cps:
+        cur.append(tuple(cp))
+        if int(cp.to_seq) - lo + 1 >= range_events:
+            ranges.append((lo, int(cp.to_seq), cur))
+            lo, cur = int(cp.to_seq) + 1, []
+    # tail past the last checkpoint carries no tree, so it can be cut anywhere
+    while lo <= max_seq:
+        hi = min(max(lo + range_events - 1, int(cur[-1][2]) if cur else 0), int(max_seq))
+        ranges.append((lo, hi, cur))
+        lo, cur = hi + 1, []
+    return ranges
+
+def _init_worker():
+    # forked children must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+
+def audit_range(tenant_id: str, lo: int, hi: int, cps: list[tuple], anchor: tuple[int, str] | None = None) -> dict:
+    t0 = time.perf_counter()
+    res = dict(lo=lo, hi=hi, events=0, first_seq=None, first_prev=None, last_seq=None, last_hash=None,
+               checkpoints=0, first_bad_seq=None, errors=[], error_count=0)
+
+    def fail(seq: int, msg: str):
+        res["error_count"] += 1
+        if len(res["errors"]) < MAX_ERRORS:
+            res["errors"].append(f"seq {seq}: {msg}")
+        if res["first_bad_seq"] is None or seq < res["first_bad_seq"]:
+            res["first_bad_seq"] = seq
+
+    cp_iter = iter(cps)
+    cp = next(cp_iter, None)
+    leaves: list[str] = []
+
+    def close_checkpoint(cp):
+        cp_id, from_seq, to_seq, leaf_count, root, cp_page_hash, alg, page_alg = cp
+        res["checkpoints"] += 1
+        if len(leaves) != leaf_count:
+            fail(from_seq, f"checkpoint {cp_id}: {len(leaves)} leaves, expected {leaf_count}")
+        elif build_levels(pack_hex(leaves), alg)[-1].hex() != root:
+            fail(from_seq, f"checkpoint {cp_id}: merkle root mismatch")
+        if cp_page_hash and not page_hash_matches(leaves, cp_page_hash, page_alg):
+            fail(from_seq, f"checkpoint {cp_id}: page_hash mismatch")
+        leaves.clear()
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(*AUDIT_COLUMNS).where(Event.tenant_id == tenant_id, Event.seq.between(lo, hi)).order_by(Event.seq.asc())
+            .execution_options(yield_per=AUDIT_YIELD_PER)
+        )
+        for r in rows:
+            seq = int(r.seq)
+            if res["last_seq"] is None:
+                res["first_seq"], res["first_prev"] = seq, r.prev_event_hash
+            else:
+                if seq != res["last_seq"] + 1:
+                    fail(seq, f"gap after seq {res['last_seq']}")
+                if r.prev_event_hash != res["last_hash"]:
+                    fail(seq, "prev_event_hash does not link to previous event")
+            if r.payload_canon is not None:
+                if hash_canon(r.payload_canon) != r.payload_hash:
+                    fail(seq, "payload_hash mismatch")
+            elif r.checkpoint_id is not None:
+                # archived: the segment copy has to match too
+                try:
+                    archived_payload(db, int(r.checkpoint_id), seq, r.payload_hash)
+                except (ArchiveError, KeyError, OSError) as e:
+                    fail(seq, f"archived payload: {e}")
+            computed = compute_event_hash(
+                tenant_id, seq, r.issued_at.astimezone(timezone.utc).isoformat(),
+                r.profile_id, r.event_type, r.actor_role, r.object_ref, r.payload_hash, r.prev_event_hash,
+            )
+            if computed != r.event_hash:
+                fail(seq, "event_hash mismatch")
+            if anchor and anchor[0] == seq and anchor[1] != r.event_hash:
+                fail(seq, "event_hash differs from the resumed report")
+
+            while cp is not None and seq > cp[2]:
+                close_checkpoint(cp)
+                cp = next(cp_iter, None)
+            if cp is not None and cp[1] <= seq <= cp[2]:
+                if r.checkpoint_id != cp[0]:
+                    fail(seq, f"checkpoint_id {r.checkpoint_id}, expected {cp[0]}")
+                elif r.leaf_index != len(leaves):
+                    fail(seq, f"leaf_index {r.leaf_index}, expected {len(leaves)}")
+                leaves.append(r.event_hash)
+            res["events"] += 1
+            res["last_seq"], res["last_hash"] = seq, r.event_hash
+    while cp is not None:
+        close_checkpoint(cp)
+        cp = next(cp_iter, None)
+    res["elapsed_s"] = time.perf_counter() - t0
+    return res
+
+def _audit_task(args) -> dict:
+    return audit_range(*args)
+
+def sign_report(report: dict) -> dict:
+    report = dict(report, platform_kid=None, signature_b64u=None)
+    with SessionLocal() as db:
+        ps = db.query(PlatformState).filter(PlatformState.id == 1).first()
+        if ps and ps.platform_seed_enc_b64u and ps.platform_kid:
+            report["platform_kid"] = ps.platform_kid
+            body = {k: v for k, v in report.items() if k != "signature_b64u"}
+            report["signature_b64u"] = sign_b64u(platform_signing_key(ps), json_dumps(body).encode("utf-8"))
+    return report
+
+def audit_chain(tenant_id: str, workers: int = 4, range_events: int = 50_000, resume: dict | None = None) -> dict:
+    # resume: a previous report for the same tenant; picks up after its last_verified_seq
+    started = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    after_seq, anchor = 0, None
+    if resume:
+        if resume.get("tenant_id") != tenant_id:
+            raise ValueError("resume report is for a different tenant")
+        after_seq = int(resume.get("last_verified_seq") or 0)
+        if after_seq:
+            anchor = (after_seq, resume["last_event_hash"])
+
+    with SessionLocal() as db:
+        ranges = plan_ranges(db, tenant_id, after_seq, range_events)
+    tasks = [(tenant_id, lo, hi, cps, anchor) for lo, hi, cps in ranges]
+    if workers <= 1 or len(tasks) <= 1:
+        results = [_audit_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = []
+            for res in pool.map(_audit_task, tasks):
+                results.append(res)
+                log.info("seq %d..%d: %d events, %d errors, %.0f ev/s", res["lo"], res["hi"], res["events"], res["error_count"], res["events"] / max(res["elapsed_s"], 1e-9))
+
+    # stitch: each range must link to the one before it (or to the resumed report / genesis)
+    errors: list[str] = []
+    error_count = 0
+    bad: list[int] = []
+    prev_seq, prev_hash = (after_seq, anchor[1]) if anchor else (0, None)
+    for res in results:
+        errors.extend(res["errors"])
+        error_count += res["error_count"]
+        if res["first_bad_seq"] is not None:
+            bad.append(res["first_bad_seq"])
+        if res["first_seq"] is None:
+            continue
+        msg = None
+        if res["first_seq"] == prev_seq + 1 and res["first_prev"] != prev_hash:
+            msg = f"prev_event_hash does not link to seq {prev_seq}"
+        elif res["first_seq"] > prev_seq + 1:
+            msg = f"gap after seq {prev_seq}"
+        if msg:
+            bad.append(res["first_seq"])
+            errors.append(f"seq {res['first_seq']}: {msg}")
+            error_count += 1
+        prev_seq, prev_hash = res["last_seq"], res["last_hash"]
+
+    events = sum(r["events"] for r in results)
+    last_seq = prev_seq
+    elapsed = time.perf_counter() - t0
+    last_verified = max(min(bad) - 1, after_seq) if bad else last_seq
+    if last_verified == last_seq:
+        last_hash = prev_hash
+    elif anchor and last_verified == after_seq:
+        last_hash = anchor[1]
+    else:
+        # every event up to last_verified passed, so the stored hash there is the verified one
+        with SessionLocal() as db:
+            last_hash = db.execute(select(Event.event_hash).where(Event.tenant_id == tenant_id, Event.seq == last_verified)).scalar()
+    report = {
+        "type": "chain_audit",
+        "tenant_id": tenant_id,
+        "from_seq": ranges[0][0] if ranges else None,
+        "to_seq": last_seq if results else None,
+        "events": events,
+        "ranges": len(results),
+        "checkpoints": sum(r["checkpoints"] for r in results),
+        "ok": not bad,
+        "error_count": error_count,
+        "errors": errors[:MAX_ERRORS],
+        "last_verified_seq": last_verified,
+        "last_event_hash": last_hash,
+        "resumed_from_seq": after_seq or None,
+        "workers": workers,
+        "started_at": started.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "elapsed_s": round(elapsed, 3),
+        "events_per_s": round(events / elapsed, 1) if elapsed > 0 else None,
+    }
+    return sign_report(report)
@@ -1,35 +1,37 @@
-import datetime as dt
-import hashlib
+from __future__ import annotations
 from sqlalchemy.orm import Session
-from fastapi import HTTPException
-from fida.models import TenantState
-from fida.crypto import sign_b64u, ed25519_from_seed_b64
+from fida.cache import TTLCache
 from fida.config import settings
-from fida.crypto import sha256_hex
-from fida.canonical import canonical_json_bytes
-
+from fida.models import Checkpoint
+from fida.schemas import CheckpointOut
+from fida.util import page_hash
 
 def make_export_integrity(items: list[dict]) -> dict:
-    # page_hash over concatenated event_hashes
-    h = hashlib.sha256()
-    for it in items:
-        h.update(bytes.fromhex(it["event_hash"]))
-    return {"page_hash": h.hexdigest()}
+    return {"page_hash": page_hash(it["event_hash"] for it in items)}
+
+_NONE = object()
+_latest = TTLCache(maxsize=settings.latest_checkpoint_cache_size, ttl=settings.latest_checkpoint_ttl_s)
+
+def _checkpoint_out(cp: Checkpoint) -> CheckpointOut:
+    return CheckpointOut(
+        tenant_id=cp.tenant_id,
+        size=cp.leaf_count,
+        root_hash=cp.merkle_root,
+        issued_at=cp.issued_at.isoformat(),
+        platform_kid=cp.platform_kid,
+        signature_b64u=cp.signature_b64u,
+        merkle_alg=cp.merkle_alg
+    )
 
+def latest_checkpoint(db: Session, tenant_id: str) -> CheckpointOut | None:
+    # checkpoints are cut every few thousand events; a short TTL saves the ORDER BY id DESC on every export page
+    hit = _latest.get(tenant_id, _NONE)
+    if hit is not _NONE:
+        return hit
+    cp = db.query(Checkpoint).filter(Checkpoint.tenant_id == tenant_id, Checkpoint.signature_b64u.is_not(None)).order_by(Checkpoint.id.desc()).first()
+    out = _checkpoint_out(cp) if cp else None
+    _latest.set(tenant_id, out)
+    return out
 
-def make_checkpoint(db: Session, tenant_id: str, platform_kid: str) -> dict:
-    st = db.query(TenantState).filter(TenantState.tenant_id == tenant_id).first()
-    if not st:
-        return None
-    issued_at = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-    body = {
-        "tenant_id": tenant_id,
-        "size": int(st.size),
-        "root_hash": st.root_hash,
-        "issued_at": issued_at,
-        "platform_kid": platform_kid,
-    }
-    priv = ed25519_from_seed_b64(settings.platform_signing_key_b64)
-    sig = sign_b64u(priv, canonical_json_bytes(body))
-    body["signature_b64u"] = sig
-    return body
+def invalidate_latest_checkpoint(tenant_id: str) -> None:
+    _latest.pop(tenant_id)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import sys
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m fida.cli")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("checkpoint-worker", help="cut Merkle checkpoints for tenants with a full pending batch")
+    p.add_argument("--once", action="store_true", help="run a single scan and exit")
+
+    p = sub.add_parser("backfill-merkle-levels", help="pack row-per-node checkpoint trees into merkle_levels")
+    p.add_argument("--batch", type=int, default=100, help="checkpoints per transaction")
+    p.add_argument("--drop-rows", action="store_true", help="delete merkle_nodes rows once packed")
+
+    p = sub.add_parser("audit-chain", help="re-verify a tenant ledger end to end and print a signed report")
+    p.add_argument("tenant_id")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    p.add_argument("--range-events", type=int, default=50_000, help="events per work unit (rounded up to checkpoint boundaries)")
+    p.add_argument("--resume", metavar="REPORT", help="continue after last_verified_seq of a previous report")
+    p.add_argument("--out", metavar="FILE", help="write the report here instead of stdout")
+
+    p = sub.add_parser("archive", help="move payloads of old signed checkpoints into segment files (FIDA_ARCHIVE_DIR)")
+    p.add_argument("--batch", type=int, default=20, help="checkpoints per transaction")
+    p.add_argument("--max", type=int, default=0, help="stop after this many checkpoints (0 = all pending)")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    if args.cmd == "checkpoint-worker":
+        from fida.worker import run_checkpoint_worker
+        run_checkpoint_worker(once=args.once)
+    elif args.cmd == "backfill-merkle-levels":
+        from fida.db import SessionLocal
+        from fida.proofs import backfill_packed_levels
+        log = logging.getLogger("fida.cli")
+        total = 0
+        while True:
+            with SessionLocal() as db:
+                ids = backfill_packed_levels(db, limit=args.batch, drop_rows=args.drop_rows)
+                db.commit()
+            if not ids:
+                break
+            total += len(ids)
+            log.info("packed %d checkpoints (through id %d)", total, ids[-1])
+    elif args.cmd == "audit-chain":
+        from fida.chain_audit import audit_chain
+        resume = None
+        if args.resume:
+            with open(args.resume) as f:
+                resume = json.load(f)
+        report = audit_chain(args.tenant_id, workers=args.workers, range_events=args.range_events, resume=resume)
+        out = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(out + "\n")
+        else:
+            print(out)
+        if not report["ok"]:
+            sys.exit(1)
+    elif args.cmd == "archive":
+        from fida.archive import archive_pending
+        from fida.db import SessionLocal
+        log = logging.getLogger("fida.cli")
+        after, total = 0, 0
+        while not args.max or total < args.max:
+            with SessionLocal() as db:
+                last, n = archive_pending(db, args.batch if not args.max else min(args.batch, args.max - total), after_id=after)
+                db.commit()
+            if last is None:
+                break
+            after, total = last, total + n
+            log.info("archived %d checkpoints (through id %d)", total, last)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,64 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Literal
 
 class Settings(BaseSettings):
     fida_env: str = Field(default="dev", alias="FIDA_ENV")
     database_url: str = Field(alias="DATABASE_URL")
     redis_url: str = Field(alias="REDIS_URL")
     fida_master_key_b64: str = Field(alias="FIDA_MASTER_KEY_B64")
+    db_pool_size: int = Field(default=10, alias="FIDA_DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, alias="FIDA_DB_MAX_OVERFLOW")
+    db_pool_timeout_s: float = Field(default=5.0, alias="FIDA_DB_POOL_TIMEOUT_S")
+    db_pool_recycle_s: int = Field(default=1800, alias="FIDA_DB_POOL_RECYCLE_S")
+    # async request engine only: workers and CLI jobs run long statements on the sync engine
+    db_statement_timeout_ms: int = Field(default=5000, alias="FIDA_DB_STATEMENT_TIMEOUT_MS")
     fida_bootstrap_token: str = Field(default="", alias="FIDA_BOOTSTRAP_TOKEN")
     rate_limit_rps: int = Field(default=20, alias="FIDA_RATE_LIMIT_RPS")
     rate_limit_burst: int = Field(default=40, alias="FIDA_RATE_LIMIT_BURST")
+    tenant_rate_limit_rps: int = Field(default=200, alias="FIDA_TENANT_RATE_LIMIT_RPS")
+    tenant_rate_limit_burst: int = Field(default=400, alias="FIDA_TENANT_RATE_LIMIT_BURST")
+    # extra tokens taken per Redis call and spent locally; 0 = every request goes to Redis
+    rate_limit_lease: int = Field(default=0, alias="FIDA_RATE_LIMIT_LEASE")
+    rate_limit_lease_ttl_s: float = Field(default=0.5, alias="FIDA_RATE_LIMIT_LEASE_TTL_S")
+    rate_limit_redis_timeout_s: float = Field(default=0.05, alias="FIDA_RATE_LIMIT_REDIS_TIMEOUT_S")
+    rate_limit_redis_retry_s: float = Field(default=5.0, alias="FIDA_RATE_LIMIT_REDIS_RETRY_S")
     checkpoint_batch_size: int = Field(default=5000, alias="FIDA_CHECKPOINT_BATCH")
+    merkle_storage: Literal["rows", "packed"] = Field(default="packed", alias="FIDA_MERKLE_STORAGE")
+    tenant_log: bool = Field(default=True, alias="FIDA_TENANT_LOG")
+    # node hash for new checkpoints; sha256-hexcat keeps roots verifiable by existing clients
+    merkle_alg: Literal["sha256-hexcat", "sha256-raw"] = Field(default="sha256-hexcat", alias="FIDA_MERKLE_ALG")
+    checkpoint_poll_interval_s: float = Field(default=2.0, alias="FIDA_CHECKPOINT_POLL_S")
+    ledger_single_writer: bool = Field(default=False, alias="FIDA_LEDGER_SINGLE_WRITER")
+    key_cache_size: int = Field(default=1024, alias="FIDA_KEY_CACHE_SIZE")
+    key_cache_ttl_s: float = Field(default=300.0, alias="FIDA_KEY_CACHE_TTL_S")
+    proof_batch_max: int = Field(default=10_000, alias="FIDA_PROOF_BATCH_MAX")
+    latest_checkpoint_ttl_s: float = Field(default=5.0, alias="FIDA_LATEST_CHECKPOINT_TTL_S")
+    latest_checkpoint_cache_size: int = Field(default=10_000, alias="FIDA_LATEST_CHECKPOINT_CACHE_SIZE")
+    audit_queue_max: int = Field(default=10_000, alias="FIDA_AUDIT_QUEUE_MAX")
+    audit_flush_size: int = Field(default=500, alias="FIDA_AUDIT_FLUSH_SIZE")
+    audit_flush_interval_s: float = Field(default=0.5, alias="FIDA_AUDIT_FLUSH_INTERVAL_S")
+    audit_spill_path: str = Field(default="/var/tmp/fida-audit-spill.ndjson", alias="FIDA_AUDIT_SPILL_PATH")
+    auth_cache_size: int = Field(default=10_000, alias="FIDA_AUTH_CACHE_SIZE")
+    auth_cache_ttl_s: float = Field(default=60.0, alias="FIDA_AUTH_CACHE_TTL_S")
+    pubkey_cache_size: int = Field(default=10_000, alias="FIDA_PUBKEY_CACHE_SIZE")
+    keyset_cache_size: int = Field(default=10_000, alias="FIDA_KEYSET_CACHE_SIZE")
+    keyset_refresh_min_s: float = Field(default=1.0, alias="FIDA_KEYSET_REFRESH_MIN_S")
+    verify_batch_max: int = Field(default=10_000, alias="FIDA_VERIFY_BATCH_MAX")
+    verify_workers: int = Field(default=4, alias="FIDA_VERIFY_WORKERS")
+    verify_chunk: int = Field(default=256, alias="FIDA_VERIFY_CHUNK")
     max_body_bytes: int = Field(default=200_000, alias="FIDA_MAX_BODY_BYTES")
+    # coalesce concurrent /issue calls per tenant into one transaction (fida.group_commit)
+    issue_group_commit: bool = Field(default=False, alias="FIDA_ISSUE_GROUP_COMMIT")
+    issue_group_max: int = Field(default=256, alias="FIDA_ISSUE_GROUP_MAX")
+    issue_group_wait_ms: float = Field(default=2.0, alias="FIDA_ISSUE_GROUP_WAIT_MS")
+    # async pool connections the committer may hold at once (groups of different tenants in flight)
+    issue_group_connections: int = Field(default=8, alias="FIDA_ISSUE_GROUP_CONNECTIONS")
+    archive_dir: str = Field(default="/var/lib/fida/segments", alias="FIDA_ARCHIVE_DIR")
+    archive_min_age_s: float = Field(default=86_400.0, alias="FIDA_ARCHIVE_MIN_AGE_S")
+    archive_zlib_level: int = Field(default=6, alias="FIDA_ARCHIVE_ZLIB_LEVEL")
+    archive_open_segments: int = Field(default=256, alias="FIDA_ARCHIVE_OPEN_SEGMENTS")
+    issue_batch_max: int = Field(default=5000, alias="FIDA_ISSUE_BATCH_MAX")
+    max_batch_body_bytes: int = Field(default=20_000_000, alias="FIDA_MAX_BATCH_BODY_BYTES")
 
 settings = Settings()
@@ -28,6 +28,10 @@ def pub_b64u(pub: Ed25519PublicKey) -> str:
 def pub_from_b64u(s: str) -> Ed25519PublicKey:
     return Ed25519PublicKey.from_public_bytes(b64u_decode(s))
 
+def signing_key_from_seed(seed: bytes) -> Ed25519PrivateKey:
+    # seeds are stored as Ed25519 raw private bytes, the same key whose public half we publish
+    return Ed25519PrivateKey.from_private_bytes(seed)
+
 def sign_b64u(priv: Ed25519PrivateKey, msg: bytes) -> str:
     sig = priv.sign(msg)
     return b64u_encode(sig)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+import hashlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+from fida.crypto import sign_b64u
+from fida.db import copy_rows
+from fida.models import Event, LogNode, TreeHead
+from fida.schemas import TreeHeadOut
+from fida.util import json_dumps
+
+# Tenant-wide append-only log, RFC 6962 style: leaf i is event seq i+1, leaf hash = H(0x00 || event_hash),
+# interior = H(0x01 || left || right). Only perfect, aligned subtrees are stored (log_nodes, level >= 1;
+# level 0 is derived from events), which is all that inclusion and consistency proofs ever need.
+LOG_ALG = "rfc6962-sha256"
+LOG_YIELD_PER = 10_000
+
+def leaf_hash(event_hash_hex: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(event_hash_hex)).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+def _split(n: int) -> int:
+    # largest power of two < n (n > 1)
+    return 1 << ((n - 1).bit_length() - 1)
+
+def range_pieces(lo: int, hi: int) -> list[tuple[int, int]]:
+    # perfect aligned subtrees (level, idx) covering leaves [lo, hi) left to right; lo is aligned to the range
+    out = []
+    a = lo
+    for lvl in reversed(range((hi - lo).bit_length())):
+        if (hi - lo) >> lvl & 1:
+            out.append((lvl, a >> lvl))
+            a += 1 << lvl
+    return out
+
+def fold(pieces: list[bytes]) -> bytes:
+    # MTH of a range from its range_pieces(): each split puts the largest perfect subtree on the left
+    acc = pieces[-1]
+    for h in reversed(pieces[:-1]):
+        acc = node_hash(h, acc)
+    return acc
+
+def consistency_ranges(m: int, n: int) -> list[tuple[int, int]]:
+    # RFC 6962 2.1.2 PROOF(m, D[n]) as the leaf ranges whose MTH makes up each proof entry
+    def sub(m: int, lo: int, hi: int, complete: bool) -> list[tuple[int, int]]:
+        if m == hi - lo:
+            return [] if complete else [(lo, hi)]
+        k = _split(hi - lo)
+        if m <= k:
+            return sub(m, lo, lo + k, complete) + [(lo + k, hi)]
+        return sub(m - k, lo + k, hi, False) + [(lo, lo + k)]
+    return sub(m, 0, n, True) if 0 < m < n else []
+
+def verify_consistency(m: int, n: int, first_root: bytes, second_root: bytes, proof: list[bytes]) -> bool:
+    # RFC 9162 2.1.4.2
+    if m == n:
+        return not proof and first_root == second_root
+    if m <= 0 or m > n or not proof:
+        return False
+    if m & (m - 1) == 0:
+        proof = [first_root] + list(proof)
+    fn, sn = m - 1, n - 1
+    while fn & 1:
+        fn >>= 1
+        sn >>= 1
+    fr = sr = proof[0]
+    for c in proof[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr = node_hash(c, fr)
+            sr = node_hash(c, sr)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            sr = node_hash(sr, c)
+        fn >>= 1
+        sn >>= 1
+    return fr == first_root and sr == second_root and sn == 0
+
+def frontier_positions(size: int) -> list[tuple[int, int]]:
+    # the perfect subtrees of a size-leaf log, highest level (leftmost) first
+    return [(lvl, (size >> lvl) - 1) for lvl in reversed(range(size.bit_length())) if size >> lvl & 1]
+
+def fetch_log_nodes(db: Session, tenant_id: str, positions: Iterable[tuple[int, int]]) -> dict[tuple[int, int], bytes]:
+    positions = set(positions)
+    out: dict[tuple[int, int], bytes] = {}
+    leaves = [idx for lvl, idx in positions if lvl == 0]
+    inner = [(lvl, idx) for lvl, idx in positions if lvl > 0]
+    if leaves:
+        for seq, h in db.execute(select(Event.seq, Event.event_hash).where(Event.tenant_id == tenant_id, Event.seq.in_([i + 1 for i in leaves]))):
+            out[(0, int(seq) - 1)] = leaf_hash(h)
+    if inner:
+        for lvl, idx, h in db.execute(
+            select(LogNode.level, LogNode.idx, LogNode.hash).where(LogNode.tenant_id == tenant_id, tuple_(LogNode.level, LogNode.idx).in_(inner))
+        ):
+            out[(lvl, int(idx))] = bytes(h)
+    return out
+
+def log_size(db: Session, tenant_id: str) -> int:
+    return int(db.execute(select(func.max(TreeHead.tree_size)).where(TreeHead.tenant_id == tenant_id)).scalar() or 0)
+
+class _Appender:
+    # pushes leaves onto the log frontier and yields the log_nodes rows for every subtree it completes
+    def __init__(self, tenant_id: str, size: int, frontier: dict[int, bytes]):
+        self.tenant_id = tenant_id
+        self.size = size
+        self.frontier = frontier  # level -> root of the perfect subtree at that set bit
+
+    def push(self, event_hashes: Iterable[str]) -> Iterator[tuple]:
+        for eh in event_hashes:
+            node, lvl = leaf_hash(eh), 0
+            while self.size >> lvl & 1:
+                node = node_hash(self.frontier.pop(lvl), node)
+                lvl += 1
+                yield (self.tenant_id, lvl, ((self.size + 1) >> lvl) - 1, node)
+            self.frontier[lvl] = node
+            self.size += 1
+
+    def root(self) -> bytes:
+        if self.size == 0:
+            return hashlib.sha256(b"").digest()
+        return fold([self.frontier[lvl] for lvl, _ in frontier_positions(self.size)])
+
+def append_log(db: Session, tenant_id: str, event_hashes: list[str], first_seq: int, checkpoint_id: int | None,
+               platform_priv: Ed25519PrivateKey, platform_kid: str) -> TreeHead:
+    # append events first_seq.. (seq order) and sign the new tree head; runs with the checkpoint that covers them
+    size = log_size(db, tenant_id)
+    if size > first_seq - 1:
+        raise ValueError(f"tenant {tenant_id}: log already has {size} leaves, cannot append from seq {first_seq}")
+    nodes = fetch_log_nodes(db, tenant_id, frontier_positions(size))
+    app = _Appender(tenant_id, size, {lvl: nodes[(lvl, idx)] for lvl, idx in frontier_positions(size)})
+    cols = ["tenant_id", "level", "idx", "hash"]
+    if size < first_seq - 1:
+        # checkpoints cut before the log existed: catch up from the events, once
+        missing = db.execute(
+            select(Event.event_hash).where(Event.tenant_id == tenant_id, Event.seq > size, Event.seq < first_seq).order_by(Event.seq.asc())
+            .execution_options(yield_per=LOG_YIELD_PER)
+        ).scalars()
+        copy_rows(db, LogNode.__table__, cols, app.push(missing))
+        if app.size != first_seq - 1:
+            raise ValueError(f"tenant {tenant_id}: seq gap below {first_seq}, log stops at {app.size}")
+    copy_rows(db, LogNode.__table__, cols, app.push(event_hashes))
+
+    head = TreeHead(
+        tenant_id=tenant_id,
+        tree_size=app.size,
+        root_hash=app.root().hex(),
+        checkpoint_id=checkpoint_id,
+        issued_at=datetime.now(timezone.utc),
+        platform_kid=platform_kid,
+    )
+    head.signature_b64u = sign_b64u(platform_priv, tree_head_message(head))
+    db.add(head)
+    return head
+
+def tree_head_message(head: TreeHead) -> bytes:
+    return json_dumps({
+        "tenant_id": head.tenant_id,
+        "tree_size": int(head.tree_size),
+        "root_hash": head.root_hash,
+        "log_alg": LOG_ALG,
+        "issued_at": head.issued_at.astimezone(timezone.utc).isoformat(),
+        "platform_kid": head.platform_kid,
+    }).encode("utf-8")
+
+def tree_head_out(head: TreeHead) -> TreeHeadOut:
+    return TreeHeadOut(
+        tenant_id=head.tenant_id,
+        tree_size=int(head.tree_size),
+        root_hash=head.root_hash,
+        log_alg=LOG_ALG,
+        issued_at=head.issued_at.astimezone(timezone.utc).isoformat(),
+        platform_kid=head.platform_kid,
+        signature_b64u=head.signature_b64u,
+        checkpoint_id=head.checkpoint_id,
+    )
+
+def get_tree_head(db: Session, tenant_id: str, tree_size: int | None = None) -> TreeHead | None:
+    q = db.query(TreeHead).filter(TreeHead.tenant_id == tenant_id)
+    if tree_size is not None:
+        return q.filter(TreeHead.tree_size == tree_size).first()
+    return q.order_by(TreeHead.tree_size.desc()).first()
+
+def consistency_proof(db: Session, tenant_id: str, m: int, n: int) -> list[str]:
+    ranges = consistency_ranges(m, n)
+    pieces = [range_pieces(lo, hi) for lo, hi in ranges]
+    nodes = fetch_log_nodes(db, tenant_id, (p for ps in pieces for p in ps))
+    missing = {p for ps in pieces for p in ps} - set(nodes)
+    if missing:
+        raise LookupError(f"tenant {tenant_id}: log nodes missing: {sorted(missing)[:5]}")
+    return [fold([nodes[p] for p in ps]).hex() for ps in pieces]
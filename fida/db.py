@@ -1,8 +1,23 @@
-from sqlalchemy import create_engine
+import io
+from typing import Iterable, Sequence
+from sqlalchemy import create_engine, insert, Table
+from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
 from fida.config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+def engine_options(url: str) -> dict:
+    # pool sizing only applies to Postgres; sqlite (tests, scripts) keeps SQLAlchemy's defaults
+    if not url.startswith("postgresql"):
+        return {"pool_pre_ping": True}
+    return dict(
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_s,
+        pool_recycle=settings.db_pool_recycle_s,
+    )
+
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 def db_session():
@@ -11,3 +26,37 @@ def db_session():
         yield db
     finally:
         db.close()
+
+def _copy_text(v) -> str:
+    if v is None:
+        return "\\N"
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        # bytea hex input (\x...), with the backslash escaped for COPY's text format
+        return "\\\\x" + bytes(v).hex()
+    return str(v).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def copy_buffer(rows: Iterable[Sequence]) -> io.StringIO:
+    # COPY ... FROM STDIN text format, one line per row
+    buf = io.StringIO()
+    for r in rows:
+        buf.write("\t".join(_copy_text(v) for v in r))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+def copy_rows(db: Session, table: Table, columns: Sequence[str], rows: Iterable[Sequence], chunk: int = 10_000) -> None:
+    # bulk load inside the session's transaction: COPY FROM STDIN on psycopg2, executemany insert elsewhere
+    conn = db.connection()
+    if conn.dialect.driver != "psycopg2":
+        batch = []
+        for r in rows:
+            batch.append(dict(zip(columns, r)))
+            if len(batch) >= chunk:
+                conn.execute(insert(table), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(table), batch)
+        return
+    buf = copy_buffer(rows)
+    with conn.connection.dbapi_connection.cursor() as cur:
+        cur.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", buf)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from fida.config import settings
+from fida.db import engine_options
+
+# Request-path engine for async routes. Same database as fida.db.engine, asyncpg driver; created on first use
+# so importing the app (CLI, tests) does not need asyncpg.
+_engine: AsyncEngine | None = None
+_sessions: async_sessionmaker[AsyncSession] | None = None
+
+def async_url(url: str) -> str:
+    u = make_url(url)
+    if u.get_backend_name() == "postgresql":
+        u = u.set(drivername="postgresql+asyncpg")
+    elif u.get_backend_name() == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    return u.render_as_string(hide_password=False)
+
+def async_engine() -> AsyncEngine:
+    global _engine, _sessions
+    if _engine is None:
+        url = async_url(settings.database_url)
+        opts = engine_options(settings.database_url)
+        if url.startswith("postgresql") and settings.db_statement_timeout_ms:
+            opts["connect_args"] = {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+        _engine = create_async_engine(url, **opts)
+        _sessions = async_sessionmaker(_engine, autoflush=False, expire_on_commit=False)
+    return _engine
+
+def async_sessions() -> async_sessionmaker[AsyncSession]:
+    async_engine()
+    return _sessions
+
+async def async_db_session():
+    async with async_sessions()() as db:
+        yield db
+
+async def dispose_async_engine() -> None:
+    if _engine is not None:
+        await _engine.dispose()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Iterator
+from sqlalchemy import select
+from fida.archive import payload_of
+from fida.db import SessionLocal
+from fida.keys import platform_signing_key
+from fida.models import Checkpoint, Event, PlatformState
+from fida.util import PAGE_HASH_ALG, PageHasher
+from fida.crypto import sign_b64u
+from fida.util import json_dumps
+
+STREAM_YIELD_PER = 1000
+
+EXPORT_COLUMNS = (
+    Event.seq, Event.event_id, Event.issued_at, Event.event_type, Event.payload_hash, Event.event_hash,
+    Event.tenant_id, Event.profile_id, Event.actor_role, Event.object_ref, Event.prev_event_hash,
+    Event.kid, Event.signature_b64u, Event.payload_canon, Event.checkpoint_id, Event.leaf_index,
+)
+
+def _event_line(r, payload_canon: str) -> str:
+    return json_dumps({
+        "type": "event",
+        "seq": int(r.seq),
+        "event_id": r.event_id,
+        "issued_at": r.issued_at.astimezone(timezone.utc).isoformat(),
+        "event_type": r.event_type,
+        "payload_hash": r.payload_hash,
+        "event_hash": r.event_hash,
+        "tenant_id": r.tenant_id,
+        "profile_id": r.profile_id,
+        "actor_role": r.actor_role,
+        "object_ref": r.object_ref,
+        "prev_event_hash": r.prev_event_hash,
+        "kid": r.kid,
+        "signature_b64u": r.signature_b64u,
+        "payload_canon": payload_canon,
+        "checkpoint_id": r.checkpoint_id,
+        "leaf_index": r.leaf_index,
+    }) + "\n"
+
+def _checkpoint_line(cp) -> str:
+    return json_dumps({
+        "type": "checkpoint",
+        "checkpoint_id": int(cp.id),
+        "tenant_id": cp.tenant_id,
+        "from_seq": int(cp.from_seq),
+        "to_seq": int(cp.to_seq),
+        "leaf_count": cp.leaf_count,
+        "root_hash": cp.merkle_root,
+        "merkle_alg": cp.merkle_alg,
+        "page_hash": cp.page_hash,
+        "page_hash_alg": cp.page_hash_alg,
+        "issued_at": cp.issued_at.astimezone(timezone.utc).isoformat(),
+        "platform_kid": cp.platform_kid,
+        "signature_b64u": cp.signature_b64u,
+    }) + "\n"
+
+def stream_ndjson(tenant_id: str, after_seq: int = 0) -> Iterator[str]:
+    # event lines in seq order, each checkpoint line right after the event that closes it, then one signed
+    # integrity record. Both queries run on server-side cursors, so memory does not grow with the ledger.
+    page = PageHasher()
+    from_seq = to_seq = None
+    from_root = to_root = ""
+    prev_hash = None
+    chain_breaks = 0
+    last_cp_id = None
+    with SessionLocal() as db:
+        events = db.execute(
+            select(*EXPORT_COLUMNS).where(Event.tenant_id == tenant_id, Event.seq > after_seq).order_by(Event.seq.asc())
+            .execution_options(yield_per=STREAM_YIELD_PER)
+        )
+        cps = iter(db.execute(
+            select(Checkpoint).where(Checkpoint.tenant_id == tenant_id, Checkpoint.to_seq > after_seq, Checkpoint.signature_b64u.is_not(None)).order_by(Checkpoint.to_seq.asc())
+            .execution_options(yield_per=STREAM_YIELD_PER)
+        ).scalars())
+        cp = next(cps, None)
+        for r in events:
+            if page.size == 0:
+                from_seq = int(r.seq)
+                from_root = r.prev_event_hash or ""
+            elif r.prev_event_hash != prev_hash:
+                chain_breaks += 1
+            page.update(r.event_hash)
+            to_seq = int(r.seq)
+            prev_hash = to_root = r.event_hash
+            yield _event_line(r, payload_of(db, r))
+            while cp is not None and cp.to_seq <= r.seq:
+                last_cp_id = int(cp.id)
+                yield _checkpoint_line(cp)
+                cp = next(cps, None)
+
+        integrity = {
+            "type": "integrity",
+            "tenant_id": tenant_id,
+            "from_seq": from_seq,
+            "to_seq": to_seq,
+            "size": page.size,
+            "from_root": from_root,
+            "to_root": to_root,
+            "page_hash": page.hexdigest(),
+            "page_hash_alg": PAGE_HASH_ALG,
+            "chain_ok": chain_breaks == 0,
+            "last_checkpoint_id": last_cp_id,
+            "issued_at": datetime.now(timezone.utc).isoformat(),
+            "platform_kid": None,
+            "signature_b64u": None,
+        }
+        ps = db.query(PlatformState).filter(PlatformState.id == 1).first()
+        if ps and ps.platform_seed_enc_b64u and ps.platform_kid:
+            integrity["platform_kid"] = ps.platform_kid
+            body = {k: v for k, v in integrity.items() if k != "signature_b64u"}
+            integrity["signature_b64u"] = sign_b64u(platform_signing_key(ps), json_dumps(body).encode("utf-8"))
+    yield json_dumps(integrity) + "\n"
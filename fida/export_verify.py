@@ -0,0 +1,106 @@
+from __future__ import annotations
+import json
+from dataclasses import dataclass, field
+from typing import Iterable
+from fida.util import PageHasher
+
+@dataclass
+class ExportReport:
+    ok: bool = True
+    pages: int = 0
+    events: int = 0
+    first_seq: int | None = None
+    last_seq: int | None = None
+    last_event_hash: str | None = None
+    errors: list[str] = field(default_factory=list)
+
+class ExportVerifier:
+    # client-side, one pass, O(1) state: feed paged ExportEnvelope dicts (GET /export) in cursor order,
+    # or the NDJSON lines of ?fmt=ndjson. With recompute=True every event_hash is rebuilt from its fields.
+    max_errors = 100
+
+    def __init__(self, recompute: bool = False):
+        self.report = ExportReport()
+        self.recompute = recompute
+        self._stream_page: PageHasher | None = None
+        self._stream_first_prev: str | None = None
+
+    def _fail(self, msg: str) -> None:
+        self.report.ok = False
+        if len(self.report.errors) < self.max_errors:
+            self.report.errors.append(msg)
+
+    def _event(self, it: dict) -> None:
+        r = self.report
+        seq = int(it["seq"])
+        if r.last_seq is not None:
+            if seq != r.last_seq + 1:
+                self._fail(f"seq {seq}: expected {r.last_seq + 1}")
+            if it.get("prev_event_hash") != r.last_event_hash:
+                self._fail(f"seq {seq}: prev_event_hash does not link to seq {r.last_seq}")
+        elif r.first_seq is None:
+            r.first_seq = seq
+        if self.recompute:
+            from fida.canonical import hash_canon
+            from fida.ledger import compute_event_hash
+            if it.get("payload_canon") is not None and hash_canon(it["payload_canon"]) != it["payload_hash"]:
+                self._fail(f"seq {seq}: payload_hash mismatch")
+            computed = compute_event_hash(it["tenant_id"], seq, it["issued_at"], it["profile_id"], it["event_type"], it["actor_role"], it["object_ref"], it["payload_hash"], it.get("prev_event_hash"))
+            if computed != it["event_hash"]:
+                self._fail(f"seq {seq}: event_hash mismatch")
+        r.events += 1
+        r.last_seq = seq
+        r.last_event_hash = it["event_hash"]
+
+    def feed_page(self, env: dict) -> None:
+        items = env.get("items") or []
+        integ = env["integrity"]
+        page = PageHasher()
+        for it in items:
+            page.update(it["event_hash"])
+        n = self.report.pages
+        if page.hexdigest() != integ["page_hash"]:
+            self._fail(f"page {n}: page_hash mismatch")
+        if integ["size"] != len(items):
+            self._fail(f"page {n}: size {integ['size']} != {len(items)} items")
+        if items:
+            if (items[0].get("prev_event_hash") or "") != integ["from_root"]:
+                self._fail(f"page {n}: from_root mismatch")
+            if items[-1]["event_hash"] != integ["to_root"]:
+                self._fail(f"page {n}: to_root mismatch")
+        for it in items:
+            self._event(it)
+        self.report.pages += 1
+
+    def feed_line(self, line: str | bytes) -> None:
+        rec = json.loads(line)
+        kind = rec.get("type")
+        if kind == "event":
+            if self._stream_page is None:
+                self._stream_page = PageHasher()
+                self._stream_first_prev = rec.get("prev_event_hash") or ""
+            self._stream_page.update(rec["event_hash"])
+            self._event(rec)
+        elif kind == "integrity":
+            page = self._stream_page or PageHasher()
+            if page.hexdigest() != rec["page_hash"]:
+                self._fail("stream: page_hash mismatch")
+            if rec["size"] != page.size:
+                self._fail(f"stream: size {rec['size']} != {page.size} events")
+            if page.size and (rec["from_root"] != self._stream_first_prev or rec["to_root"] != self.report.last_event_hash):
+                self._fail("stream: from_root/to_root mismatch")
+            self.report.pages += 1
+            self._stream_page = None
+
+def verify_export(pages: Iterable[dict], recompute: bool = False) -> ExportReport:
+    v = ExportVerifier(recompute=recompute)
+    for env in pages:
+        v.feed_page(env)
+    return v.report
+
+def verify_export_ndjson(lines: Iterable[str | bytes], recompute: bool = False) -> ExportReport:
+    v = ExportVerifier(recompute=recompute)
+    for line in lines:
+        if line.strip():
+            v.feed_line(line)
+    return v.report
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from fida.audit import audit
+from fida.config import settings
+from fida.db_async import async_sessions
+from fida.keys import tenant_signing_key
+from fida.ledger import issue_event, issue_events_batch
+from fida.models import Tenant
+
+log = logging.getLogger("fida.group_commit")
+
+class UnknownTenant(LookupError):
+    pass
+
+class CommitFailed(Exception):
+    # raised by COMMIT itself: the group may or may not be durable, so its items must not be issued again
+    pass
+
+@dataclass
+class PendingIssue:
+    item: dict  # IssueRequest fields: payload, profile_id, event_type, actor_role, object_ref
+    idem_key: str | None
+    actor: str
+    ip: str | None
+    ua: str | None
+    future: asyncio.Future = field(default=None)
+
+@dataclass
+class _Lane:
+    pending: list[PendingIssue] = field(default_factory=list)
+    full: asyncio.Event = field(default_factory=asyncio.Event)
+    # the loop only keeps weak references to tasks; the lane (held in _lanes until the drain ends) keeps this one
+    drain: asyncio.Task | None = None
+
+class GroupCommitter:
+    # Concurrent /issue calls for one tenant queue up in that tenant's lane; one drain task per busy tenant takes
+    # up to max_items (waiting at most wait_s for more), chains and signs them under a single head lock with
+    # issue_events_batch and commits once. Each caller is answered only after that commit, as before.
+    # If a group fails before COMMIT, its items are retried one transaction each so one bad item cannot fail its
+    # neighbours; if COMMIT itself fails, every waiter gets the error. Callers hold no connection while they wait;
+    # the committer holds at most `connections` at a time.
+    def __init__(self, max_items: int, wait_s: float, connections: int = 8):
+        self.max_items = max_items
+        self.wait_s = wait_s
+        self._lanes: dict[str, _Lane] = {}
+        self._connections = asyncio.Semaphore(connections)
+
+    async def submit(self, tenant_id: str, p: PendingIssue) -> tuple[str, bool]:
+        p.future = asyncio.get_running_loop().create_future()
+        lane = self._lanes.get(tenant_id)
+        if lane is None:
+            lane = self._lanes[tenant_id] = _Lane()
+            lane.drain = asyncio.create_task(self._drain(tenant_id, lane))
+        lane.pending.append(p)
+        if len(lane.pending) >= self.max_items:
+            lane.full.set()
+        # shield: a client that disconnects must not cancel the group it is part of
+        return await asyncio.shield(p.future)
+
+    async def _drain(self, tenant_id: str, lane: _Lane) -> None:
+        try:
+            while lane.pending:
+                if len(lane.pending) < self.max_items and self.wait_s > 0:
+                    try:
+                        await asyncio.wait_for(lane.full.wait(), self.wait_s)
+                    except asyncio.TimeoutError:
+                        pass
+                batch, lane.pending = lane.pending[:self.max_items], lane.pending[self.max_items:]
+                if len(lane.pending) < self.max_items:
+                    lane.full.clear()
+                await self._commit(tenant_id, batch)
+        finally:
+            # nothing awaits between the last emptiness check and here, so no submit can slip in
+            del self._lanes[tenant_id]
+            for p in lane.pending:
+                if not p.future.done():
+                    p.future.set_exception(RuntimeError("issuance lane stopped"))
+
+    async def _commit(self, tenant_id: str, batch: list[PendingIssue]) -> None:
+        try:
+            out = await self.issue_group(tenant_id, batch)
+        except (CommitFailed, UnknownTenant) as e:
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+        except Exception as e:
+            log.warning("group of %d for tenant %s failed, issuing one by one: %s", len(batch), tenant_id, e)
+            for p in batch:
+                try:
+                    res = (await self.issue_group(tenant_id, [p]))[0]
+                except Exception as e1:
+                    if not p.future.done():
+                        p.future.set_exception(e1)
+                    continue
+                if not p.future.done():
+                    p.future.set_result(res)
+            return
+        for p, res in zip(batch, out):
+            if not p.future.done():
+                p.future.set_result(res)
+
+    async def issue_group(self, tenant_id: str, batch: list[PendingIssue]) -> list[tuple[str, bool]]:
+        async with self._connections, async_sessions()() as db:
+            tenant = await db.scalar(select(Tenant).where(Tenant.tenant_id == tenant_id))
+            if tenant is None:
+                raise UnknownTenant(tenant_id)
+
+            def work(s: Session) -> list[tuple[str, bool]]:
+                priv = tenant_signing_key(tenant)
+                if len(batch) == 1:
+                    p = batch[0]
+                    it = p.item
+                    out = [issue_event(s, tenant, it["payload"], it["profile_id"], it["event_type"], it["actor_role"], it["object_ref"], p.idem_key, priv)]
+                else:
+                    out = issue_events_batch(s, tenant, [p.item for p in batch], [p.idem_key for p in batch], priv)
+                for p, (_, hit) in zip(batch, out):
+                    audit(s, actor=p.actor, action="issue_event", tenant_id=tenant_id, meta={"idem":bool(p.idem_key),"idem_hit":hit,"group":len(batch)}, ip=p.ip, ua=p.ua)
+                return out
+
+            out = await db.run_sync(work)
+            try:
+                await db.commit()
+            except Exception as e:
+                raise CommitFailed(f"group of {len(batch)} for tenant {tenant_id}: commit failed: {e}") from e
+            return out
+
+_committer: GroupCommitter | None = None
+
+def group_committer() -> GroupCommitter:
+    global _committer
+    if _committer is None:
+        _committer = GroupCommitter(settings.issue_group_max, settings.issue_group_wait_ms / 1000, settings.issue_group_connections)
+    return _committer
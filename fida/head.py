@@ -0,0 +1,140 @@
+from __future__ import annotations
+import threading
+from dataclasses import dataclass, field
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from fida.config import settings
+from fida.merkle import MERKLE_HEX, frontier_push, pack_frontier, unpack_frontier
+from fida.models import Checkpoint, Event, TenantHead
+
+FRONTIER_REBUILD_YIELD_PER = 10_000
+
+@dataclass
+class Head:
+    tenant_id: str
+    next_seq: int
+    last_event_hash: str | None
+    frontier: list[bytes | None] = field(default_factory=list)
+    frontier_size: int = 0
+    frontier_alg: str = MERKLE_HEX
+    cached: bool = False
+
+class HeadCache:
+    # process-local copy of tenant heads, only consulted with FIDA_LEDGER_SINGLE_WRITER.
+    # writes are still compare-and-set against tenant_heads, so a stale entry costs a retry, never a fork.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heads: dict[str, Head] = {}
+
+    def get(self, tenant_id: str) -> Head | None:
+        with self._lock:
+            h = self._heads.get(tenant_id)
+            return Head(h.tenant_id, h.next_seq, h.last_event_hash, list(h.frontier), h.frontier_size, h.frontier_alg, cached=True) if h else None
+
+    def put(self, head: Head):
+        with self._lock:
+            self._heads[head.tenant_id] = head
+
+    def invalidate(self, tenant_id: str):
+        with self._lock:
+            self._heads.pop(tenant_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._heads.clear()
+
+head_cache = HeadCache()
+
+def _select_for_update(db: Session, tenant_id: str):
+    return db.execute(
+        select(TenantHead.next_seq, TenantHead.last_event_hash, TenantHead.frontier, TenantHead.frontier_size, TenantHead.frontier_alg)
+        .where(TenantHead.tenant_id == tenant_id).with_for_update()
+    ).first()
+
+def _rebuild_frontier(db: Session, tenant_id: str, next_seq: int, alg: str) -> tuple[list[bytes | None], int]:
+    # one-off for heads written before the frontier existed (or after FIDA_MERKLE_ALG changed):
+    # replay everything after the last cut
+    last_cut = db.execute(select(func.max(Checkpoint.to_seq)).where(Checkpoint.tenant_id == tenant_id)).scalar() or 0
+    frontier: list[bytes | None] = []
+    size = 0
+    rows = db.execute(
+        select(Event.event_hash).where(Event.tenant_id == tenant_id, Event.seq > last_cut, Event.seq < next_seq).order_by(Event.seq.asc())
+        .execution_options(yield_per=FRONTIER_REBUILD_YIELD_PER)
+    )
+    for (h,) in rows:
+        size = frontier_push(frontier, size, bytes.fromhex(h), alg)
+    db.execute(
+        update(TenantHead).where(TenantHead.tenant_id == tenant_id)
+        .values(frontier=pack_frontier(frontier), frontier_size=size, frontier_alg=alg)
+        .execution_options(synchronize_session=False)
+    )
+    return frontier, size
+
+def lock_head(db: Session, tenant_id: str) -> Head:
+    # row lock serializes issuers of one tenant until commit/rollback
+    row = _select_for_update(db, tenant_id)
+    if row is None:
+        # tenant predates tenant_heads (or was created without one): seed from the ledger once
+        last = db.query(Event.seq, Event.event_hash).filter(Event.tenant_id == tenant_id).order_by(Event.seq.desc()).first()
+        db.execute(pg_insert(TenantHead).values(
+            tenant_id=tenant_id,
+            next_seq=int(last.seq) + 1 if last else 1,
+            last_event_hash=last.event_hash if last else None,
+        ).on_conflict_do_nothing(index_elements=["tenant_id"]))
+        row = _select_for_update(db, tenant_id)
+    next_seq = int(row.next_seq)
+    alg = row.frontier_alg or MERKLE_HEX
+    if row.frontier_size is None or (alg != settings.merkle_alg and row.frontier_size > 0):
+        alg = settings.merkle_alg
+        frontier, size = _rebuild_frontier(db, tenant_id, next_seq, alg)
+    else:
+        size = int(row.frontier_size)
+        frontier = unpack_frontier(bytes(row.frontier or b""), size)
+        if size == 0:
+            alg = settings.merkle_alg
+    return Head(tenant_id=tenant_id, next_seq=next_seq, last_event_hash=row.last_event_hash, frontier=frontier, frontier_size=size, frontier_alg=alg)
+
+def reserve_head(db: Session, tenant_id: str, use_cache: bool = True) -> Head:
+    if use_cache and settings.ledger_single_writer:
+        cached = head_cache.get(tenant_id)
+        if cached:
+            return cached
+    return lock_head(db, tenant_id)
+
+def _cas(head: Head):
+    # frontier_size is part of the check so a checkpoint cut elsewhere also invalidates a cached head
+    return (
+        TenantHead.tenant_id == head.tenant_id,
+        TenantHead.next_seq == head.next_seq,
+        TenantHead.last_event_hash.is_not_distinct_from(head.last_event_hash),
+        TenantHead.frontier_size == head.frontier_size,
+    )
+
+def advance_head(db: Session, head: Head, event_hashes: list[str]) -> bool:
+    # compare-and-set: appends the new events (seq order) only if nobody moved the head since it was read
+    frontier = list(head.frontier)
+    size = head.frontier_size
+    for h in event_hashes:
+        size = frontier_push(frontier, size, bytes.fromhex(h), head.frontier_alg)
+    nxt = Head(head.tenant_id, head.next_seq + len(event_hashes), event_hashes[-1], frontier, size, head.frontier_alg)
+    res = db.execute(
+        update(TenantHead).where(*_cas(head))
+        .values(next_seq=nxt.next_seq, last_event_hash=nxt.last_event_hash, frontier=pack_frontier(frontier), frontier_size=size, frontier_alg=head.frontier_alg)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        head_cache.invalidate(head.tenant_id)
+        return False
+    if settings.ledger_single_writer:
+        head_cache.put(nxt)
+    return True
+
+def cut_frontier(db: Session, head: Head) -> None:
+    # caller holds the row lock (lock_head); everything pending now belongs to a checkpoint
+    db.execute(
+        update(TenantHead).where(*_cas(head))
+        .values(frontier=b"", frontier_size=0)
+        .execution_options(synchronize_session=False)
+    )
+    head_cache.invalidate(head.tenant_id)
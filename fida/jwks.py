@@ -1,8 +1,10 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 from fida.db import db_session
-from fida.models import PlatformState, Tenant
+from fida.keys import tenant_keyset
+from fida.models import PlatformState
 
 router = APIRouter(tags=["jwks"])
 
@@ -15,8 +17,12 @@ def platform_jwks(db: Session = Depends(db_session)):
     return {"keys":[{"kty":"OKP","crv":"Ed25519","kid":ps.platform_kid,"x":ps.platform_pub_b64u}]}
 
 @router.get("/tenants/{tenant_id}/.well-known/jwks.json")
-def tenant_jwks(tenant_id: str, db: Session = Depends(db_session)):
-    t = db.query(Tenant).filter(Tenant.tenant_id == tenant_id).first()
-    if not t:
+def tenant_jwks(tenant_id: str, if_none_match: str | None = Header(default=None, alias="if-none-match"), db: Session = Depends(db_session)):
+    # every key the tenant has signed with, active first; served from the keyset cache
+    ks = tenant_keyset(db, tenant_id)
+    if ks is None:
         raise HTTPException(status_code=404, detail="Unknown tenant")
-    return {"keys":[{"kty":"OKP","crv":"Ed25519","kid":t.active_kid,"x":t.pub_b64u}]}
+    headers = {"ETag": ks.etag, "Cache-Control": "public, max-age=60"}
+    if if_none_match and ks.etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(ks.jwks, headers=headers)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import hashlib
+import time
+from dataclasses import dataclass
+from sqlalchemy.orm import Session
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from fida.cache import TTLCache
+from fida.config import settings
+from fida.crypto import envelope_decrypt, pub_from_b64u, signing_key_from_seed
+from fida.models import PlatformState, Tenant, TenantKey
+from fida.util import json_dumps
+
+PLATFORM = "__platform__"
+
+class _CachedSigningKey:
+    __slots__ = ("priv",)
+
+    def __init__(self, priv: Ed25519PrivateKey):
+        self.priv = priv
+
+def _zeroize(key, entry: _CachedSigningKey):
+    # dropping the last reference frees the EVP_PKEY; OpenSSL cleanses ed25519 private material on free
+    entry.priv = None
+
+signing_keys = TTLCache(maxsize=settings.key_cache_size, ttl=settings.key_cache_ttl_s, on_evict=_zeroize)
+
+def signing_key(owner: str, kid: str, seed_enc_b64u: str) -> Ed25519PrivateKey:
+    entry = signing_keys.get((owner, kid))
+    if entry is not None:
+        return entry.priv
+    priv = signing_key_from_seed(envelope_decrypt(settings.fida_master_key_b64, seed_enc_b64u))
+    signing_keys.set((owner, kid), _CachedSigningKey(priv))
+    return priv
+
+def tenant_signing_key(tenant: Tenant) -> Ed25519PrivateKey:
+    return signing_key(tenant.tenant_id, tenant.active_kid, tenant.seed_enc_b64u)
+
+def platform_signing_key(ps: PlatformState) -> Ed25519PrivateKey:
+    return signing_key(PLATFORM, ps.platform_kid, ps.platform_seed_enc_b64u)
+
+def evict_signing_keys(owner: str, kid: str | None = None) -> int:
+    # rotation hook: drop one kid, or every cached kid of an owner
+    if kid is not None:
+        public_keys.pop((owner, kid))
+        keysets.pop(owner)
+        return int(signing_keys.pop((owner, kid)))
+    public_keys.evict_where(lambda k: k[0] == owner)
+    keysets.pop(owner)
+    return signing_keys.evict_where(lambda k: k[0] == owner)
+
+public_keys = TTLCache(maxsize=settings.pubkey_cache_size, ttl=settings.key_cache_ttl_s)
+
+def public_key(owner: str, kid: str, pub_b64u: str) -> Ed25519PublicKey:
+    pub = public_keys.get((owner, kid))
+    if pub is None:
+        pub = pub_from_b64u(pub_b64u)
+        public_keys.set((owner, kid), pub)
+    return pub
+
+@dataclass(frozen=True)
+class TenantKeyset:
+    keys: dict[str, Ed25519PublicKey]
+    jwks: dict
+    etag: str
+    loaded_at: float
+
+keysets = TTLCache(maxsize=settings.keyset_cache_size, ttl=settings.key_cache_ttl_s)
+
+def _jwk(k: TenantKey) -> dict:
+    return {"kty":"OKP","crv":"Ed25519","use":"sig","kid":k.kid,"x":k.pub_b64u}
+
+def _load_keyset(db: Session, tenant_id: str) -> TenantKeyset | None:
+    rows = db.query(TenantKey).filter(TenantKey.tenant_id == tenant_id).order_by(TenantKey.created_at.desc(), TenantKey.kid).all()
+    if not rows:
+        return None
+    # active key first so clients that only read keys[0] keep working
+    rows.sort(key=lambda k: k.status != "active")
+    jwks = {"keys": [_jwk(k) for k in rows]}
+    etag = '"' + hashlib.sha256(json_dumps(jwks).encode("utf-8")).hexdigest()[:32] + '"'
+    return TenantKeyset(
+        keys={k.kid: public_key(tenant_id, k.kid, k.pub_b64u) for k in rows},
+        jwks=jwks,
+        etag=etag,
+        loaded_at=time.monotonic(),
+    )
+
+def tenant_keyset(db: Session, tenant_id: str, refresh: bool = False) -> TenantKeyset | None:
+    ks = None if refresh else keysets.get(tenant_id)
+    if ks is None:
+        ks = _load_keyset(db, tenant_id)
+        if ks is not None:
+            keysets.set(tenant_id, ks)
+    return ks
+
+def tenant_verify_key(db: Session, tenant_id: str, kid: str) -> tuple[bool, Ed25519PublicKey | None]:
+    # (tenant known, key for kid). An unknown kid reloads the keyset once in case it was rotated on another
+    # node, but at most every keyset_refresh_min_s so made-up kids cannot turn into a query per receipt.
+    ks = tenant_keyset(db, tenant_id)
+    if ks is not None and kid in ks.keys:
+        return True, ks.keys[kid]
+    if ks is None or time.monotonic() - ks.loaded_at >= settings.keyset_refresh_min_s:
+        ks = tenant_keyset(db, tenant_id, refresh=True)
+    if ks is None:
+        return False, None
+    return True, ks.keys.get(kid)
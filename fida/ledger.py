@@ -1,36 +1,29 @@
 from __future__ import annotations
 from datetime import datetime, timezone
 import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from fida.models import Event, Tenant, Idempotency, Checkpoint, MerkleNode, PlatformState
+from sqlalchemy import and_, insert, select, update
+from fida.models import Event, Tenant, Idempotency, Checkpoint
 from fida.config import settings
-from fida.canonical import canonicalize, hash_canon
-from fida.util import sha256_hex, json_dumps
-from fida.crypto import pub_from_b64u, sign_b64u, verify as sig_verify, envelope_decrypt
-from fida.merkle import build_merkle
+from fida.proofs import store_tree
+from fida.ctlog import append_log
+from fida.checkpoint import page_hash as compute_page_hash, invalidate_latest_checkpoint
+from fida.canonical import canonicalize_hashed
+from fida.util import PAGE_HASH_ALG, sha256_hex, json_dumps
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from fida.crypto import sign_b64u, verify as sig_verify
+from fida.keys import tenant_verify_key
+from fida.merkle import MERKLE_HEX, build_levels, frontier_root, pack_hex
+from fida.head import reserve_head, advance_head, lock_head, cut_frontier
 from fida.util import b64u_decode
 
 def compute_event_hash(tenant_id: str, seq: int, issued_at: str, profile_id: str, event_type: str, actor_role: str, object_ref: str, payload_hash: str, prev_event_hash: str | None) -> str:
     parts = [tenant_id, str(seq), issued_at, profile_id, event_type, actor_role, object_ref, payload_hash, prev_event_hash or ""]
     return sha256_hex("|".join(parts).encode("utf-8"))
 
-def issue_event(db: Session, tenant: Tenant, payload: dict, profile_id: str, event_type: str, actor_role: str, object_ref: str, idem_key: str | None, tenant_priv_seed: bytes):
-    # idempotency
-    if idem_key:
-        found = db.query(Idempotency).filter(and_(Idempotency.tenant_id == tenant.tenant_id, Idempotency.idem_key == idem_key)).first()
-        if found:
-            return found.receipt_json, True
-
-    canon = canonicalize(payload)
-    payload_hash = hash_canon(canon)
-
-    last = db.query(func.max(Event.seq)).filter(Event.tenant_id == tenant.tenant_id).scalar()
-    seq = int(last or 0) + 1
-
-    prev = db.query(Event).filter(and_(Event.tenant_id == tenant.tenant_id, Event.seq == seq - 1)).first()
-    prev_event_hash = prev.event_hash if prev else None
-
+def _seal_event(tenant: Tenant, priv: Ed25519PrivateKey, seq: int, prev_event_hash: str | None, canon: str, payload_hash: str, profile_id: str, event_type: str, actor_role: str, object_ref: str) -> tuple[dict, dict]:
     issued_at_dt = datetime.now(timezone.utc)
     issued_at = issued_at_dt.isoformat()
 
@@ -46,12 +39,6 @@ def issue_event(db: Session, tenant: Tenant, payload: dict, profile_id: str, eve
         prev_event_hash=prev_event_hash
     )
 
-    # derive ed25519 key from seed (simple deterministic derivation for v1; in tier0 you can store encrypted seed and rehydrate)
-    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
-    import hashlib
-    seed32 = hashlib.sha256(tenant_priv_seed).digest()[:32]
-    priv = Ed25519PrivateKey.from_private_bytes(seed32)
-
     msg = json_dumps({
         "version":"FES-1.0",
         "tenant_id": tenant.tenant_id,
@@ -75,7 +62,7 @@ def issue_event(db: Session, tenant: Tenant, payload: dict, profile_id: str, eve
 
     signature_b64u = sign_b64u(priv, msg)
 
-    row = Event(
+    row = dict(
         tenant_id=tenant.tenant_id,
         seq=seq,
         event_id=event_id,
@@ -93,7 +80,6 @@ def issue_event(db: Session, tenant: Tenant, payload: dict, profile_id: str, eve
         checkpoint_id=None,
         leaf_index=None,
     )
-    db.add(row)
 
     receipt = {
         "version":"FES-1.0",
@@ -113,6 +99,28 @@ def issue_event(db: Session, tenant: Tenant, payload: dict, profile_id: str, eve
         "canon_alg": "RFC8785",
         "hash_alg": "SHA-256",
     }
+    return row, receipt
+
+def issue_event(db: Session, tenant: Tenant, payload: dict, profile_id: str, event_type: str, actor_role: str, object_ref: str, idem_key: str | None, tenant_priv: Ed25519PrivateKey):
+    # idempotency
+    if idem_key:
+        found = db.query(Idempotency).filter(and_(Idempotency.tenant_id == tenant.tenant_id, Idempotency.idem_key == idem_key)).first()
+        if found:
+            return found.receipt_json, True
+
+    canon, payload_hash = canonicalize_hashed(payload)
+
+    # seq + prev_event_hash come from the tenant head; a cached head that turns out stale
+    # fails the compare-and-set and we redo the event against the locked row
+    for use_cache in (True, False):
+        head = reserve_head(db, tenant.tenant_id, use_cache=use_cache)
+        row, receipt = _seal_event(tenant, tenant_priv, head.next_seq, head.last_event_hash, canon, payload_hash, profile_id, event_type, actor_role, object_ref)
+        if advance_head(db, head, [row["event_hash"]]):
+            break
+    else:
+        raise RuntimeError(f"tenant head for {tenant.tenant_id} moved under lock")
+
+    db.add(Event(**row))
     receipt_json = json_dumps(receipt)
 
     if idem_key:
@@ -120,15 +128,76 @@ def issue_event(db: Session, tenant: Tenant, payload: dict, profile_id: str, eve
 
     return receipt_json, False
 
-def verify_receipt(db: Session, tenant: Tenant, receipt: dict) -> dict:
-    # recompute hash validity
-    # signature validity uses tenant pub key from tenant record
-    pub = pub_from_b64u(tenant.pub_b64u)
+class PayloadTooLarge(ValueError):
+    def __init__(self, index: int, size: int, limit: int):
+        super().__init__(f"item {index}: canonical payload is {size} bytes, limit {limit}")
+        self.index = index
+
+def issue_events_batch(db: Session, tenant: Tenant, items: list[dict], idem_keys: list[str | None], tenant_priv: Ed25519PrivateKey, max_payload_bytes: int | None = None) -> list[tuple[str, bool]]:
+    # one head lock for the whole batch: seqs are contiguous and hashes are chained in memory
+    keys = [k for k in idem_keys if k]
+    found = {}
+    if keys:
+        for r in db.query(Idempotency).filter(and_(Idempotency.tenant_id == tenant.tenant_id, Idempotency.idem_key.in_(keys))).all():
+            found[r.idem_key] = r.receipt_json
+
+    canon = [None if (k and k in found) else canonicalize_hashed(it["payload"]) for it, k in zip(items, idem_keys)]
+    if max_payload_bytes:
+        # the per-event limit /issue gets from its body cap; a batch body is only capped as a whole
+        for i, c in enumerate(canon):
+            size = len(c[0].encode("utf-8")) if c is not None else 0
+            if size > max_payload_bytes:
+                raise PayloadTooLarge(i, size, max_payload_bytes)
 
+    for use_cache in (True, False):
+        head = reserve_head(db, tenant.tenant_id, use_cache=use_cache)
+        seq, prev = head.next_seq, head.last_event_hash
+        rows, idem_rows, out, fresh = [], [], [], {}
+        for it, k, c in zip(items, idem_keys, canon):
+            if k and k in found:
+                out.append((found[k], True))
+                continue
+            if k and k in fresh:
+                # same key twice in one batch: second one replays the first
+                out.append((fresh[k], True))
+                continue
+            row, receipt = _seal_event(tenant, tenant_priv, seq, prev, c[0], c[1], it["profile_id"], it["event_type"], it["actor_role"], it["object_ref"])
+            receipt_json = json_dumps(receipt)
+            rows.append(row)
+            if k:
+                fresh[k] = receipt_json
+                idem_rows.append(dict(tenant_id=tenant.tenant_id, idem_key=k, receipt_json=receipt_json))
+            out.append((receipt_json, False))
+            seq, prev = seq + 1, row["event_hash"]
+        if not rows or advance_head(db, head, [r["event_hash"] for r in rows]):
+            break
+    else:
+        raise RuntimeError(f"tenant head for {tenant.tenant_id} moved under lock")
+
+    if rows:
+        db.execute(insert(Event), rows)
+    if idem_rows:
+        db.execute(insert(Idempotency), idem_rows)
+    return out
+
+def verify_receipt(db: Session, tenant_id: str, receipt: dict) -> dict:
+    # the receipt's kid picks the key, so receipts signed before a rotation still verify
+    known, pub = tenant_verify_key(db, tenant_id, str(receipt.get("kid")))
+    if not known:
+        return _reject("unknown_tenant")
+    if pub is None:
+        return _reject("unknown_kid")
+    return verify_receipt_with_key(pub, receipt)
+
+def _reject(reason: str) -> dict:
+    return {"valid": False, "reason_codes":[reason], "signature_valid": False, "hash_valid": False, "chain_hint_ok": False, "computed_event_hash": None}
+
+def verify_receipt_with_key(pub: Ed25519PublicKey, receipt: dict) -> dict:
+    # recompute hash validity
     required = ["tenant_id","event_id","seq","issued_at","profile_id","event_type","actor_role","object_ref","payload_hash","event_hash","kid","signature_b64u"]
     missing = [k for k in required if k not in receipt]
     if missing:
-        return {"valid": False, "reason_codes":[f"missing:{','.join(missing)}"], "signature_valid": False, "hash_valid": False, "chain_hint_ok": False, "computed_event_hash": None}
+        return _reject(f"missing:{','.join(missing)}")
 
     computed = compute_event_hash(
         tenant_id=receipt["tenant_id"],
@@ -177,63 +246,114 @@ def verify_receipt(db: Session, tenant: Tenant, receipt: dict) -> dict:
         "computed_event_hash": computed,
     }
 
-def maybe_checkpoint(db: Session, tenant_id: str, platform_priv_seed: bytes, platform_kid: str):
-    # create checkpoint every N events without checkpoint
-    pending = db.query(Event).filter(Event.tenant_id == tenant_id, Event.checkpoint_id.is_(None)).order_by(Event.seq.asc()).limit(settings.checkpoint_batch_size).all()
-    if len(pending) < settings.checkpoint_batch_size:
-        return None
+_verify_pool: ThreadPoolExecutor | None = None
+_verify_pool_lock = threading.Lock()
 
-    from_seq = int(pending[0].seq)
-    to_seq = int(pending[-1].seq)
+def _pool() -> ThreadPoolExecutor:
+    global _verify_pool
+    with _verify_pool_lock:
+        if _verify_pool is None:
+            _verify_pool = ThreadPoolExecutor(max_workers=settings.verify_workers, thread_name_prefix="fida-verify")
+        return _verify_pool
 
-    leaves = [e.event_hash for e in pending]
-    root, layers = build_merkle(leaves)
+def verify_receipts(db: Session, receipts: list[dict]) -> list[dict]:
+    # keys are resolved up front per (tenant, kid); worker threads only hash and verify
+    # (cryptography drops the GIL in Ed25519 verify)
+    keys: dict[tuple, tuple[bool, Ed25519PublicKey | None]] = {}
+    for r in receipts:
+        k = (r.get("tenant_id"), str(r.get("kid")))
+        if k not in keys:
+            keys[k] = tenant_verify_key(db, *k)
 
-    # page hash = hash of concatenated event_hashes (simple integrity of export page)
-    page_hash = sha256_hex(("|".join(leaves)).encode("utf-8"))
+    def one(r: dict) -> dict:
+        known, pub = keys[(r.get("tenant_id"), str(r.get("kid")))]
+        if not known:
+            return _reject("unknown_tenant")
+        if pub is None:
+            return _reject("unknown_kid")
+        return verify_receipt_with_key(pub, r)
 
-    # sign checkpoint with platform key derived from seed
-    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
-    import hashlib
-    seed32 = hashlib.sha256(platform_priv_seed).digest()[:32]
-    priv = Ed25519PrivateKey.from_private_bytes(seed32)
+    def run(chunk: list[dict]) -> list[dict]:
+        return [one(r) for r in chunk]
 
-    issued_at_dt = datetime.now(timezone.utc)
-    issued_at = issued_at_dt.isoformat()
-    msg = json_dumps({
-        "tenant_id": tenant_id,
-        "from_seq": from_seq,
-        "to_seq": to_seq,
-        "leaf_count": len(leaves),
-        "root_hash": root,
-        "page_hash": page_hash,
-        "issued_at": issued_at,
-        "platform_kid": platform_kid,
-    }).encode("utf-8")
-    sig = sign_b64u(priv, msg)
+    n = settings.verify_chunk
+    if len(receipts) <= n or settings.verify_workers <= 1:
+        return run(receipts)
+    out: list[dict] = []
+    for part in _pool().map(run, [receipts[i:i + n] for i in range(0, len(receipts), n)]):
+        out.extend(part)
+    return out
 
+def cut_checkpoint(db: Session, tenant_id: str, platform_kid: str, min_leaves: int) -> Checkpoint | None:
+    # O(log n) under the head lock: the root comes from the tenant's Merkle frontier, no event is read.
+    # The checkpoint stays unsigned until materialize_checkpoint() has rebuilt and stored the tree.
+    head = lock_head(db, tenant_id)
+    if head.frontier_size < max(min_leaves, 1):
+        return None
+    to_seq = head.next_seq - 1
     cp = Checkpoint(
         tenant_id=tenant_id,
-        from_seq=from_seq,
+        from_seq=to_seq - head.frontier_size + 1,
         to_seq=to_seq,
-        leaf_count=len(leaves),
-        merkle_root=root,
-        page_hash=page_hash,
+        leaf_count=head.frontier_size,
+        merkle_root=frontier_root(head.frontier, head.frontier_size, head.frontier_alg).hex(),
+        merkle_alg=head.frontier_alg,
         platform_kid=platform_kid,
-        signature_b64u=sig,
-        issued_at=issued_at_dt,
+        issued_at=datetime.now(timezone.utc),
     )
     db.add(cp)
+    cut_frontier(db, head)
     db.flush()  # get cp.id
+    return cp
 
-    # store merkle layers as nodes for proofs
-    for lvl, layer in enumerate(layers):
-        for idx, h in enumerate(layer):
-            db.add(MerkleNode(checkpoint_id=cp.id, level=lvl, idx=idx, hash_hex=h))
+def materialize_checkpoint(db: Session, cp: Checkpoint, platform_priv: Ed25519PrivateKey) -> int:
+    # runs without the head lock: store the proof tree, attach events, then sign
+    leaves = list(db.execute(
+        select(Event.event_hash).where(Event.tenant_id == cp.tenant_id, Event.seq.between(cp.from_seq, cp.to_seq)).order_by(Event.seq.asc())
+    ).scalars())
+    levels = build_levels(pack_hex(leaves), cp.merkle_alg)
+    root = levels[-1].hex()
+    if len(leaves) != cp.leaf_count or root != cp.merkle_root:
+        raise ValueError(f"checkpoint {cp.id}: events {cp.from_seq}..{cp.to_seq} do not match the frontier root")
 
-    # assign checkpoint_id + leaf_index
-    for i, e in enumerate(pending):
-        e.checkpoint_id = cp.id
-        e.leaf_index = i
+    # page hash over the batch, same scheme as export pages (fida.util.PAGE_HASH_ALG)
+    page_hash = compute_page_hash(leaves)
+    body = {
+        "tenant_id": cp.tenant_id,
+        "from_seq": int(cp.from_seq),
+        "to_seq": int(cp.to_seq),
+        "leaf_count": cp.leaf_count,
+        "root_hash": root,
+        "page_hash": page_hash,
+        "issued_at": cp.issued_at.astimezone(timezone.utc).isoformat(),
+        "platform_kid": cp.platform_kid,
+    }
+    if cp.merkle_alg != MERKLE_HEX:
+        # hex-concat checkpoints keep the message they have always had
+        body["merkle_alg"] = cp.merkle_alg
+    msg = json_dumps(body).encode("utf-8")
 
+    # store merkle levels for proofs (packed per level, or row-per-node via COPY)
+    store_tree(db, cp.id, levels)
+    db.execute(
+        update(Event)
+        .where(Event.tenant_id == cp.tenant_id, Event.seq.between(cp.from_seq, cp.to_seq), Event.checkpoint_id.is_(None))
+        .values(checkpoint_id=cp.id, leaf_index=Event.seq - cp.from_seq)
+        .execution_options(synchronize_session=False)
+    )
+    cp.page_hash = page_hash
+    cp.page_hash_alg = PAGE_HASH_ALG
+    cp.signature_b64u = sign_b64u(platform_priv, msg)
+    if settings.tenant_log:
+        # extend the tenant-wide log and sign a tree head covering everything up to cp.to_seq
+        append_log(db, cp.tenant_id, leaves, int(cp.from_seq), cp.id, platform_priv, cp.platform_kid)
+    db.flush()
+    invalidate_latest_checkpoint(cp.tenant_id)
     return cp.id
+
+def maybe_checkpoint(db: Session, tenant_id: str, platform_priv: Ed25519PrivateKey, platform_kid: str):
+    # cut + materialize in one transaction (scripts, tests); the worker commits between the two
+    cp = cut_checkpoint(db, tenant_id, platform_kid, settings.checkpoint_batch_size)
+    if cp is None:
+        return None
+    return materialize_checkpoint(db, cp, platform_priv)
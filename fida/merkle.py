@@ -1,10 +1,61 @@
 from __future__ import annotations
+import binascii
+import hashlib
 from dataclasses import dataclass
 from typing import List, Tuple
 from fida.util import sha256_hex
 
-def _h(a: str, b: str) -> str:
-    return sha256_hex((a + b).encode("utf-8"))
+# Node hash modes. MERKLE_HEX hashes the hex text of the two children (every root cut before
+# merkle_alg existed); MERKLE_RAW hashes the 64 raw bytes. Both keep the duplicate-odd-node rule.
+MERKLE_HEX = "sha256-hexcat"
+MERKLE_RAW = "sha256-raw"
+MERKLE_ALGS = (MERKLE_HEX, MERKLE_RAW)
+DIGEST = 32
+
+_sha256 = hashlib.sha256
+_hexlify = binascii.hexlify
+
+def _h(a: str, b: str, alg: str = MERKLE_HEX) -> str:
+    if alg == MERKLE_HEX:
+        return sha256_hex((a + b).encode("utf-8"))
+    return _sha256(bytes.fromhex(a + b)).hexdigest()
+
+def hash_pair(pair: bytes, alg: str = MERKLE_HEX) -> bytes:
+    # pair = left || right, 64 raw bytes
+    return _sha256(_hexlify(pair) if alg == MERKLE_HEX else pair).digest()
+
+HASH_CHUNK = 1 << 14  # pairs per slice; bounds the hexlify buffer and the digest list
+
+def hash_level(level: bytes, alg: str = MERKLE_HEX) -> bytes:
+    # parents of one level of packed 32-byte digests. Hex mode hexlifies a chunk of pairs at a time and
+    # hashes 128-char windows of it; nothing is hex-encoded per node in either mode.
+    n = len(level) // DIGEST
+    pairs = n // 2
+    w = 4 * DIGEST if alg == MERKLE_HEX else 2 * DIGEST
+    out = bytearray()
+    for start in range(0, pairs, HASH_CHUNK):
+        chunk = level[start * 2 * DIGEST:min(start + HASH_CHUNK, pairs) * 2 * DIGEST]
+        src = _hexlify(chunk) if alg == MERKLE_HEX else chunk
+        out += b"".join([_sha256(src[off:off + w]).digest() for off in range(0, len(src), w)])
+    if n & 1:
+        last = level[-DIGEST:]
+        out += hash_pair(last + last, alg)
+    return bytes(out)
+
+def build_levels(leaves: bytes | bytearray, alg: str = MERKLE_HEX) -> list[bytes]:
+    # every level of the tree as packed digests, leaves first; the root is levels[-1]
+    if not leaves:
+        return [_sha256(b"").digest()]
+    levels = [bytes(leaves)]
+    while len(levels[-1]) > DIGEST:
+        levels.append(hash_level(levels[-1], alg))
+    return levels
+
+def pack_hex(hashes) -> bytes:
+    return bytes.fromhex("".join(hashes))
+
+def level_hex(level: bytes) -> list[str]:
+    return [level[i:i + DIGEST].hex() for i in range(0, len(level), DIGEST)]
 
 @dataclass
 class MerkleProof:
@@ -12,24 +63,14 @@ class MerkleProof:
     index: int
     siblings: List[Tuple[str, str]]  # (side, hash) side is "L" or "R"
     root: str
+    alg: str = MERKLE_HEX
 
-def build_merkle(leaves: List[str]) -> tuple[str, list[list[str]]]:
-    if not leaves:
-        # define empty root as sha256("")
-        return sha256_hex(b""), [[sha256_hex(b"")]]
-    level = leaves[:]
-    layers = [level]
-    while len(level) > 1:
-        nxt = []
-        for i in range(0, len(level), 2):
-            left = level[i]
-            right = level[i+1] if i+1 < len(level) else left
-            nxt.append(_h(left, right))
-        level = nxt
-        layers.append(level)
-    return layers[-1][0], layers
-
-def prove(layers: list[list[str]], index: int) -> MerkleProof:
+def build_merkle(leaves: List[str], alg: str = MERKLE_HEX) -> tuple[str, list[list[str]]]:
+    # hex in, hex out; callers that only need the root or packed levels should use build_levels
+    levels = build_levels(pack_hex(leaves), alg)
+    return levels[-1].hex(), [level_hex(lv) for lv in levels]
+
+def prove(layers: list[list[str]], index: int, alg: str = MERKLE_HEX) -> MerkleProof:
     leaf = layers[0][index]
     siblings: List[Tuple[str, str]] = []
     idx = index
@@ -40,15 +81,114 @@ def prove(layers: list[list[str]], index: int) -> MerkleProof:
         sib = layer[sib_idx] if sib_idx < len(layer) else layer[idx]
         siblings.append(("L", sib) if is_right else ("R", sib))
         idx //= 2
-    return MerkleProof(leaf=leaf, index=index, siblings=siblings, root=layers[-1][0])
+    return MerkleProof(leaf=leaf, index=index, siblings=siblings, root=layers[-1][0], alg=alg)
+
+def layer_sizes(leaf_count: int) -> list[int]:
+    sizes = [max(leaf_count, 1)]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+def proof_positions(leaf_count: int, index: int) -> list[tuple[int, int, str]]:
+    # (level, idx, side) of every sibling prove() would read; the odd last node pairs with itself
+    out = []
+    idx = index
+    for lvl, size in enumerate(layer_sizes(leaf_count)[:-1]):
+        is_right = (idx % 2 == 1)
+        sib_idx = idx-1 if is_right else idx+1
+        if sib_idx >= size:
+            sib_idx = idx
+        out.append((lvl, sib_idx, "L" if is_right else "R"))
+        idx //= 2
+    return out
+
+def multiproof_positions(leaf_count: int, indices: list[int]) -> list[tuple[int, int]]:
+    # smallest node set that, together with the given leaves, recomputes the root; shared siblings appear once
+    sizes = layer_sizes(leaf_count)
+    known = set(indices)
+    need: list[tuple[int, int]] = []
+    for lvl, size in enumerate(sizes[:-1]):
+        for idx in sorted(known):
+            sib = idx ^ 1
+            if sib >= size:
+                sib = idx
+            if sib not in known:
+                need.append((lvl, sib))
+        known = {idx // 2 for idx in known}
+    return need
+
+def verify_multiproof(leaf_count: int, leaves: dict[int, str], nodes: dict[tuple[int, int], str], root: str, alg: str = MERKLE_HEX) -> bool:
+    sizes = layer_sizes(leaf_count)
+    cur = dict(leaves)
+    for lvl, size in enumerate(sizes[:-1]):
+        nxt: dict[int, str] = {}
+        for idx in cur:
+            parent = idx // 2
+            if parent in nxt:
+                continue
+            left, right = 2 * parent, 2 * parent + 1
+            if right >= size:
+                right = left
+            lh = cur.get(left) or nodes.get((lvl, left))
+            rh = cur.get(right) or nodes.get((lvl, right))
+            if lh is None or rh is None:
+                return False
+            nxt[parent] = _h(lh, rh, alg)
+        cur = nxt
+    return cur.get(0) == root
+
+# Frontier: the roots of the perfect subtrees that make up the first `size` leaves, one per set bit of
+# size (frontier[lvl] is the 2**lvl-leaf subtree as raw bytes, None where the bit is clear). Enough to
+# append a leaf and to compute build_levels()'s root in O(log n) without the leaves.
+
+def frontier_push(frontier: list[bytes | None], size: int, leaf: bytes, alg: str = MERKLE_HEX) -> int:
+    node, lvl = leaf, 0
+    while size >> lvl & 1:
+        node = hash_pair(frontier[lvl] + node, alg)
+        frontier[lvl] = None
+        lvl += 1
+    if lvl == len(frontier):
+        frontier.append(None)
+    frontier[lvl] = node
+    return size + 1
+
+def frontier_root(frontier: list[bytes | None], size: int, alg: str = MERKLE_HEX) -> bytes:
+    # walking up, `acc` is the last node of a level when it covers a partial block;
+    # a last node without a sibling is paired with itself
+    if size == 0:
+        return _sha256(b"").digest()
+    acc = None
+    lvl = 0
+    while (size + (1 << lvl) - 1) >> lvl > 1:
+        full = frontier[lvl] if size >> lvl & 1 else None
+        if acc is not None:
+            acc = hash_pair(full + acc, alg) if full is not None else hash_pair(acc + acc, alg)
+        elif full is not None:
+            acc = hash_pair(full + full, alg)
+        lvl += 1
+    return acc if acc is not None else frontier[lvl]
+
+def pack_frontier(frontier: list[bytes | None]) -> bytes:
+    return b"".join(h for h in frontier if h is not None)
+
+def unpack_frontier(data: bytes, size: int) -> list[bytes | None]:
+    out: list[bytes | None] = []
+    off = 0
+    for lvl in range(size.bit_length()):
+        if size >> lvl & 1:
+            out.append(bytes(data[off:off + DIGEST]))
+            off += DIGEST
+        else:
+            out.append(None)
+    return out
 
 def verify_proof(p: MerkleProof) -> bool:
     cur = p.leaf
     idx = p.index
     for side, sib in p.siblings:
         if side == "L":
-            cur = _h(sib, cur)
+            cur = _h(sib, cur, p.alg)
         else:
-            cur = _h(cur, sib)
+            cur = _h(cur, sib, p.alg)
         idx //= 2
     return cur == p.root
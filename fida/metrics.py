@@ -1,5 +1,9 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 REQS = Counter("fida_requests_total", "Total requests", ["path","method","status"])
 ISSUED = Counter("fida_events_issued_total", "Total events issued", ["tenant_id"])
 LAT = Histogram("fida_request_latency_seconds", "Latency", ["path","method"])
+RL_DECISIONS = Counter("fida_rate_limit_decisions_total", "Rate limiter decisions", ["result","source"])
+AUDIT_QUEUE_DEPTH = Gauge("fida_audit_queue_depth", "Audit records waiting for the background writer")
+AUDIT_RECORDS = Counter("fida_audit_records_total", "Async audit records by outcome", ["outcome"])
+AUDIT_FLUSH_LAT = Histogram("fida_audit_flush_seconds", "Audit batch write latency")
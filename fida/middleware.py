@@ -1,29 +1,55 @@
 from __future__ import annotations
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+import time
+from fastapi import HTTPException
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fida.config import settings
 from fida.metrics import REQS, LAT
-import time
 
-class BodySizeMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # hard cap via Content-Length if present
-        cl = request.headers.get("content-length")
-        if cl and int(cl) > settings.max_body_bytes:
-            return Response("Payload too large", status_code=413)
-        # measure actual read body bytes safely for canonical hashing + DoS cap
-        body = await request.body()
-        if len(body) > settings.max_body_bytes:
-            return Response("Payload too large", status_code=413)
-        request.state.body_bytes = body  # available to handlers if needed
-        # re-inject body for downstream
-        async def receive():
-            return {"type":"http.request","body":body,"more_body":False}
-        request._receive = receive  # type: ignore
-        start = time.time()
-        resp = await call_next(request)
-        dur = time.time() - start
-        LAT.labels(path=request.url.path, method=request.method).observe(dur)
-        REQS.labels(path=request.url.path, method=request.method, status=str(resp.status_code)).inc()
-        return resp
+class BodySizeMiddleware:
+    # pure ASGI: counts body bytes as they stream in and fails with 413 the moment the cap is crossed,
+    # without buffering. Chunks are passed through untouched.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # batch endpoints carry many payloads per request and get their own cap
+        cap = settings.max_batch_body_bytes if scope["path"].endswith("/batch") else settings.max_body_bytes
+        method = scope["method"]
+        start = time.perf_counter()
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            cl = next((v for k, v in scope["headers"] if k == b"content-length"), None)
+            if cl is not None and cl.isdigit() and int(cl) > cap:
+                await PlainTextResponse("Payload too large", status_code=413)(scope, receive, send_status)
+                return
+
+            received = 0
+
+            async def receive_capped() -> Message:
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > cap:
+                        # surfaces through the app's exception handlers as a normal 413 response
+                        raise HTTPException(status_code=413, detail="Payload too large")
+                return message
+
+            await self.app(scope, receive_capped, send_status)
+        finally:
+            # route template, not the raw path, so labels stay bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            LAT.labels(path=path, method=method).observe(time.perf_counter() - start)
+            REQS.labels(path=path, method=method, status=str(status)).inc()
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Text, Boolean, DateTime, Integer, BigInteger
+from sqlalchemy import String, Text, Boolean, DateTime, Integer, BigInteger, LargeBinary
 from sqlalchemy.sql import func
 
 class Base(DeclarativeBase):
@@ -20,7 +20,7 @@ class ApiKey(Base):
     __tablename__ = "api_keys"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     key_id: Mapped[str] = mapped_column(String(80), unique=True, nullable=False)
-    key_hash: Mapped[str] = mapped_column(String(128), nullable=False)
+    key_hash: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
     tenant_id: Mapped[str | None] = mapped_column(String(80), nullable=True)
     role: Mapped[str] = mapped_column(String(32), nullable=False)
     status: Mapped[str] = mapped_column(String(16), nullable=False, default="active")
@@ -36,6 +36,27 @@ class Tenant(Base):
     seed_enc_b64u: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+class TenantKey(Base):
+    # every signing key a tenant has ever had; receipts name theirs by kid
+    __tablename__ = "tenant_keys"
+    tenant_id: Mapped[str] = mapped_column(String(80), primary_key=True)
+    kid: Mapped[str] = mapped_column(String(64), primary_key=True)
+    pub_b64u: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="active")
+    created_at: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    retired_at: Mapped[object | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+class TenantHead(Base):
+    __tablename__ = "tenant_heads"
+    tenant_id: Mapped[str] = mapped_column(String(80), primary_key=True)
+    next_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
+    last_event_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Merkle frontier of the events since the last checkpoint cut (fida.merkle.pack_frontier); NULL = rebuild
+    frontier: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    frontier_size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    frontier_alg: Mapped[str | None] = mapped_column(String(16), nullable=True)  # NULL = sha256-hexcat
+    updated_at: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Idempotency(Base):
     __tablename__ = "idempotency"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -45,17 +66,18 @@ class Idempotency(Base):
     created_at: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 class Event(Base):
+    # hash-partitioned by tenant_id (alembic 0010): keys include tenant_id, event_id is unique per tenant
     __tablename__ = "events"
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
-    tenant_id: Mapped[str] = mapped_column(String(80), nullable=False)
-    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
-    event_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    tenant_id: Mapped[str] = mapped_column(String(80), primary_key=True)
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    event_id: Mapped[str] = mapped_column(String(64), nullable=False)
     issued_at: Mapped[object] = mapped_column(DateTime(timezone=True), nullable=False)
     profile_id: Mapped[str] = mapped_column(String(80), nullable=False)
     event_type: Mapped[str] = mapped_column(String(40), nullable=False)
     actor_role: Mapped[str] = mapped_column(String(40), nullable=False)
     object_ref: Mapped[str] = mapped_column(String(200), nullable=False, default="")
-    payload_canon: Mapped[str] = mapped_column(Text, nullable=False)
+    # NULL once archived to a segment file, see fida.archive.payload_of
+    payload_canon: Mapped[str | None] = mapped_column(Text, nullable=True)
     payload_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     prev_event_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     event_hash: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -72,9 +94,13 @@ class Checkpoint(Base):
     to_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
     leaf_count: Mapped[int] = mapped_column(Integer, nullable=False)
     merkle_root: Mapped[str] = mapped_column(String(64), nullable=False)
-    page_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    merkle_alg: Mapped[str] = mapped_column(String(16), nullable=False, default="sha256-hexcat", server_default="sha256-hexcat")
+    # page_hash + signature stay NULL between the cut and materialization (fida.ledger.materialize_checkpoint)
+    page_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # set with page_hash (fida.util.PAGE_HASH_ALG); NULL on checkpoints materialized before the column existed
+    page_hash_alg: Mapped[str | None] = mapped_column(String(40), nullable=True)
     platform_kid: Mapped[str] = mapped_column(String(64), nullable=False)
-    signature_b64u: Mapped[str] = mapped_column(Text, nullable=False)
+    signature_b64u: Mapped[str | None] = mapped_column(Text, nullable=True)
     issued_at: Mapped[object] = mapped_column(DateTime(timezone=True), nullable=False)
 
 class MerkleNode(Base):
@@ -85,6 +111,25 @@ class MerkleNode(Base):
     idx: Mapped[int] = mapped_column(Integer, nullable=False)
     hash_hex: Mapped[str] = mapped_column(String(64), nullable=False)
 
+class MerkleLevel(Base):
+    # one row per tree level: node hashes as raw 32-byte digests, concatenated in index order
+    __tablename__ = "merkle_levels"
+    checkpoint_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    level: Mapped[int] = mapped_column(Integer, primary_key=True)
+    node_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    hashes: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+class ArchiveSegment(Base):
+    # payloads of one checkpoint moved out of events into a content-addressed segment file (fida.archive)
+    __tablename__ = "archive_segments"
+    checkpoint_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    tenant_id: Mapped[str] = mapped_column(String(80), nullable=False)
+    from_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    to_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    digest: Mapped[str] = mapped_column(String(64), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
 class AuditLog(Base):
     __tablename__ = "audit_log"
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
@@ -95,3 +140,21 @@ class AuditLog(Base):
     meta_json: Mapped[str] = mapped_column(Text, nullable=False)
     ip: Mapped[str | None] = mapped_column(String(64), nullable=True)
     ua: Mapped[str | None] = mapped_column(String(200), nullable=True)
+
+class LogNode(Base):
+    # perfect subtrees (level >= 1) of the tenant-wide RFC 6962 log, see fida.ctlog
+    __tablename__ = "log_nodes"
+    tenant_id: Mapped[str] = mapped_column(String(80), primary_key=True)
+    level: Mapped[int] = mapped_column(Integer, primary_key=True)
+    idx: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    hash: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+class TreeHead(Base):
+    __tablename__ = "tree_heads"
+    tenant_id: Mapped[str] = mapped_column(String(80), primary_key=True)
+    tree_size: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    root_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    checkpoint_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    issued_at: Mapped[object] = mapped_column(DateTime(timezone=True), nullable=False)
+    platform_kid: Mapped[str] = mapped_column(String(64), nullable=False)
+    signature_b64u: Mapped[str] = mapped_column(Text, nullable=False)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+from sqlalchemy import case, func, insert, select, tuple_
+from sqlalchemy.orm import Session
+from fida.config import settings
+from fida.db import copy_rows
+from fida.merkle import DIGEST, MerkleProof, level_hex, pack_hex, proof_positions, multiproof_positions, verify_multiproof
+from fida.models import Checkpoint, Event, MerkleLevel, MerkleNode
+
+HASH_LEN = DIGEST
+
+def _insert_levels(db: Session, checkpoint_id: int, levels: list[bytes]) -> None:
+    db.execute(insert(MerkleLevel), [
+        dict(checkpoint_id=checkpoint_id, level=lvl, node_count=len(level) // HASH_LEN, hashes=bytes(level))
+        for lvl, level in enumerate(levels)
+    ])
+
+def store_tree(db: Session, checkpoint_id: int, levels: list[bytes]) -> None:
+    # levels as packed digests (fida.merkle.build_levels); hex only for the row-per-node layout
+    if settings.merkle_storage == "packed":
+        _insert_levels(db, checkpoint_id, levels)
+        return
+    copy_rows(db, MerkleNode.__table__, ["checkpoint_id", "level", "idx", "hash_hex"],
+              ((checkpoint_id, lvl, idx, h) for lvl, level in enumerate(levels) for idx, h in enumerate(level_hex(level))))
+
+def fetch_nodes(db: Session, checkpoint_id: int, positions: list[tuple[int, int]]) -> dict[tuple[int, int], str]:
+    # one round trip: for each level, substr() the smallest byte span covering the wanted indices
+    spans: dict[int, tuple[int, int]] = {}
+    for lvl, idx in positions:
+        lo, hi = spans.get(lvl, (idx, idx))
+        spans[lvl] = (min(lo, idx), max(hi, idx))
+    if not spans:
+        return {}
+    start = case({lvl: lo * HASH_LEN + 1 for lvl, (lo, _) in spans.items()}, value=MerkleLevel.level)
+    length = case({lvl: (hi - lo + 1) * HASH_LEN for lvl, (lo, hi) in spans.items()}, value=MerkleLevel.level)
+    rows = db.execute(
+        select(MerkleLevel.level, func.substr(MerkleLevel.hashes, start, length))
+        .where(MerkleLevel.checkpoint_id == checkpoint_id, MerkleLevel.level.in_(list(spans)))
+    ).all()
+    if rows:
+        chunks = {lvl: bytes(chunk) for lvl, chunk in rows}
+        out = {}
+        for lvl, idx in positions:
+            off = (idx - spans[lvl][0]) * HASH_LEN
+            node = chunks.get(lvl, b"")[off:off + HASH_LEN]
+            if len(node) == HASH_LEN:
+                out[(lvl, idx)] = node.hex()
+        return out
+    # checkpoints written before merkle_levels (or with FIDA_MERKLE_STORAGE=rows): index lookups on uq_merkle_node
+    rows = db.execute(
+        select(MerkleNode.level, MerkleNode.idx, MerkleNode.hash_hex)
+        .where(MerkleNode.checkpoint_id == checkpoint_id, tuple_(MerkleNode.level, MerkleNode.idx).in_(list(set(positions))))
+    ).all()
+    return {(lvl, idx): h for lvl, idx, h in rows}
+
+def prove_event(db: Session, cp: Checkpoint, leaf_index: int, leaf: str) -> MerkleProof | None:
+    # reads exactly one sibling per level; leaf comes from the event row, root from the signed checkpoint
+    positions = proof_positions(cp.leaf_count, leaf_index)
+    nodes = fetch_nodes(db, cp.id, [(lvl, idx) for lvl, idx, _ in positions])
+    if len(nodes) != len({(lvl, idx) for lvl, idx, _ in positions}):
+        return None
+    siblings = [(side, nodes[(lvl, idx)]) for lvl, idx, side in positions]
+    return MerkleProof(leaf=leaf, index=leaf_index, siblings=siblings, root=cp.merkle_root, alg=cp.merkle_alg)
+
+def group_by_checkpoint(db: Session, tenant_id: str, event_ids: list[str], chunk: int = 1000) -> tuple[dict[int, list], list[str]]:
+    # {checkpoint_id: [(event_id, leaf_index, event_hash), ...]}, plus ids that are unknown or not yet checkpointed
+    groups: dict[int, list] = {}
+    found = set()
+    for i in range(0, len(event_ids), chunk):
+        part = event_ids[i:i + chunk]
+        for r in db.query(Event.event_id, Event.checkpoint_id, Event.leaf_index, Event.event_hash).filter(Event.tenant_id == tenant_id, Event.event_id.in_(part)):
+            if r.checkpoint_id and r.leaf_index is not None:
+                groups.setdefault(int(r.checkpoint_id), []).append((r.event_id, int(r.leaf_index), r.event_hash))
+                found.add(r.event_id)
+    return groups, [e for e in event_ids if e not in found]
+
+def build_multiproof(db: Session, cp: Checkpoint, leaves: list[tuple[str, int, str]]) -> dict | None:
+    leaves = sorted(leaves, key=lambda x: x[1])
+    positions = multiproof_positions(cp.leaf_count, [li for _, li, _ in leaves])
+    nodes = fetch_nodes(db, cp.id, positions)
+    if len(nodes) != len(positions):
+        return None
+    ok = verify_multiproof(cp.leaf_count, {li: h for _, li, h in leaves}, nodes, cp.merkle_root, cp.merkle_alg)
+    return dict(
+        tenant_id=cp.tenant_id,
+        checkpoint_id=cp.id,
+        leaf_count=cp.leaf_count,
+        root=cp.merkle_root,
+        merkle_alg=cp.merkle_alg,
+        leaves=[dict(event_id=eid, leaf_index=li, leaf=h) for eid, li, h in leaves],
+        nodes=[[lvl, idx, nodes[(lvl, idx)]] for lvl, idx in positions],
+        proof_valid=ok,
+    )
+
+def iter_multiproofs(db: Session, tenant_id: str, groups: dict[int, list]):
+    # one tree read per checkpoint; yields (checkpoint_id, multiproof dict or None if the tree is missing)
+    seen = set()
+    for cp in db.query(Checkpoint).filter(Checkpoint.tenant_id == tenant_id, Checkpoint.id.in_(list(groups))).order_by(Checkpoint.id):
+        seen.add(cp.id)
+        yield cp.id, build_multiproof(db, cp, groups[cp.id])
+    for cp_id in groups:
+        if cp_id not in seen:
+            yield cp_id, None
+
+def backfill_packed_levels(db: Session, limit: int = 100, drop_rows: bool = False) -> list[int]:
+    # pack row-per-node checkpoints into merkle_levels; caller commits
+    has_levels = select(MerkleLevel.checkpoint_id).where(MerkleLevel.checkpoint_id == MerkleNode.checkpoint_id).exists()
+    ids = list(db.execute(
+        select(MerkleNode.checkpoint_id).where(~has_levels).group_by(MerkleNode.checkpoint_id).order_by(MerkleNode.checkpoint_id).limit(limit)
+    ).scalars())
+    for cp_id in ids:
+        layers: list[list[str]] = []
+        for lvl, idx, h in db.query(MerkleNode.level, MerkleNode.idx, MerkleNode.hash_hex).filter(MerkleNode.checkpoint_id == cp_id).order_by(MerkleNode.level, MerkleNode.idx):
+            if lvl == len(layers):
+                layers.append([])
+            if idx != len(layers[lvl]):
+                raise ValueError(f"checkpoint {cp_id}: merkle_nodes level {lvl} has a gap at idx {len(layers[lvl])}")
+            layers[lvl].append(h)
+        _insert_levels(db, cp_id, [pack_hex(layer) for layer in layers])
+        if drop_rows:
+            db.query(MerkleNode).filter(MerkleNode.checkpoint_id == cp_id).delete(synchronize_session=False)
+    return ids
@@ -1,17 +1,160 @@
 from __future__ import annotations
+import logging
+import math
+import threading
 import time
 import redis
 from fastapi import HTTPException, Request
+from fida.cache import TTLCache
 from fida.config import settings
+from fida.metrics import RL_DECISIONS
 
-r = redis.from_url(settings.redis_url, decode_responses=True)
+log = logging.getLogger("fida.rate_limit")
+
+# Token buckets (rate tokens/s, capacity burst) per API key and per tenant, checked and charged
+# atomically in one EVALSHA. Time comes from Redis so app clocks do not matter.
+# ARGV: want, need, then rate/burst per key. Grants min(want, tokens in every bucket) if that is >= need,
+# else returns {0, ms until need tokens are there}.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local want = tonumber(ARGV[1])
+local need = tonumber(ARGV[2])
+local tokens = {}
+local grant = want
+local wait = 0
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[1 + 2 * i])
+  local burst = tonumber(ARGV[2 + 2 * i])
+  local b = redis.call('HMGET', KEYS[i], 't', 'ts')
+  local tk = tonumber(b[1]) or burst
+  local ts = tonumber(b[2]) or now
+  tk = math.min(burst, tk + math.max(0, now - ts) * rate / 1000)
+  tokens[i] = tk
+  if tk < grant then grant = math.floor(tk) end
+  if tk < need then wait = math.max(wait, math.ceil((need - tk) * 1000 / rate)) end
+end
+if grant < need then
+  return {0, wait}
+end
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[1 + 2 * i])
+  local burst = tonumber(ARGV[2 + 2 * i])
+  redis.call('HSET', KEYS[i], 't', tostring(tokens[i] - grant), 'ts', now)
+  redis.call('PEXPIRE', KEYS[i], math.ceil(burst * 1000 / rate) + 1000)
+end
+return {grant, 0}
+"""
+
+_client_lock = threading.Lock()
+_client: redis.Redis | None = None
+_script = None
+_redis_down_until = 0.0
+
+def _bucket_script():
+    # connect lazily: importing the app must not need Redis
+    global _client, _script
+    with _client_lock:
+        if _script is None:
+            _client = redis.from_url(
+                settings.redis_url,
+                socket_timeout=settings.rate_limit_redis_timeout_s,
+                socket_connect_timeout=settings.rate_limit_redis_timeout_s,
+            )
+            _script = _client.register_script(TOKEN_BUCKET_LUA)
+        return _script
+
+class _Local:
+    # process-local tokens: a short lease taken from Redis, or a whole bucket while Redis is unavailable
+    __slots__ = ("tokens", "ts", "expires")
+
+    def __init__(self, tokens: float, ts: float, expires: float):
+        self.tokens = tokens
+        self.ts = ts
+        self.expires = expires
+
+_local_lock = threading.Lock()
+_leases = TTLCache(maxsize=100_000, ttl=60.0)
+_fallback = TTLCache(maxsize=100_000, ttl=60.0)
+
+def _limits(tenant_id: str | None, key_id: str) -> list[tuple[str, float, float]]:
+    out = [(f"rl:k:{key_id}", float(settings.rate_limit_rps), float(settings.rate_limit_burst))]
+    if tenant_id:
+        out.append((f"rl:t:{tenant_id}", float(settings.tenant_rate_limit_rps), float(settings.tenant_rate_limit_burst)))
+    return out
+
+def _take_lease(key: tuple, cost: int, now: float) -> bool:
+    with _local_lock:
+        lease = _leases.get(key)
+        if lease is not None and lease.expires > now and lease.tokens >= cost:
+            lease.tokens -= cost
+            return True
+    return False
+
+def _store_lease(key: tuple, tokens: int, now: float) -> None:
+    if tokens > 0:
+        with _local_lock:
+            _leases.set(key, _Local(tokens, now, now + settings.rate_limit_lease_ttl_s))
+
+def _local_only(limits: list[tuple[str, float, float]], cost: int, now: float) -> float:
+    # Redis is unreachable: every process enforces the full limits on its own. Returns seconds to wait, 0 = admit.
+    with _local_lock:
+        buckets = []
+        wait = 0.0
+        for name, rate, burst in limits:
+            b = _fallback.get(name)
+            if b is None:
+                b = _Local(burst, now, 0.0)
+                _fallback.set(name, b)
+            b.tokens = min(burst, b.tokens + (now - b.ts) * rate)
+            b.ts = now
+            buckets.append(b)
+            if b.tokens < cost:
+                wait = max(wait, (cost - b.tokens) / rate)
+        if wait:
+            return wait
+        for b in buckets:
+            b.tokens -= cost
+        return 0.0
+
+def _reject(wait_s: float, source: str):
+    RL_DECISIONS.labels(result="limited", source=source).inc()
+    raise HTTPException(status_code=429, detail="Rate limit exceeded", headers={"Retry-After": str(max(1, math.ceil(wait_s)))})
 
 def enforce_rl(request: Request, tenant_id: str | None, key_id: str):
-    # Token bucket per API key (or tenant). Simple Redis-based limiter.
-    now = int(time.time())
-    bucket = f"rl:{key_id}:{now}"
-    count = r.incr(bucket)
-    if count == 1:
-        r.expire(bucket, 2)
-    if count > settings.rate_limit_burst:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+    # one token bucket per API key and one per tenant
+    global _redis_down_until
+    limits = _limits(tenant_id, key_id)
+    cost = 1
+    now = time.monotonic()
+    lease_key = (tenant_id, key_id)
+    if settings.rate_limit_lease > 0 and _take_lease(lease_key, cost, now):
+        RL_DECISIONS.labels(result="allowed", source="lease").inc()
+        return
+
+    if now >= _redis_down_until:
+        want = cost + max(0, settings.rate_limit_lease)
+        try:
+            args = [want, cost]
+            for _, rate, burst in limits:
+                args += [rate, burst]
+            granted, wait_ms = _bucket_script()(keys=[name for name, _, _ in limits], args=args)
+        except redis.RedisError as e:
+            if isinstance(e, redis.ResponseError) and not isinstance(e, redis.ReadOnlyError):
+                # the server ran the script and it failed: a bug, not an outage, so do not degrade to local buckets
+                log.error("rate limit script failed: %s", e)
+                raise
+            _redis_down_until = now + settings.rate_limit_redis_retry_s
+            log.warning("rate limiter falling back to local buckets for %.0fs: %s", settings.rate_limit_redis_retry_s, e)
+        else:
+            if int(granted) < cost:
+                _reject(int(wait_ms) / 1000, "redis")
+            # tokens beyond this request become a short local lease
+            _store_lease(lease_key, int(granted) - cost, now)
+            RL_DECISIONS.labels(result="allowed", source="redis").inc()
+            return
+
+    wait = _local_only(limits, cost, now)
+    if wait:
+        _reject(wait, "local")
+    RL_DECISIONS.labels(result="allowed", source="local").inc()
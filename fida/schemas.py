@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Any, Optional, Literal, List, Dict
+from fida.config import settings
+from fida.util import PAGE_HASH_ALG
 
 class BootstrapRequest(BaseModel):
     platform_admin_name: str = Field(default="Owner", max_length=120, min_length=1)
@@ -21,6 +23,12 @@ class TenantCreateResponse(BaseModel):
     active_kid: str
     public_key_b64u: str
 
+class KeyRotateResponse(BaseModel):
+    tenant_id: str
+    active_kid: str
+    public_key_b64u: str
+    retired_kid: str
+
 class ApiKeyIssueRequest(BaseModel):
     tenant_id: str = Field(min_length=1, max_length=80)
     role: Literal["issuer","verifier","exporter","admin"]
@@ -31,6 +39,11 @@ class ApiKeyIssueResponse(BaseModel):
     role: str
     api_key: str
 
+class ApiKeyRevokeResponse(BaseModel):
+    key_id: str
+    status: str
+    revoked_at: Optional[str] = None  # NULL for keys revoked before revoked_at was recorded
+
 class IssueRequest(BaseModel):
     tenant_id: str = Field(min_length=1, max_length=80)
     profile_id: str = Field(default="HUMAN-MSP-01", min_length=1, max_length=80)
@@ -57,6 +70,15 @@ class Receipt(BaseModel):
     canon_alg: str = "RFC8785"
     hash_alg: str = "SHA-256"
 
+class IssueBatchRequest(BaseModel):
+    tenant_id: str = Field(min_length=1, max_length=80)
+    items: List[IssueRequest] = Field(min_length=1, max_length=settings.issue_batch_max)
+
+class IssueBatchResponse(BaseModel):
+    tenant_id: str
+    receipts: List[Receipt]
+    idem_hits: int = 0
+
 class VerifyRequest(BaseModel):
     receipt: Receipt
 
@@ -68,6 +90,13 @@ class VerifyResult(BaseModel):
     chain_hint_ok: bool
     computed_event_hash: Optional[str] = None
 
+class VerifyBatchRequest(BaseModel):
+    receipts: List[Receipt] = Field(min_length=1)
+
+class VerifyBatchResponse(BaseModel):
+    results: List[VerifyResult]
+    valid_count: int
+
 class ExportItem(BaseModel):
     seq: int
     event_id: str
@@ -91,6 +120,7 @@ class ExportIntegrity(BaseModel):
     to_root: str
     size: int
     page_hash: str
+    page_hash_alg: str = PAGE_HASH_ALG
 
 class CheckpointOut(BaseModel):
     tenant_id: str
@@ -99,6 +129,7 @@ class CheckpointOut(BaseModel):
     issued_at: str
     platform_kid: str
     signature_b64u: str
+    merkle_alg: str = "sha256-hexcat"
 
 class ExportEnvelope(BaseModel):
     tenant_id: str
@@ -116,3 +147,45 @@ class MerkleProofOut(BaseModel):
     root: str
     siblings: List[List[str]]  # [side, hash]
     proof_valid: bool
+    merkle_alg: str = "sha256-hexcat"
+
+class ProofBatchRequest(BaseModel):
+    tenant_id: str = Field(min_length=1, max_length=80)
+    event_ids: List[str] = Field(min_length=1)
+
+class MultiProofLeaf(BaseModel):
+    event_id: str
+    leaf_index: int
+    leaf: str
+
+class CheckpointMultiProof(BaseModel):
+    tenant_id: str
+    checkpoint_id: int
+    leaf_count: int
+    root: str
+    merkle_alg: str = "sha256-hexcat"
+    leaves: List[MultiProofLeaf]
+    nodes: List[List[Any]]  # [level, idx, hash]; every node the leaves cannot derive, listed once
+    proof_valid: bool
+
+class ProofBatchResponse(BaseModel):
+    tenant_id: str
+    proofs: List[CheckpointMultiProof]
+    unavailable: List[str] = Field(default_factory=list)
+
+class TreeHeadOut(BaseModel):
+    tenant_id: str
+    tree_size: int
+    root_hash: str
+    log_alg: str
+    issued_at: str
+    platform_kid: str
+    signature_b64u: str
+    checkpoint_id: Optional[int] = None
+
+class ConsistencyProofOut(BaseModel):
+    tenant_id: str
+    log_alg: str
+    first: TreeHeadOut
+    second: TreeHeadOut
+    proof: List[str]  # RFC 6962 PROOF(first.tree_size, second), hex
@@ -2,7 +2,7 @@ import base64
 import hashlib
 import hmac
 import json
-from typing import Any
+from typing import Any, Iterable
 
 def b64u_encode(raw: bytes) -> str:
     return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
@@ -19,3 +19,35 @@ def hmac_sha256_hex(key: bytes, msg: bytes) -> str:
 
 def json_dumps(obj: Any) -> str:
     return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+# page_hash = SHA-256 over the raw 32-byte event hashes of a page, in seq order.
+# Used by checkpoints, paged exports and the NDJSON stream alike.
+PAGE_HASH_ALG = "sha256(event_hash bytes)"
+# checkpoints materialized before the scheme above: SHA-256 of the hex hashes joined with "|"
+PAGE_HASH_LEGACY = "sha256(event_hash hex|)"
+
+class PageHasher:
+    __slots__ = ("_h", "size")
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self.size = 0
+
+    def update(self, event_hash_hex: str) -> None:
+        self._h.update(bytes.fromhex(event_hash_hex))
+        self.size += 1
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+def page_hash(event_hashes: Iterable[str]) -> str:
+    h = PageHasher()
+    for x in event_hashes:
+        h.update(x)
+    return h.hexdigest()
+
+def page_hash_matches(event_hashes: list[str], expected: str, alg: str | None) -> bool:
+    # alg None: checkpoint recorded before page_hash_alg existed, which may use either scheme
+    if alg in (None, PAGE_HASH_ALG) and page_hash(event_hashes) == expected:
+        return True
+    return alg in (None, PAGE_HASH_LEGACY) and sha256_hex("|".join(event_hashes).encode("utf-8")) == expected
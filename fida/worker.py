@@ -0,0 +1,130 @@
+from __future__ import annotations
+import logging
+import time
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from fida.config import settings
+from fida.db import engine, SessionLocal
+from fida.keys import platform_signing_key
+from fida.ledger import cut_checkpoint, materialize_checkpoint
+from fida.models import Checkpoint, PlatformState, TenantHead
+
+log = logging.getLogger("fida.worker")
+
+# pg advisory lock ids are cluster-wide bigints; keep ours in a recognisable range
+CHECKPOINT_LOCK_KEY = 0x46494441_0001
+
+class LeaderLock:
+    # session-level pg advisory lock held on a dedicated connection; losing the connection loses leadership
+    def __init__(self, key: int):
+        self.key = key
+        self.conn = None
+
+    def acquire(self) -> bool:
+        if self.conn is not None:
+            try:
+                self.conn.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                log.warning("leader connection lost, re-electing")
+                self.release()
+        conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        if conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": self.key}).scalar():
+            self.conn = conn
+            log.info("acquired leader lock %s", self.key)
+            return True
+        conn.close()
+        return False
+
+    def release(self):
+        if self.conn is None:
+            return
+        try:
+            self.conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": self.key})
+        except Exception:
+            pass
+        finally:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+def _unsigned_checkpoint(tenant_id):
+    return select(Checkpoint.id).where(Checkpoint.tenant_id == tenant_id, Checkpoint.signature_b64u.is_(None)).exists()
+
+def tenants_due(db: Session, batch_size: int) -> list[str]:
+    # frontier_size counts events since the last cut; heads without a frontier yet fall back to
+    # head - last checkpointed seq (checkpoints cover a contiguous seq prefix).
+    # Tenants with an unsigned checkpoint wait for it: the tenant log appends checkpoints in seq order, and a later
+    # one materialized first would take over the earlier one's leaves and leave it unsignable.
+    last_cp = select(Checkpoint.tenant_id, func.max(Checkpoint.to_seq).label("to_seq")).group_by(Checkpoint.tenant_id).subquery()
+    q = (
+        select(TenantHead.tenant_id)
+        .outerjoin(last_cp, last_cp.c.tenant_id == TenantHead.tenant_id)
+        .where(func.coalesce(TenantHead.frontier_size, TenantHead.next_seq - 1 - func.coalesce(last_cp.c.to_seq, 0)) >= batch_size)
+        .where(~_unsigned_checkpoint(TenantHead.tenant_id))
+    )
+    return list(db.execute(q).scalars())
+
+def _platform(db: Session) -> PlatformState | None:
+    ps = db.query(PlatformState).filter(PlatformState.id == 1).first()
+    return ps if ps and ps.platform_seed_enc_b64u and ps.platform_kid else None
+
+def materialize(cp_id: int) -> None:
+    with SessionLocal() as db:
+        ps = _platform(db)
+        cp = db.get(Checkpoint, cp_id)
+        if not ps or cp is None or cp.signature_b64u is not None:
+            return
+        materialize_checkpoint(db, cp, platform_signing_key(ps))
+        db.commit()
+    log.info("checkpoint %s signed", cp_id)
+
+def checkpoint_tenant(tenant_id: str) -> int | None:
+    # the cut commits on its own so the head lock is held for O(log n) work only
+    with SessionLocal() as db:
+        ps = _platform(db)
+        if not ps:
+            return None
+        if db.scalar(select(_unsigned_checkpoint(tenant_id))):
+            log.warning("tenant %s: an earlier checkpoint is still unsigned, not cutting", tenant_id)
+            return None
+        cp = cut_checkpoint(db, tenant_id, ps.platform_kid, settings.checkpoint_batch_size)
+        if cp is None:
+            return None
+        cp_id = cp.id
+        db.commit()
+    log.info("tenant %s checkpoint %s cut", tenant_id, cp_id)
+    materialize(cp_id)
+    return cp_id
+
+def run_once() -> int:
+    with SessionLocal() as db:
+        # cuts left unsigned by an earlier crash first, then new cuts
+        unsigned = list(db.execute(select(Checkpoint.id).where(Checkpoint.signature_b64u.is_(None)).order_by(Checkpoint.id)).scalars())
+        due = tenants_due(db, settings.checkpoint_batch_size)
+    for cp_id in unsigned:
+        try:
+            materialize(cp_id)
+        except Exception:
+            log.exception("materializing checkpoint %s failed", cp_id)
+    cut = 0
+    for tenant_id in due:
+        try:
+            cut += checkpoint_tenant(tenant_id) is not None
+        except Exception:
+            log.exception("checkpoint failed for tenant %s", tenant_id)
+    return cut
+
+def run_checkpoint_worker(once: bool = False):
+    lock = LeaderLock(CHECKPOINT_LOCK_KEY)
+    try:
+        while True:
+            if lock.acquire():
+                run_once()
+            if once:
+                return
+            time.sleep(settings.checkpoint_poll_interval_s)
+    finally:
+        lock.release()
@@ -0,0 +1,59 @@
+"""Payload canonicalization + hash per /issue: rfc8785.dumps and a second encode for the hash (the old path) vs
+canonicalize_hashed.
+
+Pure CPU, no database:
+
+    python scripts/bench_canonical.py --fields 8 64 512 --n 2000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rfc8785
+from fida.canonical import canonicalize_hashed, hash_canon
+
+def flat_payload(fields: int, i: int) -> dict:
+    # the usual shape: string/int/bool fields, a few ids, one small nested object
+    p = {f"field_{k:03d}": (f"value {k} of {i}" if k % 3 else k * i) for k in range(fields)}
+    p.update({"case_id": f"C-{i:08d}", "approved": i % 2 == 0, "meta": {"source": "intake", "rev": i}})
+    return p
+
+def float_payload(fields: int, i: int) -> dict:
+    p = flat_payload(fields, i)
+    p["amount"] = i + 0.25
+    return p
+
+def old_path(p: dict) -> tuple[str, str]:
+    canon = rfc8785.dumps(p).decode("utf-8")
+    return canon, hash_canon(canon)
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fields", type=int, nargs="+", default=[8, 64, 512])
+    ap.add_argument("--n", type=int, default=2000, help="payloads per run")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    print(f"{'shape':>6} {'fields':>7} {'bytes':>7} {'rfc8785_us':>11} {'hashed_us':>10} {'speedup':>8}")
+    for shape, make in (("flat", flat_payload), ("float", float_payload)):
+        for f in args.fields:
+            payloads = [make(f, i) for i in range(args.n)]
+            assert all(old_path(p) == canonicalize_hashed(p) for p in payloads)
+            size = len(old_path(payloads[0])[0].encode("utf-8"))
+            t_old = best_of(lambda: [old_path(p) for p in payloads], args.repeat) / args.n * 1e6
+            t_new = best_of(lambda: [canonicalize_hashed(p) for p in payloads], args.repeat) / args.n * 1e6
+            print(f"{shape:>6} {f:>7} {size:>7} {t_old:>11.1f} {t_new:>10.1f} {t_old / t_new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Checkpoint wall time vs batch size: the cut (head lock held) and the materialization.
+
+Needs a migrated Postgres in DATABASE_URL. Everything runs inside one
+transaction per size that is rolled back, so no rows are left behind.
+
+    python scripts/bench_checkpoint.py --sizes 1000 5000 50000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fida.config import settings
+from fida.crypto import generate_keypair
+from fida.db import SessionLocal, copy_rows
+from fida.ledger import compute_event_hash, cut_checkpoint, materialize_checkpoint
+from fida.merkle import frontier_push, pack_frontier
+from fida.models import Event, TenantHead
+from fida.util import sha256_hex
+
+COLS = ["tenant_id", "seq", "event_id", "issued_at", "profile_id", "event_type", "actor_role", "object_ref",
+        "payload_canon", "payload_hash", "prev_event_hash", "event_hash", "kid", "signature_b64u"]
+
+def synthetic_events(tenant_id: str, n: int, frontier: list):
+    prev = None
+    size = 0
+    now = datetime.now(timezone.utc)
+    for seq in range(1, n + 1):
+        payload_hash = sha256_hex(str(seq).encode())
+        h = compute_event_hash(tenant_id, seq, now.isoformat(), "BENCH", "CHANGE", "agent", "", payload_hash, prev)
+        yield (tenant_id, seq, f"{tenant_id}-{seq}", now, "BENCH", "CHANGE", "agent", "", "{}", payload_hash, prev, h, "bench", "x")
+        size = frontier_push(frontier, size, bytes.fromhex(h), settings.merkle_alg)
+        prev = h
+
+def bench(n: int, repeat: int) -> tuple[list[float], list[float]]:
+    kp = generate_keypair()
+    cuts, mats = [], []
+    for r in range(repeat):
+        tenant_id = f"bench-{os.getpid()}-{n}-{r}"
+        with SessionLocal() as db:
+            frontier: list = []
+            copy_rows(db, Event.__table__, COLS, synthetic_events(tenant_id, n, frontier))
+            db.add(TenantHead(tenant_id=tenant_id, next_seq=n + 1, frontier=pack_frontier(frontier), frontier_size=n, frontier_alg=settings.merkle_alg))
+            db.flush()
+            t0 = time.perf_counter()
+            cp = cut_checkpoint(db, tenant_id, kp.kid, n)
+            t1 = time.perf_counter()
+            materialize_checkpoint(db, cp, kp.priv)
+            db.flush()
+            cuts.append(t1 - t0)
+            mats.append(time.perf_counter() - t1)
+            db.rollback()
+    return cuts, mats
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 50000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    print(f"{'batch':>8} {'cut_ms':>9} {'mat_best_s':>11} {'mat_med_s':>10} {'events/s':>11}")
+    for n in args.sizes:
+        cuts, mats = bench(n, args.repeat)
+        cuts, mats = sorted(cuts), sorted(mats)
+        best, med = mats[0], mats[len(mats) // 2]
+        print(f"{n:>8} {cuts[len(cuts) // 2] * 1000:>9.2f} {best:>11.3f} {med:>10.3f} {n / best:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Closed-loop load test against a running API: N concurrent clients, each sending its next request as soon as
+the previous one returns. Reports throughput and latency per concurrency level.
+
+    uvicorn app:app --workers 1 &
+    python scripts/bench_load.py --url http://localhost:8000 --api-key $KEY --tenant t1 \\
+        --endpoint verify --concurrency 8 32 128 256 --seconds 15
+
+Run it against a build with sync routes and one with async routes at the same worker count. Sync routes should
+flatten once concurrency passes Starlette's 40 threads or the DB pool; async routes should keep climbing until
+the database or CPU saturates.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+async def client_loop(http: httpx.AsyncClient, make, deadline: float, lat: list[float], errors: list[int]):
+    while time.perf_counter() < deadline:
+        method, path, body = make()
+        t0 = time.perf_counter()
+        try:
+            r = await http.request(method, path, json=body)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        lat.append(time.perf_counter() - t0)
+        if not ok:
+            errors.append(1)
+
+def pct(xs: list[float], q: float) -> float:
+    return statistics.quantiles(xs, n=100)[q - 1] if len(xs) >= 2 else (xs[0] if xs else 0.0)
+
+async def run_level(args, concurrency: int, receipt: dict | None, event_id: str | None) -> None:
+    headers = {"x-api-key": args.api_key}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    def make():
+        if args.endpoint == "issue":
+            return "POST", "/issue", {"tenant_id": args.tenant, "payload": {"n": uuid.uuid4().hex}}
+        if args.endpoint == "verify":
+            return "POST", "/verify", {"receipt": receipt}
+        if args.endpoint == "proof":
+            return "GET", f"/proof/{args.tenant}/{event_id}", None
+        return "GET", f"/export/{args.tenant}?limit={args.export_limit}", None
+
+    lat: list[float] = []
+    errors: list[int] = []
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=30.0) as http:
+        deadline = time.perf_counter() + args.seconds
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client_loop(http, make, deadline, lat, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    print(f"{concurrency:>6} {len(lat) / elapsed:>9.0f} {pct(lat, 50) * 1e3:>8.1f} {pct(lat, 99) * 1e3:>8.1f} {len(errors):>7}")
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--api-key", required=True, help="issuer key for --endpoint issue/verify setup, else verifier/exporter")
+    ap.add_argument("--tenant", required=True)
+    ap.add_argument("--endpoint", choices=["issue", "verify", "proof", "export"], default="verify")
+    ap.add_argument("--event-id", help="checkpointed event for --endpoint proof")
+    ap.add_argument("--export-limit", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128, 256])
+    ap.add_argument("--seconds", type=float, default=15.0)
+    args = ap.parse_args()
+
+    receipt = None
+    if args.endpoint == "verify":
+        # one receipt to verify over and over
+        async with httpx.AsyncClient(base_url=args.url, headers={"x-api-key": args.api_key}) as http:
+            r = await http.post("/issue", json={"tenant_id": args.tenant, "payload": {"bench": True}})
+            r.raise_for_status()
+            receipt = r.json()
+    if args.endpoint == "proof" and not args.event_id:
+        ap.error("--endpoint proof needs --event-id")
+    # the per-key rate limit has to be raised on the server (FIDA_RATE_LIMIT_RPS/BURST) or every level measures 429s
+    print(f"/{args.endpoint}, {args.seconds:.0f}s per level")
+    print(f"{'conc':>6} {'req/s':>9} {'p50_ms':>8} {'p99_ms':>8} {'errors':>7}")
+    for c in args.concurrency:
+        await run_level(args, c, receipt, args.event_id)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Merkle build time: the old list-of-hex-strings tree vs the packed byte engine.
+
+Pure CPU, no database:
+
+    python scripts/bench_merkle.py --sizes 5000 100000 1000000
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fida.merkle import MERKLE_HEX, MERKLE_RAW, build_levels, frontier_push, frontier_root
+
+def strings_root(leaves: list[str]) -> str:
+    # the pre-engine build_merkle: one str per node, hashing the utf-8 of two hex strings
+    level = leaves[:]
+    while len(level) > 1:
+        nxt = []
+        for i in range(0, len(level), 2):
+            left = level[i]
+            right = level[i + 1] if i + 1 < len(level) else left
+            nxt.append(hashlib.sha256((left + right).encode("utf-8")).hexdigest())
+        level = nxt
+    return level[0]
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[5000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    print(f"{'leaves':>9} {'strings_s':>10} {'bytes_hex_s':>12} {'bytes_raw_s':>12} {'frontier_us':>12} {'speedup':>8}")
+    for n in args.sizes:
+        packed = b"".join(hashlib.sha256(i.to_bytes(8, "big")).digest() for i in range(n))
+        hexes = [packed[i:i + 32].hex() for i in range(0, len(packed), 32)]
+        t_str = best_of(lambda: strings_root(hexes), args.repeat)
+        t_hex = best_of(lambda: build_levels(packed, MERKLE_HEX), args.repeat)
+        t_raw = best_of(lambda: build_levels(packed, MERKLE_RAW), args.repeat)
+        assert build_levels(packed, MERKLE_HEX)[-1].hex() == strings_root(hexes)
+        # amortised cost of one append to the per-tenant frontier, plus a root at the end
+        frontier, size = [], 0
+        t0 = time.perf_counter()
+        for i in range(0, len(packed), 32):
+            size = frontier_push(frontier, size, packed[i:i + 32], MERKLE_HEX)
+        frontier_root(frontier, size, MERKLE_HEX)
+        t_front = (time.perf_counter() - t0) / n * 1e6
+        print(f"{n:>9} {t_str:>10.3f} {t_hex:>12.3f} {t_raw:>12.3f} {t_front:>12.2f} {t_str / t_raw:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import pytest
+from fida.archive import ArchiveError, SegmentReader, SegmentStore, build_segment
+from fida.canonical import canonicalize
+
+def test_segment_round_trip_and_content_address(tmp_path):
+    payloads = [canonicalize({"n": i, "text": "x" * i}) for i in range(50)]
+    store = SegmentStore(str(tmp_path))
+    data = build_segment(101, payloads)
+    digest = store.put(data)
+    assert store.put(data) == digest  # same bytes, same file
+    r = SegmentReader(store.path(digest), digest)
+    assert [r.get(101 + i) for i in range(50)] == payloads
+    with pytest.raises(KeyError):
+        r.get(151)
+
+    with open(store.path(digest), "r+b") as f:
+        f.seek(20)
+        f.write(b"\x00")
+    with pytest.raises(ArchiveError):
+        SegmentReader(store.path(digest), digest)
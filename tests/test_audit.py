@@ -0,0 +1,60 @@
+import fcntl
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from fida.audit import AuditWriter
+
+def _rec(i):
+    return (datetime(2026, 1, 1, tzinfo=timezone.utc), f"key-{i}", "verify_receipt", "t1", '{"valid":true}', None, "ua")
+
+def test_spill_and_replay_round_trip(tmp_path):
+    w = AuditWriter(str(tmp_path / "spill.ndjson"), maxsize=2, flush_size=3, flush_interval_s=0.01)
+    written, fail = [], [True]
+    def write(batch):
+        if fail[0]:
+            return False
+        written.extend(batch)
+        return True
+    w.write = write
+    w.spill([_rec(i) for i in range(5)])
+    w.replay()  # database still down: nothing lost
+    assert not written and len(os.listdir(tmp_path)) == 1
+    fail[0] = False
+    w.replay()
+    assert written == [_rec(i) for i in range(5)]
+    assert os.listdir(tmp_path) == []
+
+def test_spill_reopens_a_file_claimed_while_waiting_for_the_lock(tmp_path):
+    path = str(tmp_path / "spill.ndjson")
+    w = AuditWriter(path, maxsize=2, flush_size=3, flush_interval_s=0.01)
+    # another process's replayer: holds the lock while the writer has the old inode open, claims and removes it
+    with open(path, "a") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        t = threading.Thread(target=w.spill, args=([_rec(1)],))
+        t.start()
+        time.sleep(0.1)
+        os.rename(path, path + ".claimed")
+        os.remove(path + ".claimed")
+    t.join(5)
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+
+def test_replay_skips_a_leftover_another_replayer_holds(tmp_path):
+    path = str(tmp_path / "spill.ndjson")
+    w = AuditWriter(path, maxsize=2, flush_size=3, flush_interval_s=0.01)
+    written = []
+    w.write = lambda batch: written.extend(batch) or True
+    w.spill([_rec(i) for i in range(3)])
+    leftover = path + ".999.0000abcd.replay"
+    os.rename(path, leftover)
+    with open(leftover) as held:
+        # a live replayer in another process is still working on it
+        fcntl.flock(held, fcntl.LOCK_EX)
+        w.replay()
+        assert written == [] and os.path.exists(leftover)
+    # its process died without finishing: the lock is gone and the records are replayed once
+    w.replay()
+    w.replay()
+    assert written == [_rec(i) for i in range(3)]
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+import fida.auth as auth
+
+class _NoDb:
+    def query(self, *a):
+        raise AssertionError("cache hit must not touch the db")
+
+def test_cached_principal_skips_db_until_invalidated():
+    h = auth.api_key_hash("k-hot")
+    auth.principals.set(h, auth.Principal("key-1", "issuer", "t1"))
+    assert auth.require_key("k-hot", _NoDb()).key_id == "key-1"
+    auth.invalidate_api_key(h)  # no Redis here: local drop still happens
+    with pytest.raises(AssertionError):
+        auth.require_key("k-hot", _NoDb())
+    with pytest.raises(HTTPException) as e:
+        auth.require_key(None, _NoDb())
+    assert e.value.status_code == 401
+
+class _AsyncDb:
+    def __init__(self, row):
+        self.row = row
+        self.calls = []
+
+    async def scalar(self, stmt):
+        self.calls.append("scalar")
+        return self.row
+
+    async def rollback(self):
+        self.calls.append("rollback")
+
+def test_async_miss_uses_the_request_session_and_releases_it():
+    row = auth.ApiKey(key_id="key-2", role="verifier", tenant_id="t1")
+    db = _AsyncDb(row)
+    p = asyncio.run(auth.require_key_async("k-async", db))
+    assert p.key_id == "key-2" and db.calls == ["scalar", "rollback"]
+    # now cached: no lookup
+    assert asyncio.run(auth.require_key_async("k-async", db)).key_id == "key-2" and len(db.calls) == 2
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(auth.require_key_async("k-unknown", _AsyncDb(None)))
+    assert e.value.status_code == 403
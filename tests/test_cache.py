@@ -0,0 +1,35 @@
+import time
+from fida.cache import TTLCache
+
+def test_lru_bound_and_evict_hook():
+    evicted = []
+    c = TTLCache(maxsize=2, ttl=60, on_evict=lambda k, v: evicted.append(k))
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert evicted == ["b"]
+    assert c.evict_where(lambda k: k == "a") == 1
+    assert evicted == ["b", "a"]
+
+def test_ttl_expiry():
+    evicted = []
+    c = TTLCache(maxsize=4, ttl=0.01, on_evict=lambda k, v: evicted.append(k))
+    c.set("a", 1)
+    time.sleep(0.02)
+    assert c.get("a") is None
+    assert evicted == ["a"]
+
+def test_signing_key_cache_evicts_on_rotation():
+    from fida.crypto import envelope_encrypt, generate_keypair, pub_b64u
+    from fida.config import settings
+    from fida.keys import signing_key, signing_keys, evict_signing_keys
+    kp = generate_keypair()
+    blob = envelope_encrypt(settings.fida_master_key_b64, kp.priv.private_bytes_raw())
+    priv = signing_key("t1", kp.kid, blob)
+    assert pub_b64u(priv.public_key()) == pub_b64u(kp.pub)
+    assert signing_key("t1", kp.kid, "not-decrypted-again") is priv
+    entry = signing_keys.get(("t1", kp.kid))
+    assert evict_signing_keys("t1") == 1
+    assert entry.priv is None
@@ -0,0 +1,66 @@
+import hashlib
+import random
+import pytest
+import rfc8785
+from fida.canonical import _plain, canonicalize, canonicalize_hashed
+
+CHARS = ["a", "Z", "0", " ", '"', "\\", "/", "\b", "\f", "\n", "\r", "\t", "\x00", "\x1f", "\x7f", "\u00e9", "\u00df", "\u20ac", "\u2028", "\ufeff", "\uffff", "\U0001f600", "\U00010000"]
+INTS = [0, 1, -1, 2**31, -(2**31), 2**53 - 1, -(2**53 - 1)]
+FLOATS = [0.0, -0.0, 1.0, 0.1, 1e21, 1e-7, 123456789.125, 5e-324, 1.7976931348623157e308]
+
+def rand_str(rnd: random.Random) -> str:
+    return "".join(rnd.choice(CHARS) for _ in range(rnd.randint(0, 6)))
+
+def rand_value(rnd: random.Random, depth: int, floats: bool):
+    kind = rnd.randint(0, 7 if depth < 4 else 4)
+    if kind == 0:
+        return rnd.choice([None, True, False])
+    if kind == 1:
+        return rnd.choice(INTS) if rnd.random() < 0.3 else rnd.randint(-10**6, 10**6)
+    if kind == 2:
+        return rnd.choice(FLOATS) if floats else rnd.randint(0, 9)
+    if kind in (3, 4):
+        return rand_str(rnd)
+    if kind == 5:
+        return [rand_value(rnd, depth + 1, floats) for _ in range(rnd.randint(0, 4))]
+    return {rand_str(rnd): rand_value(rnd, depth + 1, floats) for _ in range(rnd.randint(0, 5))}
+
+def check(obj):
+    want = rfc8785.dumps(obj)
+    canon, h = canonicalize_hashed(obj)
+    assert canon.encode("utf-8") == want
+    assert h == hashlib.sha256(want).hexdigest()
+
+@pytest.mark.parametrize("floats", [False, True])
+def test_differential_random(floats):
+    rnd = random.Random(8785 + floats)
+    for _ in range(3000):
+        check(rand_value(rnd, 0, floats))
+
+def test_edge_cases():
+    check({"b": 1, "a": [True, False, None], "c": {"y": "", "x": "\u0000\u001f\""}})
+    check({"\u00e9": 1, "e": 2, "\u20ac": 3, "z": 4})
+    # astral vs. high-BMP keys: UTF-16 order puts the surrogate pair first, code point order the other way round
+    obj = {"\ufb01": 1, "\U0001f600": 2, "": 3}
+    assert not _plain(obj)
+    check(obj)
+    check(("tuple", [1, 2]))
+    check({"n": 2**53 - 1, "m": -(2**53 - 1)})
+    check({"f": 1.0, "g": [1e21, 1e-7]})
+    assert _plain({"k": [1, "s", None, {"x": True}]})
+    assert not _plain({"k": [1, 2.5]})
+
+@pytest.mark.parametrize("obj, err", [
+    ({"n": 2**53}, rfc8785.IntegerDomainError),
+    ([-(2**53)], rfc8785.IntegerDomainError),
+    ({1: "x"}, rfc8785.CanonicalizationError),
+    ({"s": "\ud800"}, rfc8785.CanonicalizationError),
+    ({"\udfff": 1}, ValueError),  # rfc8785 lets the UnicodeEncodeError out here; both are ValueErrors
+    ({"f": float("nan")}, rfc8785.FloatDomainError),
+    ({"o": object()}, rfc8785.CanonicalizationError),
+])
+def test_errors_match_rfc8785(obj, err):
+    with pytest.raises(err):
+        rfc8785.dumps(obj)
+    with pytest.raises(err):
+        canonicalize(obj)
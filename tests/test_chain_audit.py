@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import fida.chain_audit as chain_audit
+from fida.canonical import canonicalize_hashed
+from fida.ledger import compute_event_hash
+from fida.merkle import MERKLE_HEX, build_levels, pack_hex
+from fida.models import Base, Checkpoint, Event
+from fida.util import PAGE_HASH_ALG, PAGE_HASH_LEGACY, page_hash, sha256_hex
+
+@pytest.fixture()
+def db(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Event.__table__, Checkpoint.__table__])
+    sessions = sessionmaker(bind=engine)
+    monkeypatch.setattr(chain_audit, "SessionLocal", sessions)
+    with sessions() as s:
+        yield s
+
+def _ledger(db, n, cps):
+    # n chained events, then checkpoints [(id, from_seq, to_seq, page_hash_fn, page_hash_alg)]
+    issued_at = datetime(2026, 1, 1, 12, 0, 0)  # sqlite hands back what it was given
+    hashes, prev = [], None
+    for seq in range(1, n + 1):
+        canon, payload_hash = canonicalize_hashed({"n": seq})
+        h = compute_event_hash("t1", seq, issued_at.astimezone(timezone.utc).isoformat(), "p", "E", "a", "", payload_hash, prev)
+        cp_id = next((c[0] for c in cps if c[1] <= seq <= c[2]), None)
+        leaf_index = seq - next(c[1] for c in cps if c[0] == cp_id) if cp_id else None
+        db.add(Event(tenant_id="t1", seq=seq, event_id=f"e{seq}", issued_at=issued_at, profile_id="p", event_type="E", actor_role="a",
+                     object_ref="", payload_canon=canon, payload_hash=payload_hash, prev_event_hash=prev, event_hash=h, kid="k",
+                     signature_b64u="s", checkpoint_id=cp_id, leaf_index=leaf_index))
+        hashes.append(h)
+        prev = h
+    for cp_id, lo, hi, fn, alg in cps:
+        leaves = hashes[lo - 1:hi]
+        db.add(Checkpoint(id=cp_id, tenant_id="t1", from_seq=lo, to_seq=hi, leaf_count=len(leaves), merkle_alg=MERKLE_HEX,
+                          merkle_root=build_levels(pack_hex(leaves), MERKLE_HEX)[-1].hex(), page_hash=fn(leaves),
+                          page_hash_alg=alg, platform_kid="k", signature_b64u="sig", issued_at=issued_at))
+    db.commit()
+
+def _legacy(leaves):
+    return sha256_hex("|".join(leaves).encode("utf-8"))
+
+def test_legacy_and_current_page_hashes_verify(db):
+    # 1: materialized before page_hash_alg existed with the '|' scheme, 2: same era with the raw scheme,
+    # 3: recorded legacy, 4: current
+    _ledger(db, 16, [(1, 1, 4, _legacy, None), (2, 5, 8, page_hash, None), (3, 9, 12, _legacy, PAGE_HASH_LEGACY), (4, 13, 16, page_hash, PAGE_HASH_ALG)])
+    res = chain_audit.audit_range("t1", 1, 16, [tuple(r) for r in chain_audit.plan_ranges(db, "t1", 0, 100)[0][2]])
+    assert res["errors"] == [] and res["checkpoints"] == 4 and res["last_seq"] == 16
+
+def test_page_hash_scheme_is_enforced_when_recorded(db):
+    # a legacy-scheme hash on a checkpoint that says it used the current scheme is a mismatch
+    _ledger(db, 8, [(1, 1, 4, page_hash, PAGE_HASH_ALG), (2, 5, 8, _legacy, PAGE_HASH_ALG)])
+    res = chain_audit.audit_range("t1", 1, 8, chain_audit.plan_ranges(db, "t1", 0, 100)[0][2])
+    assert res["errors"] == ["seq 5: checkpoint 2: page_hash mismatch"] and res["first_bad_seq"] == 5
@@ -0,0 +1,38 @@
+from fida.ctlog import _Appender, consistency_ranges, fold, leaf_hash, node_hash, range_pieces, verify_consistency
+from fida.util import sha256_hex
+
+def _events(n):
+    return [sha256_hex(str(i).encode()) for i in range(n)]
+
+def _mth(hashes):
+    # RFC 6962 2.1 reference
+    if len(hashes) == 1:
+        return hashes[0]
+    k = 1 << ((len(hashes) - 1).bit_length() - 1)
+    return node_hash(_mth(hashes[:k]), _mth(hashes[k:]))
+
+def test_appender_root_and_nodes_match_reference():
+    events = _events(40)
+    leaves = [leaf_hash(e) for e in events]
+    app = _Appender("t", 0, {})
+    nodes = {}
+    for n, e in enumerate(events, 1):
+        for _, lvl, idx, h in app.push([e]):
+            nodes[(lvl, idx)] = h
+        assert app.root() == _mth(leaves[:n])
+    for (lvl, idx), h in nodes.items():
+        assert h == _mth(leaves[idx << lvl:(idx + 1) << lvl])
+
+def test_consistency_proofs_verify():
+    leaves = [leaf_hash(e) for e in _events(33)]
+
+    def node(lvl, idx):
+        return _mth(leaves[idx << lvl:(idx + 1) << lvl])
+
+    for n in range(1, 34):
+        for m in range(1, n + 1):
+            proof = [fold([node(*p) for p in range_pieces(lo, hi)]) for lo, hi in consistency_ranges(m, n)]
+            assert verify_consistency(m, n, _mth(leaves[:m]), _mth(leaves[:n]), proof), (m, n)
+            if proof:
+                bad = [node_hash(proof[0], proof[0])] + proof[1:]
+                assert not verify_consistency(m, n, _mth(leaves[:m]), _mth(leaves[:n]), bad)
@@ -0,0 +1,28 @@
+import re
+from fida.ctlog import _Appender
+from fida.db import copy_buffer
+from fida.util import sha256_hex
+
+_UNESCAPE = {"\\\\": "\\", "\\t": "\t", "\\n": "\n", "\\r": "\r"}
+
+def _parse_copy(text):
+    # what the server does with COPY ... FROM STDIN text format: split fields, undo backslash escapes
+    rows = []
+    for line in text.splitlines():
+        rows.append([None if f == "\\N" else re.sub(r"\\[\\tnr]", lambda m: _UNESCAPE[m.group()], f) for f in line.split("\t")])
+    return rows
+
+def test_copy_encodes_bytes_as_bytea_hex():
+    # log_nodes rows exactly as append_log hands them to copy_rows
+    app = _Appender("t1", 0, {})
+    nodes = [n for i in range(8) for n in app.push([sha256_hex(str(i).encode())])]
+    rows = _parse_copy(copy_buffer(nodes).getvalue())
+    assert len(rows) == len(nodes) == 7
+    for (tenant_id, lvl, idx, h), (f_tenant, f_lvl, f_idx, f_hash) in zip(nodes, rows):
+        assert (f_tenant, f_lvl, f_idx) == (tenant_id, str(lvl), str(idx))
+        # bytea hex input format
+        assert f_hash.startswith("\\x") and bytes.fromhex(f_hash[2:]) == h
+
+def test_copy_escapes_text_and_nulls():
+    rows = _parse_copy(copy_buffer([("a\tb\\c\nd", None, 3)]).getvalue())
+    assert rows == [["a\tb\\c\nd", None, "3"]]
@@ -0,0 +1,44 @@
+from fida.export_verify import verify_export, verify_export_ndjson
+from fida.ledger import compute_event_hash
+from fida.util import json_dumps, page_hash, sha256_hex
+
+def _items(n):
+    prev, out = None, []
+    for seq in range(1, n + 1):
+        ph = sha256_hex(str(seq).encode())
+        h = compute_event_hash("t", seq, "2026-01-01T00:00:00+00:00", "p", "E", "a", "", ph, prev)
+        out.append(dict(seq=seq, event_id=str(seq), issued_at="2026-01-01T00:00:00+00:00", event_type="E", payload_hash=ph, event_hash=h,
+                        tenant_id="t", profile_id="p", actor_role="a", object_ref="", prev_event_hash=prev))
+        prev = h
+    return out
+
+def _page(items):
+    return {"items": items, "integrity": {"from_root": items[0]["prev_event_hash"] or "", "to_root": items[-1]["event_hash"], "size": len(items), "page_hash": page_hash(i["event_hash"] for i in items)}}
+
+def test_multi_page_export_verifies_and_detects_splice():
+    items = _items(10)
+    rep = verify_export([_page(items[:4]), _page(items[4:])], recompute=True)
+    assert rep.ok and rep.events == 10 and rep.pages == 2
+    rep = verify_export([_page(items[:4]), _page(items[5:])])
+    assert not rep.ok
+
+def test_ndjson_stream_verifies():
+    items = _items(5)
+    lines = [json_dumps({"type": "event", **i}) for i in items]
+    lines.append(json_dumps({"type": "integrity", "size": 5, "from_root": "", "to_root": items[-1]["event_hash"], "page_hash": page_hash(i["event_hash"] for i in items)}))
+    assert verify_export_ndjson(lines, recompute=True).ok
+    items[2]["object_ref"] = "tampered"
+    lines[2] = json_dumps({"type": "event", **items[2]})
+    assert not verify_export_ndjson(lines, recompute=True).ok
+
+def test_exported_issued_at_is_utc_whatever_the_session_timezone():
+    # a session with TimeZone=Europe/Berlin hands back the same instant as +02:00
+    from datetime import datetime, timedelta, timezone
+    from types import SimpleNamespace
+    from fida.export import _event_line
+    it = _items(1)[0]
+    row = SimpleNamespace(**dict(it, issued_at=datetime(2026, 1, 1, 2, 0, tzinfo=timezone(timedelta(hours=2))), kid="k", signature_b64u="s",
+                                 checkpoint_id=None, leaf_index=None))
+    line = _event_line(row, "1")  # payload_hash in _items is sha256("1")
+    lines = [line.strip(), json_dumps({"type": "integrity", "size": 1, "from_root": "", "to_root": it["event_hash"], "page_hash": page_hash([it["event_hash"]])})]
+    assert verify_export_ndjson(lines, recompute=True).ok
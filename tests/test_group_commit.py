@@ -0,0 +1,65 @@
+import asyncio
+from fida.group_commit import CommitFailed, GroupCommitter, PendingIssue
+
+class _Recording(GroupCommitter):
+    def __init__(self, *a):
+        super().__init__(*a)
+        self.groups = []
+
+    async def issue_group(self, tenant_id, batch):
+        self.groups.append(len(batch))
+        await asyncio.sleep(0.01)  # the commit
+        if any(p.item["payload"]["bad"] for p in batch):
+            raise ValueError("bad item")
+        if any(p.item["payload"].get("commit_fails") for p in batch):
+            raise CommitFailed("connection lost during COMMIT")
+        return [(f"receipt-{p.item['payload']['n']}", False) for p in batch]
+
+def _pending(n, bad=False):
+    return PendingIssue({"payload": {"n": n, "bad": bad}}, None, "k", None, None)
+
+def test_concurrent_issues_share_commits_and_get_their_own_receipts():
+    gc = _Recording(16, 0.005)
+
+    async def run():
+        return await asyncio.gather(*(gc.submit("t1", _pending(i)) for i in range(40)), return_exceptions=True)
+
+    out = asyncio.run(run())
+    assert [r for r, _ in out] == [f"receipt-{i}" for i in range(40)]
+    assert sum(gc.groups) == 40 and max(gc.groups) == 16 and len(gc.groups) <= 4
+    assert gc._lanes == {}
+
+def test_failed_group_falls_back_to_single_issues():
+    gc = _Recording(8, 0.005)
+
+    async def run():
+        return await asyncio.gather(*(gc.submit("t1", _pending(i, bad=(i == 3))) for i in range(5)), return_exceptions=True)
+
+    out = asyncio.run(run())
+    assert isinstance(out[3], ValueError)
+    assert [out[i][0] for i in (0, 1, 2, 4)] == [f"receipt-{i}" for i in (0, 1, 2, 4)]
+    assert gc.groups == [5, 1, 1, 1, 1, 1]
+
+def test_commit_failure_is_not_reissued():
+    gc = _Recording(8, 0.005)
+
+    async def run():
+        ps = [_pending(i) for i in range(4)]
+        ps[0].item["payload"]["commit_fails"] = True
+        return await asyncio.gather(*(gc.submit("t1", p) for p in ps), return_exceptions=True)
+
+    out = asyncio.run(run())
+    assert all(isinstance(r, CommitFailed) for r in out)
+    assert gc.groups == [4]
+
+def test_lane_holds_its_drain_task():
+    seen = []
+
+    class _Check(_Recording):
+        async def issue_group(self, tenant_id, batch):
+            seen.append(self._lanes[tenant_id].drain is asyncio.current_task())
+            return await super().issue_group(tenant_id, batch)
+
+    gc = _Check(8, 0.0)
+    asyncio.run(gc.submit("t1", _pending(1)))
+    assert seen == [True]
@@ -0,0 +1,62 @@
+from fida.merkle import build_merkle, prove, proof_positions, verify_proof
+from fida.util import sha256_hex
+
+def _leaves(n):
+    return [sha256_hex(str(i).encode()) for i in range(n)]
+
+def test_proof_positions_match_prove():
+    for n in (1, 2, 3, 5, 8, 13):
+        root, layers = build_merkle(_leaves(n))
+        for i in range(n):
+            pr = prove(layers, i)
+            assert [(side, layers[lvl][idx]) for lvl, idx, side in proof_positions(n, i)] == pr.siblings
+            assert verify_proof(pr)
+
+def test_multiproof_dedupes_and_verifies():
+    from fida.merkle import multiproof_positions, verify_multiproof
+    for n in (1, 2, 7, 16, 33):
+        root, layers = build_merkle(_leaves(n))
+        for picks in ([0], [n - 1], list(range(0, n, 3)), list(range(n))):
+            need = multiproof_positions(n, picks)
+            assert len(need) == len(set(need))
+            assert len(need) <= sum(len(proof_positions(n, i)) for i in picks)
+            nodes = {(lvl, idx): layers[lvl][idx] for lvl, idx in need}
+            leaves = {i: layers[0][i] for i in picks}
+            assert verify_multiproof(n, leaves, nodes, root)
+            if n > 1:
+                leaves[picks[0]] = sha256_hex(b"tampered")
+                assert not verify_multiproof(n, leaves, nodes, root)
+
+def test_frontier_root_matches_build_merkle():
+    from fida.merkle import MERKLE_ALGS, frontier_push, frontier_root, pack_frontier, unpack_frontier
+    for alg in MERKLE_ALGS:
+        frontier, size = [], 0
+        assert frontier_root(frontier, size).hex() == build_merkle([], alg)[0]
+        leaves = _leaves(70)
+        for n, leaf in enumerate(leaves, 1):
+            size = frontier_push(frontier, size, bytes.fromhex(leaf), alg)
+            assert frontier_root(frontier, size, alg).hex() == build_merkle(leaves[:n], alg)[0], n
+            assert unpack_frontier(pack_frontier(frontier), size) == frontier
+
+def _reference_root(leaves, alg):
+    # the original hex-string implementation, with raw mode hashing the decoded pair
+    import hashlib
+    if not leaves:
+        return sha256_hex(b"")
+    level = leaves[:]
+    while len(level) > 1:
+        nxt = []
+        for i in range(0, len(level), 2):
+            a, b = level[i], level[i + 1] if i + 1 < len(level) else level[i]
+            nxt.append(sha256_hex((a + b).encode()) if alg == "sha256-hexcat" else hashlib.sha256(bytes.fromhex(a + b)).hexdigest())
+        level = nxt
+    return level[0]
+
+def test_byte_engine_matches_hex_reference():
+    from fida.merkle import MERKLE_ALGS, MERKLE_HEX, build_levels, pack_hex
+    for alg in MERKLE_ALGS:
+        for n in (0, 1, 2, 3, 4, 5, 31, 64, 100):
+            leaves = _leaves(n)
+            assert build_levels(pack_hex(leaves), alg)[-1].hex() == _reference_root(leaves, alg)
+    # raw and hex-concat roots differ, so checkpoints must record which one they used
+    assert build_levels(pack_hex(_leaves(2)), MERKLE_HEX)[-1] != build_levels(pack_hex(_leaves(2)), "sha256-raw")[-1]
@@ -0,0 +1,65 @@
+import pytest
+import redis
+from fastapi import HTTPException
+import fida.rate_limit as rl
+
+class _Down:
+    def __call__(self, keys, args):
+        raise redis.ConnectionError("down")
+
+def test_redis_outage_falls_back_to_local_bucket(monkeypatch):
+    monkeypatch.setattr(rl, "_bucket_script", lambda: _Down())
+    monkeypatch.setattr(rl, "_redis_down_until", 0.0)
+    monkeypatch.setattr(rl.settings, "rate_limit_rps", 1)
+    monkeypatch.setattr(rl.settings, "rate_limit_burst", 3)
+    for _ in range(3):
+        rl.enforce_rl(None, "t-outage", "k-outage")
+    with pytest.raises(HTTPException) as e:
+        rl.enforce_rl(None, "t-outage", "k-outage")
+    assert e.value.status_code == 429 and e.value.headers["Retry-After"] == "1"
+
+@pytest.fixture()
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs EVAL through lupa
+    r = fakeredis.FakeRedis()
+    script = r.register_script(rl.TOKEN_BUCKET_LUA)
+    monkeypatch.setattr(rl, "_bucket_script", lambda: script)
+    monkeypatch.setattr(rl, "_redis_down_until", 0.0)
+    monkeypatch.setattr(rl.settings, "rate_limit_lease", 0)
+    return r, script
+
+def test_token_bucket_script_grants_and_refuses(fake_redis):
+    r, script = fake_redis
+    # want 5, need 1; key bucket rate 10/s burst 4, tenant bucket rate 100/s burst 3: the tenant bucket caps it
+    granted, wait_ms = script(keys=["rl:k:a", "rl:t:a"], args=[5, 1, 10, 4, 100, 3])
+    assert (int(granted), int(wait_ms)) == (3, 0)
+    assert float(r.hget("rl:k:a", "t")) == 1 and float(r.hget("rl:t:a", "t")) == 0
+    assert 0 < r.pttl("rl:k:a") <= 4 * 1000 // 10 + 1000
+    # tenant bucket empty: refused, wait for one token at 100/s
+    granted, wait_ms = script(keys=["rl:k:a", "rl:t:a"], args=[1, 1, 10, 4, 100, 3])
+    assert int(granted) == 0 and 1 <= int(wait_ms) <= 10
+    # a refusal charges nothing
+    assert float(r.hget("rl:k:a", "t")) >= 1
+
+def test_enforce_rl_against_redis_script(fake_redis, monkeypatch):
+    monkeypatch.setattr(rl.settings, "rate_limit_rps", 1)
+    monkeypatch.setattr(rl.settings, "rate_limit_burst", 2)
+    monkeypatch.setattr(rl.settings, "tenant_rate_limit_rps", 1)
+    monkeypatch.setattr(rl.settings, "tenant_rate_limit_burst", 3)
+    rl.enforce_rl(None, "t-redis", "k1")
+    rl.enforce_rl(None, "t-redis", "k1")
+    with pytest.raises(HTTPException) as e:
+        rl.enforce_rl(None, "t-redis", "k1")  # key bucket empty
+    assert e.value.status_code == 429 and e.value.headers["Retry-After"] == "1"
+    rl.enforce_rl(None, "t-redis", "k2")
+    with pytest.raises(HTTPException):
+        rl.enforce_rl(None, "t-redis", "k3")  # tenant bucket shared by all keys
+    assert rl._redis_down_until == 0.0
+
+def test_script_error_is_not_treated_as_an_outage(fake_redis, monkeypatch):
+    r, _ = fake_redis
+    monkeypatch.setattr(rl, "_bucket_script", lambda: r.register_script("return redis.call('NOSUCHCOMMAND')"))
+    with pytest.raises(redis.ResponseError):
+        rl.enforce_rl(None, "t-bug", "k-bug")
+    assert rl._redis_down_until == 0.0
@@ -10,3 +10,11 @@ def client():
 def test_root(client):
     r = client.get("/")
     assert r.status_code == 200
+
+def test_body_cap_enforced_while_streaming(client):
+    # chunked upload, no Content-Length: the cap has to trip mid-stream
+    def chunks():
+        for _ in range(100):
+            yield b"x" * 10_000
+    r = client.post("/verify", content=chunks(), headers={"content-type": "application/json"})
+    assert r.status_code == 413